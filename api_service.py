@@ -4,7 +4,7 @@ from typing import Dict, Any, List, Optional
 
 from database import get_connection
 import config
-from shared_constants import CLUBS_DATA, INTERESTS
+from shared_constants import CLUBS_DATA, INTERESTS_SET, CLUB_KEYS, CLUB_NAMES, CLUB_BADGES
 
 
 def resolve_club_entry(club_value: Optional[str]) -> Optional[Dict[str, Any]]:
@@ -15,12 +15,9 @@ def resolve_club_entry(club_value: Optional[str]) -> Optional[Dict[str, Any]]:
         if isinstance(data, dict):
             return {"key": club_value, "label": data.get("name", club_value), "badge": data.get("badge")}
         return {"key": club_value, "label": str(data), "badge": None}
-    for key, data in CLUBS_DATA.items():
-        if not isinstance(data, dict):
-            continue
-        name = data.get("name", "")
+    for key, name, badge in zip(CLUB_KEYS, CLUB_NAMES, CLUB_BADGES):
         if name == club_value or key.lower() in str(club_value).lower() or str(club_value) in name:
-            return {"key": key, "label": name or key, "badge": data.get("badge")}
+            return {"key": key, "label": name or key, "badge": badge}
     return None
 
 
@@ -72,7 +69,18 @@ def get_user_role(user_id: int) -> str:
 
 
 def get_me(user_id: int) -> Dict[str, Any]:
-    user = get_user(user_id)
+    # User row and referral count in one round-trip
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(
+        'SELECT u.*, (SELECT COUNT(*) FROM users WHERE invited_by = u.user_id) AS invite_count '
+        'FROM users u WHERE u.user_id = ?',
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    conn.close()
+    user = _row_to_dict(row) if row else None
     if not user:
         return {"id": user_id, "username": None, "role": "user", "club": None, "interests": [], "coins": 0}
     club_value = user.get("club")
@@ -81,17 +89,13 @@ def get_me(user_id: int) -> Dict[str, Any]:
         if club_value in CLUBS_DATA:
             club_entry = {"key": club_value, "label": CLUBS_DATA[club_value]["name"], "badge": CLUBS_DATA[club_value].get("badge")}
         else:
-            for key, data in CLUBS_DATA.items():
-                if data.get("name") == club_value or key.lower() in club_value.lower():
-                    club_entry = {"key": key, "label": data.get("name", key), "badge": data.get("badge")}
+            for key, name, badge in zip(CLUB_KEYS, CLUB_NAMES, CLUB_BADGES):
+                if name == club_value or key.lower() in club_value.lower():
+                    club_entry = {"key": key, "label": name, "badge": badge}
                     break
     interests_raw = user.get("interests") or ""
     interests = [i for i in interests_raw.split(",") if i]
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM users WHERE invited_by = ?', (user_id,))
-    invite_count = cursor.fetchone()[0] or 0
-    conn.close()
+    invite_count = user.pop("invite_count") or 0
     return {
         "id": user_id,
         "username": user.get("username"),
@@ -118,7 +122,7 @@ def update_me(user_id: int, club_key: Optional[str] = None, interests: Optional[
             raise ValueError("invalid_club")
         cursor.execute('UPDATE users SET club = ? WHERE user_id = ?', (club_value, user_id))
     if interests is not None:
-        filtered = [i for i in interests if i in INTERESTS]
+        filtered = [i for i in interests if i in INTERESTS_SET]
         interests_value = ",".join(filtered)
         cursor.execute('UPDATE users SET interests = ? WHERE user_id = ?', (interests_value, user_id))
     conn.commit()
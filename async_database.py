@@ -9,7 +9,7 @@ import aiosqlite
 import asyncio
 import logging
 from contextlib import asynccontextmanager
-from typing import Optional, List, Tuple, Any
+from typing import Optional, List, Set, Tuple, Any
 
 DB_NAME = "dave_sports.db"
 
@@ -248,6 +248,11 @@ async def init_db():
         except:
             pass
         
+        try:
+            await cursor.execute('ALTER TABLE twitter_feeds ADD COLUMN twitter_user_id TEXT DEFAULT NULL')
+        except:
+            pass
+        
         # Dave.sport feed tables
         await cursor.execute('''
         CREATE TABLE IF NOT EXISTS davesport_subscribers (
@@ -664,6 +669,16 @@ async def update_last_tweet_id(twitter_username: str, chat_id: int, tweet_id: st
         )
         await conn.commit()
 
+async def set_twitter_user_id(twitter_username: str, twitter_user_id: str):
+    """Remember the resolved Twitter user ID for every feed of this username"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(
+            'UPDATE twitter_feeds SET twitter_user_id = ? WHERE twitter_username = ?',
+            (twitter_user_id, twitter_username.lower())
+        )
+        await conn.commit()
+
 async def is_tweet_posted(tweet_id: str, chat_id: int) -> bool:
     """Check if a tweet was already posted"""
     pool = await get_pool()
@@ -674,6 +689,35 @@ async def is_tweet_posted(tweet_id: str, chat_id: int) -> bool:
         )
         return await cursor.fetchone() is not None
 
+async def get_posted_tweet_ids(tweet_ids: List[str], chat_id: int) -> Set[str]:
+    """Return which of tweet_ids were already posted to chat_id (one query)"""
+    if not tweet_ids:
+        return set()
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        placeholders = ','.join('?' * len(tweet_ids))
+        cursor = await conn.execute(
+            f'SELECT tweet_id FROM posted_tweets WHERE chat_id = ? AND tweet_id IN ({placeholders})',
+            (chat_id, *tweet_ids)
+        )
+        return {row[0] for row in await cursor.fetchall()}
+
+async def finalize_feed_posts(twitter_username: str, chat_id: int, tweet_ids: List[str], last_tweet_id: str):
+    """Mark tweets as posted and advance the feed's last_tweet_id in one transaction"""
+    if not tweet_ids:
+        return
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.executemany(
+            'INSERT OR IGNORE INTO posted_tweets (tweet_id, chat_id, message_id) VALUES (?, ?, 0)',
+            [(tweet_id, chat_id) for tweet_id in tweet_ids]
+        )
+        await conn.execute(
+            'UPDATE twitter_feeds SET last_tweet_id = ? WHERE twitter_username = ? AND chat_id = ?',
+            (last_tweet_id, twitter_username.lower(), chat_id)
+        )
+        await conn.commit()
+
 async def mark_tweet_posted(tweet_id: str, chat_id: int, message_id: int):
     """Mark a tweet as posted"""
     pool = await get_pool()
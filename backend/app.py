@@ -1,20 +1,23 @@
 import os
 import json
+import logging
+import time
 import urllib.request
 import urllib.error
 from pathlib import Path
 from typing import Optional, List
 
-from fastapi import FastAPI, HTTPException, Depends, Header, Query
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, BackgroundTasks
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 
 import config
 from backend import auth as auth_utils
 from backend.db import init_db
 from backend import service
-from shared_constants import CLUBS_DATA, INTERESTS
+from shared_constants import CLUBS_OPTIONS, INTERESTS
 
 
 from starlette.requests import Request
@@ -38,6 +41,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Leaderboard/history lists compress well; tiny bodies are left alone
+app.add_middleware(GZipMiddleware, minimum_size=512)
 
 WEBAPP_DIR = Path(__file__).resolve().parents[1] / "webapp"
 
@@ -92,6 +97,19 @@ class EnsureUserPayload(BaseModel):
     invited_by: Optional[int] = None
 
 
+class EnsureUsersBulkPayload(BaseModel):
+    users: List[EnsureUserPayload]
+
+
+class BalanceBulkItem(BaseModel):
+    user_id: int
+    amount: int
+
+
+class BalanceBulkPayload(BaseModel):
+    items: List[BalanceBulkItem]
+
+
 class PreferencePayload(BaseModel):
     pref_name: str
     value: int
@@ -111,18 +129,38 @@ class LinkClickPayload(BaseModel):
     user_id: int
 
 
+class LinkClaimPayload(BaseModel):
+    user_id: int
+    reward: int
+
+
 class ReactionPayload(BaseModel):
     user_id: int
     message_id: int
     chat_id: int
 
 
+class ReactionClaimPayload(ReactionPayload):
+    reward: int
+
+
+class ReactionClaimBulkPayload(BaseModel):
+    items: List[ReactionPayload]
+    reward: int
+
+
 class GroupPayload(BaseModel):
     chat_id: int
     chat_title: Optional[str] = ""
     chat_type: Optional[str] = ""
 
 
+class ResultBroadcastPayload(BaseModel):
+    match_id: int
+    text: str
+    reply_markup: Optional[dict] = None
+
+
 class BroadcastPayload(BaseModel):
     message: str
 
@@ -196,6 +234,63 @@ def _broadcast_general(text: str, targets: Optional[List[dict]] = None) -> int:
     return sent
 
 
+# Per-user notification fan-out: paced under Telegram's ~30 msg/sec bot limit
+NOTIFY_SEND_INTERVAL = 1 / 25
+NOTIFY_MAX_RETRIES = 3
+# 400 descriptions meaning the recipient can never be reached
+_UNDELIVERABLE_REASONS = ("chat not found", "user is deactivated")
+
+
+def _send_user_notification(chat_id: int, text: str, reply_markup: Optional[dict] = None) -> str:
+    """Send an HTML message to a user. Returns "ok", "undeliverable" or "failed"."""
+    payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+    if reply_markup:
+        payload["reply_markup"] = reply_markup
+    url = f"https://api.telegram.org/bot{config.BOT_TOKEN}/sendMessage"
+    data = json.dumps(payload).encode("utf-8")
+    for _ in range(NOTIFY_MAX_RETRIES):
+        req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=5) as resp:
+                return "ok" if 200 <= getattr(resp, "status", 200) < 300 else "failed"
+        except urllib.error.HTTPError as e:
+            try:
+                error = json.loads(e.read())
+            except Exception:
+                error = {}
+            if e.code == 429:
+                time.sleep(error.get("parameters", {}).get("retry_after", 1))
+                continue
+            # 403: bot blocked / user deactivated. Other 400s (e.g. "can't parse
+            # entities") are the message's fault, not the recipient's
+            description = str(error.get("description", "")).lower()
+            if e.code == 403 or (e.code == 400 and any(reason in description for reason in _UNDELIVERABLE_REASONS)):
+                return "undeliverable"
+            logging.warning(f"Notification to {chat_id} failed ({e.code}): {description}")
+            return "failed"
+        except Exception:
+            time.sleep(1)
+    return "failed"
+
+
+def _broadcast_result_notification(match_id: int, text: str, reply_markup: Optional[dict]) -> None:
+    sent = 0
+    pruned = 0
+    for user_id in service.get_result_notification_users(match_id):
+        status = _send_user_notification(user_id, text, reply_markup)
+        if status == "ok":
+            sent += 1
+        elif status == "undeliverable":
+            # Stop queuing result messages for users who can't receive them
+            try:
+                service.update_user_preference(user_id, "result_notifications", 0)
+                pruned += 1
+            except Exception:
+                pass
+        time.sleep(NOTIFY_SEND_INTERVAL)
+    logging.info(f"Result broadcast for match {match_id}: sent={sent} pruned={pruned}")
+
+
 def _broadcast_profile_changes(
     user_id: int,
     username: Optional[str],
@@ -392,10 +487,7 @@ def api_leaderboards_combined(
 @app.get("/api/me")
 def api_me(user_id: int = Depends(get_current_user)):
     data = service.build_me_response(user_id)
-    data["clubs"] = [
-        {"key": key, "label": info.get("name", key), "badge": info.get("badge")}
-        for key, info in CLUBS_DATA.items()
-    ]
+    data["clubs"] = CLUBS_OPTIONS
     data["interests_options"] = INTERESTS
     return data
 
@@ -409,10 +501,7 @@ def api_me_update(payload: dict, user_id: int = Depends(get_current_user)):
         data = service.update_me(user_id, club, interests)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
-    data["clubs"] = [
-        {"key": key, "label": info.get("name", key), "badge": info.get("badge")}
-        for key, info in CLUBS_DATA.items()
-    ]
+    data["clubs"] = CLUBS_OPTIONS
     data["interests_options"] = INTERESTS
     try:
         after_club = data.get("club", {}).get("label") if data.get("club") else None
@@ -536,6 +625,21 @@ def admin_ensure_user(payload: EnsureUserPayload, _: None = Depends(require_bot)
     return {"is_new": is_new, "rewarded": rewarded}
 
 
+@app.post("/admin/users/ensure-bulk")
+def admin_ensure_users_bulk(payload: EnsureUsersBulkPayload, _: None = Depends(require_bot)):
+    service.ensure_users_bulk([(u.user_id, u.username) for u in payload.users])
+    return {"ok": True, "count": len(payload.users)}
+
+
+@app.post("/admin/users/balance-bulk")
+def admin_adjust_balances_bulk(payload: BalanceBulkPayload, _: None = Depends(require_bot)):
+    amounts = {}
+    for item in payload.items:
+        amounts[item.user_id] = amounts.get(item.user_id, 0) + item.amount
+    service.adjust_balances_bulk(amounts)
+    return {"ok": True, "count": len(amounts)}
+
+
 @app.post("/admin/users/{user_id}/balance")
 def admin_adjust_balance(user_id: int, payload: BalanceAdjustPayload, _: None = Depends(require_bot)):
     balance = service.adjust_balance(user_id, payload.amount)
@@ -692,6 +796,12 @@ def admin_record_link_clicks(link_id: int, payload: LinkClickPayload, _: None =
     return {"created": created}
 
 
+@app.post("/admin/links/{link_id}/claim")
+def admin_claim_link_click(link_id: int, payload: LinkClaimPayload, _: None = Depends(require_bot)):
+    credited = service.claim_link_click_reward(payload.user_id, link_id, payload.reward)
+    return {"credited": credited}
+
+
 @app.get("/admin/links/{link_id}/clicked")
 def admin_has_clicked(link_id: int, user_id: int, _: None = Depends(require_bot)):
     clicked = service.has_user_clicked_link(user_id, link_id)
@@ -711,6 +821,21 @@ def admin_record_reaction(payload: ReactionPayload, _: None = Depends(require_bo
     return {"created": created}
 
 
+@app.post("/admin/reactions/claim")
+def admin_claim_reaction(payload: ReactionClaimPayload, _: None = Depends(require_bot)):
+    credited = service.claim_reaction_reward(payload.user_id, payload.message_id, payload.chat_id, payload.reward)
+    return {"credited": credited}
+
+
+@app.post("/admin/reactions/claim-bulk")
+def admin_claim_reactions_bulk(payload: ReactionClaimBulkPayload, _: None = Depends(require_bot)):
+    credited = service.claim_reaction_rewards_bulk(
+        [(item.user_id, item.message_id, item.chat_id) for item in payload.items],
+        payload.reward,
+    )
+    return {"credited": credited}
+
+
 @app.get("/admin/reactions/check")
 def admin_has_reacted(user_id: int, message_id: int, _: None = Depends(require_bot)):
     reacted = service.has_user_reacted(user_id, message_id)
@@ -727,6 +852,14 @@ def admin_result_recipients(match_id: int, _: None = Depends(require_bot)):
     return {"user_ids": service.get_result_notification_users(match_id)}
 
 
+@app.post("/admin/notifications/broadcast-result")
+def admin_broadcast_result(payload: ResultBroadcastPayload, background_tasks: BackgroundTasks, _: None = Depends(require_bot)):
+    if not config.BOT_TOKEN:
+        raise HTTPException(status_code=500, detail="bot_token_missing")
+    background_tasks.add_task(_broadcast_result_notification, payload.match_id, payload.text, payload.reply_markup)
+    return {"ok": True, "queued": True}
+
+
 @app.post("/admin/groups")
 def admin_add_group(payload: GroupPayload, _: None = Depends(require_bot)):
     service.add_group(payload.chat_id, payload.chat_title or "", payload.chat_type or "")
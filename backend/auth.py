@@ -1,11 +1,22 @@
 import base64
-import hashlib
 import hmac
 import json
 import os
 import time
+from functools import lru_cache
 from typing import Dict, Any
-from urllib.parse import parse_qsl
+from urllib.parse import unquote_plus
+
+
+# orjson when available (faster, returns bytes); compact stdlib json otherwise
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+    _json_loads = json.loads
 
 
 JWT_SECRET = (os.getenv("JWT_SECRET") or os.getenv("BOT_TOKEN") or "").strip() or "change_me"
@@ -20,36 +31,70 @@ def _b64url_decode(data: str) -> bytes:
     return base64.urlsafe_b64decode(data + padding)
 
 
+# Constant across tokens, so encoded once
+_JWT_HEADER_B64 = _b64url_encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+_JWT_SECRET_BYTES = JWT_SECRET.encode()
+
+
+def _secret_bytes(secret: str) -> bytes:
+    return _JWT_SECRET_BYTES if secret is JWT_SECRET else secret.encode()
+
+
 def create_jwt(payload: Dict[str, Any], secret: str = JWT_SECRET, exp_seconds: int = 86400) -> str:
-    header = {"alg": "HS256", "typ": "JWT"}
     now = int(time.time())
     payload = {**payload, "iat": now, "exp": now + exp_seconds}
-    header_b64 = _b64url_encode(json.dumps(header, separators=(",", ":")).encode())
-    payload_b64 = _b64url_encode(json.dumps(payload, separators=(",", ":")).encode())
+    header_b64 = _JWT_HEADER_B64
+    payload_b64 = _b64url_encode(_json_dumps(payload))
     signing_input = f"{header_b64}.{payload_b64}".encode()
-    signature = hmac.new(secret.encode(), signing_input, hashlib.sha256).digest()
+    signature = hmac.digest(_secret_bytes(secret), signing_input, "sha256")
     signature_b64 = _b64url_encode(signature)
     return f"{header_b64}.{payload_b64}.{signature_b64}"
 
 
-def verify_jwt(token: str, secret: str = JWT_SECRET) -> Dict[str, Any]:
+# Active users send the same token on every request, so verified payloads are
+# memoised; only failures (which raise) are recomputed. Expiry is checked per call.
+@lru_cache(maxsize=4096)
+def _verify_jwt_signature(token: str, secret: str) -> Dict[str, Any]:
     try:
         header_b64, payload_b64, signature_b64 = token.split(".")
     except ValueError:
         raise ValueError("invalid_token")
     signing_input = f"{header_b64}.{payload_b64}".encode()
-    expected_sig = hmac.new(secret.encode(), signing_input, hashlib.sha256).digest()
+    expected_sig = hmac.digest(_secret_bytes(secret), signing_input, "sha256")
     if not hmac.compare_digest(_b64url_encode(expected_sig), signature_b64):
         raise ValueError("invalid_token")
-    payload = json.loads(_b64url_decode(payload_b64))
+    return _json_loads(_b64url_decode(payload_b64))
+
+
+def verify_jwt(token: str, secret: str = JWT_SECRET) -> Dict[str, Any]:
+    # Copy so callers can't alter the cached payload
+    payload = dict(_verify_jwt_signature(token, secret))
     exp = payload.get("exp")
     if exp and int(time.time()) > int(exp):
         raise ValueError("token_expired")
     return payload
 
 
-def parse_init_data(init_data: str) -> Dict[str, Any]:
-    data = dict(parse_qsl(init_data, strict_parsing=True))
+def _parse_init_fields(init_data: str) -> Dict[str, str]:
+    """Split initData into a dict, matching dict(parse_qsl(init_data, strict_parsing=True)).
+
+    initData is a flat query string, so a single split/partition pass does the job
+    without urllib's generic parser.
+    """
+    fields = {}
+    if not init_data:
+        return fields
+    for part in init_data.split("&"):
+        key, eq, value = part.partition("=")
+        if not eq:
+            raise ValueError(f"bad query field: {part!r}")
+        # parse_qsl drops blank values unless keep_blank_values is set
+        if value:
+            fields[unquote_plus(key)] = unquote_plus(value)
+    return fields
+
+
+def _decode_init_fields(data: Dict[str, Any]) -> Dict[str, Any]:
     if "user" in data:
         try:
             data["user"] = json.loads(data["user"])
@@ -58,20 +103,31 @@ def parse_init_data(init_data: str) -> Dict[str, Any]:
     return data
 
 
+def parse_init_data(init_data: str) -> Dict[str, Any]:
+    return _decode_init_fields(_parse_init_fields(init_data))
+
+
+@lru_cache(maxsize=4)
+def _derive_webapp_secret(bot_token: str) -> bytes:
+    # Telegram Web App secret key: HMAC-SHA256 of the bot token keyed by "WebAppData".
+    # Depends only on the token, so it's computed once per token
+    return hmac.digest(b"WebAppData", bot_token.encode(), "sha256")
+
+
 def verify_init_data(init_data: str, bot_token: str, max_age: int = 86400) -> Dict[str, Any]:
-    data = dict(parse_qsl(init_data, strict_parsing=True))
-    received_hash = data.pop("hash", None)
+    data = _parse_init_fields(init_data)
+    received_hash = data.get("hash")
     if not received_hash:
         raise ValueError("missing_hash")
-    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(data.items()))
+    data_check_string = "\n".join([k + "=" + v for k, v in sorted(data.items()) if k != "hash"])
     
-    # Correct Telegram Web App secret key calculation
-    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
-    calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    secret_key = _derive_webapp_secret(bot_token)
+    calculated_hash = hmac.digest(secret_key, data_check_string.encode(), "sha256").hex()
     
     if not hmac.compare_digest(calculated_hash, received_hash):
         raise ValueError("invalid_hash")
-    auth_date = int(data.get("auth_date", "0") or 0)
-    if max_age and auth_date and time.time() - auth_date > max_age:
+    auth_date = data.get("auth_date")
+    if max_age and auth_date and time.time() - int(auth_date) > max_age:
         raise ValueError("init_data_expired")
-    return parse_init_data(init_data)
+    # Same fields as parse_init_data(init_data), without parsing the string again
+    return _decode_init_fields(data)
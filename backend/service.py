@@ -4,7 +4,7 @@ from typing import Dict, Any, List, Optional, Tuple
 
 from backend.db import get_conn
 import config
-from shared_constants import CLUBS_DATA, INTERESTS
+from shared_constants import CLUBS_DATA, INTERESTS_SET, CLUB_LABEL_BY_KEY, CLUB_KEYS, CLUB_NAMES, CLUB_BADGES
 
 
 def resolve_club_entry(club_value: Optional[str]) -> Optional[Dict[str, Any]]:
@@ -15,12 +15,9 @@ def resolve_club_entry(club_value: Optional[str]) -> Optional[Dict[str, Any]]:
         if isinstance(data, dict):
             return {"key": club_value, "label": data.get("name", club_value), "badge": data.get("badge")}
         return {"key": club_value, "label": str(data), "badge": None}
-    for key, data in CLUBS_DATA.items():
-        if not isinstance(data, dict):
-            continue
-        name = data.get("name", "")
+    for key, name, badge in zip(CLUB_KEYS, CLUB_NAMES, CLUB_BADGES):
         if name == club_value or key.lower() in str(club_value).lower() or str(club_value) in name:
-            return {"key": key, "label": name or key, "badge": data.get("badge")}
+            return {"key": key, "label": name or key, "badge": badge}
     return None
 
 
@@ -121,13 +118,51 @@ def adjust_balance(user_id: int, amount: int) -> int:
     return int(row.get("coin_balance") or 0) if row else 0
 
 
+def ensure_users_bulk(users: List[Tuple[int, Optional[str]]]) -> None:
+    """Insert new users / refresh usernames for a batch in one transaction (no referral handling)."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for user_id, username in users:
+                cur.execute(
+                    "INSERT INTO users (user_id, username) VALUES (%s, %s) "
+                    "ON CONFLICT (user_id) DO UPDATE SET username = EXCLUDED.username",
+                    (user_id, username),
+                )
+        conn.commit()
+
+
+def adjust_balances_bulk(amounts: Dict[int, int]) -> None:
+    """Apply many balance deltas in one transaction."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for user_id, amount in amounts.items():
+                cur.execute(
+                    "INSERT INTO users (user_id, coin_balance) VALUES (%s, %s) "
+                    "ON CONFLICT (user_id) DO UPDATE SET coin_balance = coin_balance + EXCLUDED.coin_balance",
+                    (user_id, amount),
+                )
+        conn.commit()
+
+
 def get_balance(user_id: int) -> int:
     user = get_user(user_id)
     return int(user.get("coin_balance") or 0) if user else 0
 
 
 def build_me_response(user_id: int) -> Dict[str, Any]:
-    user = get_user(user_id)
+    # User row and referral count in one round-trip
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT u.*,
+                    (SELECT COUNT(*) FROM users WHERE invited_by = u.user_id) AS invite_count
+                FROM users u
+                WHERE u.user_id = %s
+                """,
+                (user_id,),
+            )
+            user = cur.fetchone()
     if not user:
         role = "owner" if user_id and user_id == getattr(config, "OWNER_ID", 0) else "member"
         return {"id": user_id, "username": None, "role": role, "club": None, "interests": [], "coins": 0}
@@ -138,11 +173,7 @@ def build_me_response(user_id: int) -> Dict[str, Any]:
     interests_raw = user.get("interests") or ""
     interests = [i for i in interests_raw.split(",") if i]
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT COUNT(*) AS cnt FROM users WHERE invited_by = %s", (user_id,))
-            row = cur.fetchone()
-            invite_count = int(row.get("cnt") or 0) if row else 0
+    invite_count = int(user.pop("invite_count") or 0)
 
     role = (user.get("role") or "MEMBER").lower()
     if user_id and user_id == getattr(config, "OWNER_ID", 0):
@@ -168,13 +199,13 @@ def update_me(user_id: int, club_key: Optional[str], interests: Optional[List[st
             if club_key is not None:
                 if club_key == "":
                     club_value = None
-                elif club_key in CLUBS_DATA:
-                    club_value = CLUBS_DATA[club_key]["name"]
+                elif club_key in CLUB_LABEL_BY_KEY:
+                    club_value = CLUB_LABEL_BY_KEY[club_key]
                 else:
                     raise ValueError("invalid_club")
                 cur.execute("UPDATE users SET club = %s WHERE user_id = %s", (club_value, user_id))
             if interests is not None:
-                filtered = [i for i in interests if i in INTERESTS]
+                filtered = [i for i in interests if i in INTERESTS_SET]
                 interests_value = ",".join(filtered)
                 cur.execute("UPDATE users SET interests = %s WHERE user_id = %s", (interests_value, user_id))
         conn.commit()
@@ -590,6 +621,25 @@ def record_link_click(user_id: int, link_id: int) -> bool:
     return inserted
 
 
+def claim_link_click_reward(user_id: int, link_id: int, reward: int) -> bool:
+    """Record the click and credit the reward in one transaction. False if already claimed."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO link_clicks (user_id, link_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                (user_id, link_id),
+            )
+            credited = cur.rowcount > 0
+            if credited and reward:
+                cur.execute(
+                    "INSERT INTO users (user_id, coin_balance) VALUES (%s, %s) "
+                    "ON CONFLICT (user_id) DO UPDATE SET coin_balance = coin_balance + EXCLUDED.coin_balance",
+                    (user_id, reward),
+                )
+        conn.commit()
+    return credited
+
+
 def has_user_clicked_link(user_id: int, link_id: int) -> bool:
     with get_conn() as conn:
         with conn.cursor() as cur:
@@ -609,6 +659,49 @@ def record_reaction_reward(user_id: int, message_id: int, chat_id: int) -> bool:
     return inserted
 
 
+def claim_reaction_reward(user_id: int, message_id: int, chat_id: int, reward: int) -> bool:
+    """Record the reaction and credit the reward in one transaction. False if already rewarded."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO reaction_rewards (user_id, message_id, chat_id) VALUES (%s, %s, %s) ON CONFLICT DO NOTHING",
+                (user_id, message_id, chat_id),
+            )
+            credited = cur.rowcount > 0
+            if credited and reward:
+                cur.execute(
+                    "INSERT INTO users (user_id, coin_balance) VALUES (%s, %s) "
+                    "ON CONFLICT (user_id) DO UPDATE SET coin_balance = coin_balance + EXCLUDED.coin_balance",
+                    (user_id, reward),
+                )
+        conn.commit()
+    return credited
+
+
+def claim_reaction_rewards_bulk(items: List[Tuple[int, int, int]], reward: int) -> int:
+    """Record many (user_id, message_id, chat_id) reactions and credit the new ones
+    in one transaction. Returns how many were credited."""
+    credits: Dict[int, int] = {}
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for user_id, message_id, chat_id in items:
+                cur.execute(
+                    "INSERT INTO reaction_rewards (user_id, message_id, chat_id) VALUES (%s, %s, %s) ON CONFLICT DO NOTHING",
+                    (user_id, message_id, chat_id),
+                )
+                if cur.rowcount > 0:
+                    credits[user_id] = credits.get(user_id, 0) + 1
+            if reward:
+                for user_id, count in credits.items():
+                    cur.execute(
+                        "INSERT INTO users (user_id, coin_balance) VALUES (%s, %s) "
+                        "ON CONFLICT (user_id) DO UPDATE SET coin_balance = coin_balance + EXCLUDED.coin_balance",
+                        (user_id, reward * count),
+                    )
+        conn.commit()
+    return sum(credits.values())
+
+
 def has_user_reacted(user_id: int, message_id: int) -> bool:
     with get_conn() as conn:
         with conn.cursor() as cur:
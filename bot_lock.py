@@ -0,0 +1,46 @@
+"""
+Single-instance lock shared by main.py and stop_bot.py.
+
+bot.lock holds the running instance's PID. The OS lock on it (not the file's
+existence) is what marks an instance as running, so a crash can't leave a
+stale "running" state behind.
+"""
+import sys
+from pathlib import Path
+
+LOCK_FILE = Path("bot.lock")
+# Windows locks byte ranges and a locked range can't be read, so the lock
+# sits well past the PID at the start of the file
+_WINDOWS_LOCK_OFFSET = 4096
+
+def try_lock(f):
+    """Take the lock on open file f without blocking. Raises OSError if it's held."""
+    if sys.platform == "win32":
+        import msvcrt
+        f.seek(_WINDOWS_LOCK_OFFSET)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        finally:
+            f.seek(0)
+    else:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+def unlock(f):
+    """Release a lock taken with try_lock (closing f also releases it)."""
+    if sys.platform == "win32":
+        import msvcrt
+        f.seek(_WINDOWS_LOCK_OFFSET)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.seek(0)
+    else:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+def read_pid(f):
+    """PID recorded in the lock file, or None if missing/unreadable."""
+    try:
+        f.seek(0)
+        return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
@@ -1,4 +1,6 @@
+import asyncio
 import base64
+import copy
 import hashlib
 import hmac
 import json
@@ -15,6 +17,27 @@ JWT_SECRET = os.getenv("JWT_SECRET") or (config.BOT_TOKEN or "change_me")
 BOT_SERVICE_TOKEN = os.getenv("BOT_SERVICE_TOKEN") or config.BOT_SERVICE_TOKEN or ""
 
 
+class BotApiError(RuntimeError):
+    """Backend request failed: not configured, unreachable, timed out or returned an error status.
+
+    status is the HTTP error status if the backend answered. sent is False when the
+    request never reached the backend, so it certainly wasn't applied; a sent request
+    with no status (timeout, dropped connection) may or may not have been.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, sent: bool = True):
+        super().__init__(message)
+        self.status = status
+        self.sent = sent
+
+    @property
+    def maybe_applied(self) -> bool:
+        return self.sent and self.status is None
+
+# In-flight bot GETs: {(path, params): Task}
+_INFLIGHT_BOT_GETS: Dict[Any, "asyncio.Future[Dict[str, Any]]"] = {}
+
+
 def _b64url_encode(data: bytes) -> str:
     return base64.urlsafe_b64encode(data).decode().rstrip("=")
 
@@ -40,12 +63,12 @@ async def api_request(
     as_bot: bool = False
 ) -> Dict[str, Any]:
     if not API_BASE_URL:
-        raise RuntimeError("API base URL not configured")
+        raise BotApiError("API base URL not configured", sent=False)
     url = f"{API_BASE_URL}{path}"
     headers = {}
     if as_bot:
         if not BOT_SERVICE_TOKEN:
-            raise RuntimeError("Bot service token not configured")
+            raise BotApiError("Bot service token not configured", sent=False)
         headers["X-Bot-Token"] = BOT_SERVICE_TOKEN
     if user_id is not None:
         token = create_jwt({"sub": int(user_id)}, JWT_SECRET)
@@ -53,22 +76,29 @@ async def api_request(
     if json_body is not None:
         headers["Content-Type"] = "application/json"
     timeout = aiohttp.ClientTimeout(total=10)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.request(method, url, json=json_body, params=params, headers=headers) as resp:
-            text = await resp.text()
-            if resp.status >= 400:
-                try:
-                    data = json.loads(text) if text else {}
-                except Exception:
-                    data = {}
-                error = data.get("error") or f"API error {resp.status}"
-                raise RuntimeError(error)
-            if not text:
-                return {}
-            try:
-                return json.loads(text)
-            except Exception:
-                return {}
+    try:
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.request(method, url, json=json_body, params=params, headers=headers) as resp:
+                text = await resp.text()
+                status = resp.status
+    except aiohttp.ClientConnectorError as e:
+        # Couldn't connect, so nothing was sent
+        raise BotApiError(f"{method} {path} failed: {e!r}", sent=False) from e
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise BotApiError(f"{method} {path} failed: {e!r}") from e
+    if status >= 400:
+        try:
+            data = json.loads(text) if text else {}
+        except ValueError:
+            data = {}
+        error = (data.get("error") if isinstance(data, dict) else None) or f"API error {status}"
+        raise BotApiError(error, status=status)
+    if not text:
+        return {}
+    try:
+        return json.loads(text)
+    except ValueError:
+        return {}
 
 
 async def api_get(path: str, user_id: Optional[int] = None, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -80,7 +110,16 @@ async def api_post(path: str, user_id: Optional[int] = None, json_body: Optional
 
 
 async def api_bot_get(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    return await api_request("GET", path, params=params, as_bot=True)
+    """GET as the bot; concurrent identical requests share one round-trip."""
+    key = (path, tuple(sorted(params.items())) if params else ())
+    task = _INFLIGHT_BOT_GETS.get(key)
+    if task is None:
+        task = asyncio.ensure_future(api_request("GET", path, params=params, as_bot=True))
+        _INFLIGHT_BOT_GETS[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT_BOT_GETS.pop(key, None))
+    # Shield so one cancelled caller doesn't cancel the fetch for the others;
+    # each caller gets its own copy since some mutate the result
+    return copy.deepcopy(await asyncio.shield(task))
 
 
 async def api_bot_post(path: str, json_body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
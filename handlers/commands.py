@@ -1,11 +1,10 @@
 from telegram import Update, ChatPermissions, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
 import time
-import asyncio
 from handlers.api_client import api_post, api_get, api_bot_get, api_bot_post
 import config
 from handlers.roles import get_user_role, check_role, ROLE_MOD, ROLE_ADMIN
-from handlers.utils import send_ephemeral_reply, delete_message_later, EPHEMERAL_DELAY, edit_or_ephemeral, ADMIN_EPHEMERAL_DELAY, private_only
+from handlers.utils import send_ephemeral_reply, schedule_delete, EPHEMERAL_DELAY, edit_or_ephemeral, ADMIN_EPHEMERAL_DELAY, private_only
 
 # Helper to get target user (Returns DB User Tuple or Telegram User Object)
 async def get_target_user_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -187,7 +186,7 @@ async def mute_user_logic_by_id(chat, user_id, name, duration_minutes, context=N
         msg = await chat.send_message(f"🚫 <b>{name}</b> muted for {duration_minutes} minutes.", parse_mode="HTML")
         try:
             if context and getattr(chat, "type", None) in ["group", "supergroup"]:
-                asyncio.create_task(delete_message_later(msg, EPHEMERAL_DELAY))
+                schedule_delete(msg, EPHEMERAL_DELAY)
         except Exception:
             pass
     except Exception as e:
@@ -1,3 +1,7 @@
+import asyncio
+from functools import lru_cache
+from operator import itemgetter
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from telegram.ext import ContextTypes
 from handlers.roles import get_user_role, check_role, ROLE_MOD, ROLE_ADMIN
@@ -9,12 +13,134 @@ from handlers.utils import (
     send_ephemeral_message,
     ADMIN_EPHEMERAL_DELAY,
     build_webapp_url,
-    build_webapp_url_with_query
+    build_webapp_url_with_query,
+    CachedInlineKeyboardMarkup
 )
-from handlers.api_client import api_get, api_post
+from handlers.api_client import api_get, api_post, api_bot_get
 import config
 from shared_constants import EPL_TEAMS, CLUBS_DATA
 
+# Match cards are broadcast to all groups concurrently. The Application is built with a
+# larger HTTPX connection pool (see main.py) so these sends don't queue on pool acquisition;
+# pool_timeout bounds how long a single send waits for a free connection.
+BROADCAST_POOL_TIMEOUT = 5.0
+
+# Active match rows from /admin/matches/active
+_MATCH_ROW_FIELDS = itemgetter("match_id", "team_a", "team_b", "status")
+_STATUS_ICONS = {"OPEN": "🟢", "CLOSED": "🟡"}
+
+# Match admin / match card button labels
+_LABEL_CLOSE_BETS = "🔒 Close Bets"
+_LABEL_SET_SCORE = "📊 Set Score"
+_LABEL_DRAW = "🤝 Draw"
+_LABEL_DELETE_MATCH = "🗑️ Delete Match"
+_LABEL_PREDICT_SCORE = "🔢 Predict Exact Score"
+_LABEL_NOTIFY = "🔔 Notify Me"
+
+# Constant menus (serialized once, see CachedInlineKeyboardMarkup)
+_CLOSE_MARKUP = CachedInlineKeyboardMarkup([[InlineKeyboardButton("❌ Close", callback_data="close")]])
+_ADMIN_BACK_MARKUP = CachedInlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")]])
+_PREDICTIONS_MENU_MARKUP = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("➕ New Prediction", callback_data="pred_menu_new")],
+    [InlineKeyboardButton("📌 My Open Picks", callback_data="pred_menu_open")],
+    [InlineKeyboardButton("❌ Close", callback_data="close")]
+])
+_MOD_PANEL_MARKUP = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("ℹ️ Warn: /warn @user", callback_data="info_warn")],
+    [InlineKeyboardButton("ℹ️ Mute: /mute @user [mins]", callback_data="info_mute")],
+    [InlineKeyboardButton("ℹ️ Unmute: /unmute @user", callback_data="info_unmute")],
+    [InlineKeyboardButton("ℹ️ Reset Warns: /resetwarn @user", callback_data="info_reset")],
+    [InlineKeyboardButton("🔙 Back", callback_data="cmd_back_menu")]
+])
+_ADMIN_PANEL_MARKUP = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("➕ New Match", callback_data="admin_newmatch_start")],
+    [InlineKeyboardButton("📋 Manage Matches", callback_data="admin_manage_matches")],
+    [InlineKeyboardButton("📡 Dave.sport Feed", callback_data="admin_davesport_feed")],
+    [InlineKeyboardButton("📢 Broadcast", callback_data="info_broadcast")],
+    [InlineKeyboardButton("💰 Give Coins", callback_data="info_givecoins")],
+    [InlineKeyboardButton("👑 Set Role", callback_data="info_setrole")],
+    [InlineKeyboardButton("🔙 Back", callback_data="cmd_back_menu")]
+])
+_NEWMATCH_WIZARD_MARKUP = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("🏴‍☠️ Premier League", callback_data="wizard_league_epl")],
+    [InlineKeyboardButton("🇪🇸 La Liga", callback_data="wizard_league_laliga")],
+    [InlineKeyboardButton("🇮🇹 Serie A", callback_data="wizard_league_seriea")],
+    [InlineKeyboardButton("🇩🇪 Bundesliga", callback_data="wizard_league_bundesliga")],
+    [InlineKeyboardButton("🇫🇷 Ligue 1", callback_data="wizard_league_ligue1")],
+    [InlineKeyboardButton("⚽ Champions League", callback_data="wizard_league_ucl")],
+    [InlineKeyboardButton("✏️ Custom Teams", callback_data="wizard_custom")],
+    [InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")]
+])
+_FEED_MARKUP_SUBBED = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("❌ Unsubscribe", callback_data="admin_feed_unsub")],
+    [InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")]
+])
+_FEED_MARKUP_UNSUBBED = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Subscribe", callback_data="admin_feed_sub")],
+    [InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")]
+])
+
+# Static panel bodies
+_MOD_PANEL_TEXT = (
+    "🛡️ <b>Mod Panel</b>\n\n"
+    "Reply to a user's message or mention @username:\n"
+)
+_ADMIN_PANEL_TEXT = (
+    "⚡ <b>Admin Panel</b>\n\n"
+    "Select an action:"
+)
+_NEWMATCH_WIZARD_TEXT = (
+    "⚽ <b>Create New Match</b>\n\n"
+    "Select a league or enter custom teams:\n\n"
+    "<i>Or use command:</i>\n"
+    "<code>/newmatch Team A vs Team B 15:00</code>"
+)
+_FEED_TEXT_TEMPLATE = (
+    "📡 <b>Dave.sport Feed</b>\n\n"
+    "Status: {status}\n\n"
+    "<b>Sources (locked):</b>\n"
+    "• 📱 X/Twitter: @davedotsport\n"
+    "• 📰 Website: davedotsport.com\n\n"
+    "<i>New content is auto-posted every 5 minutes</i>\n"
+    "<i>Articles are delivered only to Telegram topics</i>\n\n"
+    "<b>Commands:</b>\n"
+    "/subscribe - Enable feed\n"
+    "/unsubscribe - Disable feed\n"
+    "/feedstatus - Check status"
+)
+_FEED_TEXT_SUBBED = _FEED_TEXT_TEMPLATE.format(status="✅ Active")
+_FEED_TEXT_UNSUBBED = _FEED_TEXT_TEMPLATE.format(status="❌ Inactive")
+
+def _build_match_admin_markup(match_id, team1: str, team2: str) -> InlineKeyboardMarkup:
+    """Admin panel for a freshly created match."""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(_LABEL_CLOSE_BETS, callback_data=f"adm_close_{match_id}"),
+            InlineKeyboardButton(_LABEL_SET_SCORE, callback_data=f"adm_score_{match_id}")
+        ],
+        [
+            InlineKeyboardButton(f"🏆 {team1} Wins", callback_data=f"adm_res_{match_id}_A"),
+            InlineKeyboardButton(_LABEL_DRAW, callback_data=f"adm_res_{match_id}_DRAW"),
+            InlineKeyboardButton(f"🏆 {team2} Wins", callback_data=f"adm_res_{match_id}_B")
+        ],
+        [InlineKeyboardButton(_LABEL_DELETE_MATCH, callback_data=f"adm_delete_{match_id}")]
+    ])
+
+def _build_group_match_markup(match_id, team1: str, team2: str, stats_button=None) -> InlineKeyboardMarkup:
+    """Prediction buttons for the match card posted to groups."""
+    stats_row = [InlineKeyboardButton(_LABEL_NOTIFY, callback_data=f"pred_{match_id}_notify")]
+    if stats_button:
+        stats_row.append(stats_button)
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(f"🏠 {team1}", callback_data=f"pred_{match_id}_A"),
+            InlineKeyboardButton(_LABEL_DRAW, callback_data=f"pred_{match_id}_DRAW"),
+            InlineKeyboardButton(f"✈️ {team2}", callback_data=f"pred_{match_id}_B")
+        ],
+        [InlineKeyboardButton(_LABEL_PREDICT_SCORE, callback_data=f"pred_{match_id}_SCORE")],
+        stats_row
+    ])
+
 def webapp_button(label: str, path: str):
     url = build_webapp_url(path)
     if not url:
@@ -119,6 +245,74 @@ Articles are delivered only to Telegram topics
 """
     await send_ephemeral_reply(update, context, help_text, parse_mode="HTML")
 
+# Admin panel "info_*" help screens; any other info_ button is a mod panel hint
+_INFO_TEXTS = {
+    "info_broadcast": (
+        "📢 <b>Broadcast Message</b>\n\n"
+        "<b>Usage:</b>\n"
+        "• <code>/postarticle Your message here</code>\n"
+        "• Or reply to any message with <code>/postarticle</code>\n\n"
+        "This will send the message to all groups where the bot is active."
+    ),
+    "info_givecoins": (
+        "💰 <b>Give Coins</b>\n\n"
+        "<b>Usage:</b> Reply to a user's message with:\n"
+        "<code>/givecoins &lt;amount&gt;</code>\n\n"
+        "Example: <code>/givecoins 100</code>"
+    ),
+    "info_setrole": (
+        "👑 <b>Set User Role</b>\n\n"
+        "<b>Usage:</b> Reply to a user's message with:\n"
+        "<code>/setrole &lt;role&gt;</code>\n\n"
+        "<b>Available roles:</b>\n"
+        "• <code>MEMBER</code> - Regular user\n"
+        "• <code>MOD</code> - Moderator\n"
+        "• <code>ADMIN</code> - Administrator\n"
+        "• <code>OWNER</code> - Bot owner"
+    ),
+}
+
+async def _handle_info(query, data):
+    text = _INFO_TEXTS.get(data)
+    if text is None:
+        # Generic info handler for mod panel buttons
+        await query.answer("Use the command shown on the button")
+        return
+    await edit_or_ephemeral(
+        query.message,
+        text,
+        reply_markup=_ADMIN_BACK_MARKUP,
+        parse_mode="HTML",
+        delay=ADMIN_EPHEMERAL_DELAY
+    )
+
+_NO_WEBAPP_ALERT = "Web app not configured."
+
+async def _no_webapp(query):
+    await query.answer(_NO_WEBAPP_ALERT, show_alert=True)
+
+# cmd_* buttons that just point at a Web App page: data -> (prompt, path)
+_WEBAPP_PROMPTS = {
+    "cmd_leaderboard": ("🌐 <b>Open the Web App</b> for leaderboards and history:", "/leaderboards"),
+    "cmd_mypredictions": ("🌐 <b>Open the Web App</b> for your prediction history:", "/predictions"),
+    "cmd_predboard": ("🌐 <b>Open the Web App</b> for prediction analytics:", "/leaderboards"),
+    "cmd_invite": ("🌐 <b>Open the Web App</b> for invites & referrals:", "/profile"),
+    "cmd_setup": ("🌐 <b>Open the Web App</b> to manage your profile & identity:", "/profile"),
+    "cmd_userinfo": ("🌐 <b>Open the Web App</b> for profile details:", "/profile"),
+    "cmd_notifications": ("🌐 <b>Open the Web App</b> to manage notifications:", "/profile"),
+}
+
+async def _show_webapp_prompt(query, text, path):
+    if not config.WEBAPP_URL:
+        await _no_webapp(query)
+        return
+    await edit_or_ephemeral(
+        query.message,
+        text,
+        reply_markup=InlineKeyboardMarkup([[webapp_button("🌐 Open Web App", path)]]),
+        parse_mode="HTML"
+    )
+
 async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles menu button clicks"""
     query = update.callback_query
@@ -134,6 +328,17 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
     if data == "menu_my_rank":
         await show_my_rank(query, user.id)
         return
+
+    # Resolve info_* buttons up front instead of walking the whole elif chain
+    if data.startswith("info_"):
+        await _handle_info(query, data)
+        return
+
+    prompt = _WEBAPP_PROMPTS.get(data)
+    if prompt:
+        await _show_webapp_prompt(query, *prompt)
+        return
+
     if data == "cmd_balance":
         from handlers.economy import balance_command
         # Create a fake update with message for balance command
@@ -173,89 +378,12 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
     elif data == "leaderboard_my_rank":
         await show_my_rank(query, user.id)
         
-    elif data == "cmd_leaderboard":
-        if config.WEBAPP_URL:
-            await edit_or_ephemeral(
-                query.message,
-                "🌐 <b>Open the Web App</b> for leaderboards and history:",
-                reply_markup=InlineKeyboardMarkup([[webapp_button("🌐 Open Web App", "/leaderboards")]]),
-                parse_mode="HTML"
-            )
-        else:
-            await query.answer("Web app not configured.", show_alert=True)
-        
     elif data == "cmd_matches":
         await show_matches_inline(query)
         
-    elif data == "cmd_mypredictions":
-        if config.WEBAPP_URL:
-            await edit_or_ephemeral(
-                query.message,
-                "🌐 <b>Open the Web App</b> for your prediction history:",
-                reply_markup=InlineKeyboardMarkup([[webapp_button("🌐 Open Web App", "/predictions")]]),
-                parse_mode="HTML"
-            )
-        else:
-            await query.answer("Web app not configured.", show_alert=True)
-        
-    elif data == "cmd_predboard":
-        if config.WEBAPP_URL:
-            await edit_or_ephemeral(
-                query.message,
-                "🌐 <b>Open the Web App</b> for prediction analytics:",
-                reply_markup=InlineKeyboardMarkup([[webapp_button("🌐 Open Web App", "/leaderboards")]]),
-                parse_mode="HTML"
-            )
-        else:
-            await query.answer("Web app not configured.", show_alert=True)
-        
-    elif data == "cmd_invite":
-        if config.WEBAPP_URL:
-            await edit_or_ephemeral(
-                query.message,
-                "🌐 <b>Open the Web App</b> for invites & referrals:",
-                reply_markup=InlineKeyboardMarkup([[webapp_button("🌐 Open Web App", "/profile")]]),
-                parse_mode="HTML"
-            )
-        else:
-            await query.answer("Web app not configured.", show_alert=True)
-        
-    elif data == "cmd_setup":
-        if config.WEBAPP_URL:
-            await edit_or_ephemeral(
-                query.message,
-                "🌐 <b>Open the Web App</b> to manage your profile & identity:",
-                reply_markup=InlineKeyboardMarkup([[webapp_button("🌐 Open Web App", "/profile")]]),
-                parse_mode="HTML"
-            )
-        else:
-            await query.answer("Web app not configured.", show_alert=True)
-        
-    elif data == "cmd_userinfo":
-        if config.WEBAPP_URL:
-            await edit_or_ephemeral(
-                query.message,
-                "🌐 <b>Open the Web App</b> for profile details:",
-                reply_markup=InlineKeyboardMarkup([[webapp_button("🌐 Open Web App", "/profile")]]),
-                parse_mode="HTML"
-            )
-        else:
-            await query.answer("Web app not configured.", show_alert=True)
-        
     elif data == "cmd_help":
         await show_help_inline(query)
     
-    elif data == "cmd_notifications":
-        if config.WEBAPP_URL:
-            await edit_or_ephemeral(
-                query.message,
-                "🌐 <b>Open the Web App</b> to manage notifications:",
-                reply_markup=InlineKeyboardMarkup([[webapp_button("🌐 Open Web App", "/profile")]]),
-                parse_mode="HTML"
-            )
-        else:
-            await query.answer("Web app not configured.", show_alert=True)
-        
     elif data == "cmd_modpanel":
         await show_mod_panel(query)
         
@@ -344,10 +472,13 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
             return
         
         # Create the match via backend
-        from handlers.predictions import create_match_db
-        import config
-        
-        match_id = create_match_db(team1, team2)
+        from handlers.predictions import create_match_api
+
+        try:
+            match_id = await create_match_api(team1, team2)
+        except Exception:
+            await query.answer("⚠️ Failed to create match", show_alert=True)
+            return
         league_name = LEAGUE_NAMES.get(league, "⚽ Football")
         
         # Confirm to admin in private chat
@@ -362,26 +493,13 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
         )
         
         # Send admin panel to private chat
-        admin_keyboard = [
-            [
-                InlineKeyboardButton("🔒 Close Bets", callback_data=f"adm_close_{match_id}"),
-                InlineKeyboardButton("📊 Set Score", callback_data=f"adm_score_{match_id}")
-            ],
-            [
-                InlineKeyboardButton(f"🏆 {team1} Wins", callback_data=f"adm_res_{match_id}_A"),
-                InlineKeyboardButton("🤝 Draw", callback_data=f"adm_res_{match_id}_DRAW"),
-                InlineKeyboardButton(f"🏆 {team2} Wins", callback_data=f"adm_res_{match_id}_B")
-            ],
-            [InlineKeyboardButton("🗑️ Delete Match", callback_data=f"adm_delete_{match_id}")]
-        ]
-        
         await send_ephemeral_message(
             context,
             chat_id=query.message.chat_id,
             text=f"🛠️ <b>Match #{match_id} Admin Panel</b>\n"
                  f"{team1} vs {team2}\n\n"
                  f"<i>Use these buttons to manage the match</i>",
-            reply_markup=InlineKeyboardMarkup(admin_keyboard),
+            reply_markup=_build_match_admin_markup(match_id, team1, team2),
             parse_mode="HTML",
             delay=ADMIN_EPHEMERAL_DELAY
         )
@@ -395,22 +513,6 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
                 web_app=WebAppInfo(url=build_webapp_url("/leaderboards"))
             )
 
-        stats_row = [InlineKeyboardButton("🔔 Notify Me", callback_data=f"pred_{match_id}_notify")]
-        if stats_button:
-            stats_row.append(stats_button)
-
-        group_keyboard = [
-            [
-                InlineKeyboardButton(f"🏠 {team1}", callback_data=f"pred_{match_id}_A"),
-                InlineKeyboardButton("🤝 Draw", callback_data=f"pred_{match_id}_DRAW"),
-                InlineKeyboardButton(f"✈️ {team2}", callback_data=f"pred_{match_id}_B")
-            ],
-            [
-                InlineKeyboardButton("🔢 Predict Exact Score", callback_data=f"pred_{match_id}_SCORE")
-            ],
-            stats_row
-        ]
-        
         match_card = (
             f"🏆 <b>NEW MATCH PREDICTION!</b>\n"
             f"────────────────────\n\n"
@@ -432,20 +534,24 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
             groups = [g["chat_id"] for g in groups_data if isinstance(g, dict) and g.get("enabled")]
         except Exception:
             groups = []
-        posted_count = 0
-        
-        for chat_id in groups:
+        group_markup = _build_group_match_markup(match_id, team1, team2, stats_button)
+
+        async def post_card(chat_id):
             try:
                 await context.bot.send_message(
                     chat_id=chat_id,
                     text=match_card,
-                    reply_markup=InlineKeyboardMarkup(group_keyboard),
-                    parse_mode="HTML"
+                    reply_markup=group_markup,
+                    parse_mode="HTML",
+                    pool_timeout=BROADCAST_POOL_TIMEOUT
                 )
-                posted_count += 1
-            except Exception as e:
+                return True
+            except Exception:
                 # Group might have kicked the bot or doesn't exist
-                pass
+                return False
+
+        results = await asyncio.gather(*(post_card(chat_id) for chat_id in groups))
+        posted_count = sum(results)
         
         # Update admin with broadcast result
         await send_ephemeral_message(
@@ -460,73 +566,22 @@ async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
         # Clear wizard state
         context.user_data.pop("wizard_team1", None)
         context.user_data.pop("wizard_league", None)
-    
-    elif data == "info_broadcast":
-        await edit_or_ephemeral(
-            query.message,
-            "📢 <b>Broadcast Message</b>\n\n"
-            "<b>Usage:</b>\n"
-            "• <code>/postarticle Your message here</code>\n"
-            "• Or reply to any message with <code>/postarticle</code>\n\n"
-            "This will send the message to all groups where the bot is active.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")]]),
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
-    
-    elif data == "info_givecoins":
-        await edit_or_ephemeral(
-            query.message,
-            "💰 <b>Give Coins</b>\n\n"
-            "<b>Usage:</b> Reply to a user's message with:\n"
-            "<code>/givecoins &lt;amount&gt;</code>\n\n"
-            "Example: <code>/givecoins 100</code>",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")]]),
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
-    
-    elif data == "info_setrole":
-        await edit_or_ephemeral(
-            query.message,
-            "👑 <b>Set User Role</b>\n\n"
-            "<b>Usage:</b> Reply to a user's message with:\n"
-            "<code>/setrole &lt;role&gt;</code>\n\n"
-            "<b>Available roles:</b>\n"
-            "• <code>MEMBER</code> - Regular user\n"
-            "• <code>MOD</code> - Moderator\n"
-            "• <code>ADMIN</code> - Administrator\n"
-            "• <code>OWNER</code> - Bot owner",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")]]),
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
-    
-    elif data.startswith("info_"):
-        # Generic info handler for mod panel buttons
-        await query.answer("Use the command shown on the button")
 
 async def show_predictions_menu(query):
-    keyboard = [
-        [InlineKeyboardButton("➕ New Prediction", callback_data="pred_menu_new")],
-        [InlineKeyboardButton("📌 My Open Picks", callback_data="pred_menu_open")],
-        [InlineKeyboardButton("❌ Close", callback_data="close")]
-    ]
     await edit_or_ephemeral(
         query.message,
         "⚽ <b>Predictions</b>\n\nChoose an action:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=_PREDICTIONS_MENU_MARKUP,
         parse_mode="HTML"
     )
 
 async def show_news_menu(query):
-    keyboard = [[InlineKeyboardButton("❌ Close", callback_data="close")]]
     await edit_or_ephemeral(
         query.message,
         "📰 <b>News Delivery</b>\n\n"
         "Articles are delivered only to Telegram topics based on WordPress categories.\n"
         "Open a topic and run <code>/setchatchannel &lt;category&gt;</code> to configure routing.",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=_CLOSE_MARKUP,
         parse_mode="HTML"
     )
 
@@ -599,7 +654,7 @@ async def show_top_headlines(query):
         "📰 <b>News Delivery</b>\n\n"
         "Articles are delivered only to Telegram topics based on WordPress categories.\n"
         "Open a topic and run <code>/setchatchannel &lt;category&gt;</code> to configure routing.",
-        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("❌ Close", callback_data="close")]]),
+        reply_markup=_CLOSE_MARKUP,
         parse_mode="HTML"
     )
 
@@ -821,60 +876,28 @@ async def web_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await send_webapp_link(update, context, text="🌐 Open the Web App for history & analytics.", path="/")
 
 async def show_mod_panel(query):
-    keyboard = [
-        [InlineKeyboardButton("ℹ️ Warn: /warn @user", callback_data="info_warn")],
-        [InlineKeyboardButton("ℹ️ Mute: /mute @user [mins]", callback_data="info_mute")],
-        [InlineKeyboardButton("ℹ️ Unmute: /unmute @user", callback_data="info_unmute")],
-        [InlineKeyboardButton("ℹ️ Reset Warns: /resetwarn @user", callback_data="info_reset")],
-        [InlineKeyboardButton("🔙 Back", callback_data="cmd_back_menu")]
-    ]
     await edit_or_ephemeral(
         query.message,
-        "🛡️ <b>Mod Panel</b>\n\n"
-        "Reply to a user's message or mention @username:\n",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        _MOD_PANEL_TEXT,
+        reply_markup=_MOD_PANEL_MARKUP,
         parse_mode="HTML"
     )
 
 async def show_admin_panel(query):
-    keyboard = [
-        [InlineKeyboardButton("➕ New Match", callback_data="admin_newmatch_start")],
-        [InlineKeyboardButton("📋 Manage Matches", callback_data="admin_manage_matches")],
-        [InlineKeyboardButton("📡 Dave.sport Feed", callback_data="admin_davesport_feed")],
-        [InlineKeyboardButton("📢 Broadcast", callback_data="info_broadcast")],
-        [InlineKeyboardButton("💰 Give Coins", callback_data="info_givecoins")],
-        [InlineKeyboardButton("👑 Set Role", callback_data="info_setrole")],
-        [InlineKeyboardButton("🔙 Back", callback_data="cmd_back_menu")]
-    ]
     await edit_or_ephemeral(
         query.message,
-        "⚡ <b>Admin Panel</b>\n\n"
-        "Select an action:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        _ADMIN_PANEL_TEXT,
+        reply_markup=_ADMIN_PANEL_MARKUP,
         parse_mode="HTML",
         delay=ADMIN_EPHEMERAL_DELAY
     )
 
 async def show_newmatch_wizard(query, context):
     """Shows the new match creation wizard"""
-    keyboard = [
-        [InlineKeyboardButton("🏴‍☠️ Premier League", callback_data="wizard_league_epl")],
-        [InlineKeyboardButton("🇪🇸 La Liga", callback_data="wizard_league_laliga")],
-        [InlineKeyboardButton("🇮🇹 Serie A", callback_data="wizard_league_seriea")],
-        [InlineKeyboardButton("🇩🇪 Bundesliga", callback_data="wizard_league_bundesliga")],
-        [InlineKeyboardButton("🇫🇷 Ligue 1", callback_data="wizard_league_ligue1")],
-        [InlineKeyboardButton("⚽ Champions League", callback_data="wizard_league_ucl")],
-        [InlineKeyboardButton("✏️ Custom Teams", callback_data="wizard_custom")],
-        [InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")]
-    ]
-    
     await edit_or_ephemeral(
         query.message,
-        "⚽ <b>Create New Match</b>\n\n"
-        "Select a league or enter custom teams:\n\n"
-        "<i>Or use command:</i>\n"
-        "<code>/newmatch Team A vs Team B 15:00</code>",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        _NEWMATCH_WIZARD_TEXT,
+        reply_markup=_NEWMATCH_WIZARD_MARKUP,
         parse_mode="HTML",
         delay=ADMIN_EPHEMERAL_DELAY
     )
@@ -886,29 +909,24 @@ async def show_manage_matches(query):
     matches = await get_all_active_matches_api()
     
     if not matches:
-        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")]]
         await edit_or_ephemeral(
             query.message,
             "📋 <b>Manage Matches</b>\n\n"
             "No active matches found.\n\n"
             "Use <b>➕ New Match</b> to create one.",
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=_ADMIN_BACK_MARKUP,
             parse_mode="HTML",
             delay=ADMIN_EPHEMERAL_DELAY
         )
         return
     
-    text = "📋 <b>Active Matches</b>\n\n"
+    lines = []
     keyboard = []
     
     for m in matches[:10]:  # Limit to 10 matches
-        match_id = m.get("match_id")
-        team_a = m.get("team_a")
-        team_b = m.get("team_b")
-        status = m.get("status") or "OPEN"
-        
-        status_icon = "🟢" if status == "OPEN" else "🟡" if status == "CLOSED" else "⚪"
-        text += f"{status_icon} <b>#{match_id}</b>: {team_a} vs {team_b} ({status})\n"
+        match_id, team_a, team_b, status = _MATCH_ROW_FIELDS(m)
+        status = status or "OPEN"
+        lines.append(f"{_STATUS_ICONS.get(status, '⚪')} <b>#{match_id}</b>: {team_a} vs {team_b} ({status})\n")
         
         # Add manage button for each match
         keyboard.append([InlineKeyboardButton(
@@ -918,7 +936,7 @@ async def show_manage_matches(query):
     
     keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")])
     
-    text += "\n<i>Click to manage a match</i>"
+    text = "📋 <b>Active Matches</b>\n\n" + "".join(lines) + "\n<i>Click to manage a match</i>"
     
     await edit_or_ephemeral(query.message, text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="HTML", delay=ADMIN_EPHEMERAL_DELAY)
 
@@ -958,64 +976,68 @@ LEAGUE_NAMES = {
     "ucl": "⭐ Champions League"
 }
 
+def _pack_rows(buttons, width=2):
+    return [buttons[i:i + width] for i in range(0, len(buttons), width)]
+
+# (display name, callback-safe name) per league
+_LEAGUE_SAFE = {
+    league: [(team, team.replace(" ", "_")) for team in teams]
+    for league, teams in LEAGUE_TEAMS.items()
+}
+
+# Home-team pickers never change, so build them once
+_HOME_TEAM_MARKUPS = {
+    league: CachedInlineKeyboardMarkup(
+        _pack_rows([
+            InlineKeyboardButton(team, callback_data=f"wizard_team1_{league}_{team_safe}")
+            for team, team_safe in pairs
+        ])
+        + [[InlineKeyboardButton("🔙 Back", callback_data="admin_newmatch_start")]]
+    )
+    for league, pairs in _LEAGUE_SAFE.items()
+}
+
+@lru_cache(maxsize=256)
+def _opponent_markup(league, team1):
+    """Away-team picker for a league with the already chosen home team left out."""
+    buttons = [
+        InlineKeyboardButton(team, callback_data=f"wizard_team2_{team_safe}")
+        for team, team_safe in _LEAGUE_SAFE.get(league, [])
+        if team_safe != team1
+    ]
+    return CachedInlineKeyboardMarkup(
+        _pack_rows(buttons) + [[InlineKeyboardButton("🔙 Back", callback_data=f"wizard_league_{league}")]]
+    )
+
 async def show_league_teams(query, context, league):
     """Show teams from a league for selection"""
-    teams = LEAGUE_TEAMS.get(league, [])
+    reply_markup = _HOME_TEAM_MARKUPS.get(league)
     league_name = LEAGUE_NAMES.get(league, league.upper())
     
-    if not teams:
+    if reply_markup is None:
         await query.answer("League not found", show_alert=True)
         return
     
-    keyboard = []
-    row = []
-    for team in teams:
-        team_safe = team.replace(" ", "_")
-        row.append(InlineKeyboardButton(team, callback_data=f"wizard_team1_{league}_{team_safe}"))
-        if len(row) == 2:
-            keyboard.append(row)
-            row = []
-    if row:
-        keyboard.append(row)
-    
-    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="admin_newmatch_start")])
-    
     await edit_or_ephemeral(
         query.message,
         f"⚽ <b>{league_name}</b>\n\n"
         "Select the <b>HOME</b> team:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=reply_markup,
         parse_mode="HTML",
         delay=ADMIN_EPHEMERAL_DELAY
     )
 
 async def show_opponent_selection(query, context, league, team1):
     """Show opponent selection after first team is chosen"""
-    teams = LEAGUE_TEAMS.get(league, [])
     league_name = LEAGUE_NAMES.get(league, league.upper())
     team1_display = team1.replace("_", " ")
     
-    keyboard = []
-    row = []
-    for team in teams:
-        if team.replace(" ", "_") == team1:  # Skip the already selected team
-            continue
-        team_safe = team.replace(" ", "_")
-        row.append(InlineKeyboardButton(team, callback_data=f"wizard_team2_{team_safe}"))
-        if len(row) == 2:
-            keyboard.append(row)
-            row = []
-    if row:
-        keyboard.append(row)
-    
-    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data=f"wizard_league_{league}")])
-    
     await edit_or_ephemeral(
         query.message,
         f"⚽ <b>{league_name}</b>\n\n"
         f"🏠 Home: <b>{team1_display}</b>\n\n"
         "Select the <b>AWAY</b> team:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=_opponent_markup(league, team1),
         parse_mode="HTML",
         delay=ADMIN_EPHEMERAL_DELAY
     )
@@ -1026,42 +1048,15 @@ async def show_davesport_feed_panel(query):
     
     # Check subscription status via backend
     try:
-        data = await api_bot_get(f"/admin/groups/{chat_id}/feed-status")
-        is_subscribed = data.get("subscribed", False)
-        twitter_on = data.get("twitter_enabled", False)
-        website_on = data.get("website_enabled", False)
+        is_subscribed = (await api_bot_get(f"/admin/groups/{chat_id}/feed-status")).get("subscribed", False)
     except Exception:
         is_subscribed = False
-        twitter_on = False
-        website_on = False
-    
-    status = "✅ Active" if is_subscribed else "❌ Inactive"
-    
-    keyboard = []
     
-
     if is_subscribed:
-        keyboard.append([InlineKeyboardButton("❌ Unsubscribe", callback_data="admin_feed_unsub")])
+        text, reply_markup = _FEED_TEXT_SUBBED, _FEED_MARKUP_SUBBED
     else:
-        keyboard.append([InlineKeyboardButton("✅ Subscribe", callback_data="admin_feed_sub")])
-    
-    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="cmd_adminpanel")])
-    
-    text = (
-        "📡 <b>Dave.sport Feed</b>\n\n"
-        f"Status: {status}\n\n"
-        "<b>Sources (locked):</b>\n"
-        "• 📱 X/Twitter: @davedotsport\n"
-        "• 📰 Website: davedotsport.com\n\n"
-        "<i>New content is auto-posted every 5 minutes</i>\n"
-        "<i>Articles are delivered only to Telegram topics</i>\n\n"
-        "<b>Commands:</b>\n"
-        "/subscribe - Enable feed\n"
-        "/unsubscribe - Disable feed\n"
-        "/feedstatus - Check status"
-    )
-    
-    await edit_or_ephemeral(query.message, text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="HTML", delay=ADMIN_EPHEMERAL_DELAY)
+        text, reply_markup = _FEED_TEXT_UNSUBBED, _FEED_MARKUP_UNSUBBED
+    await edit_or_ephemeral(query.message, text, reply_markup=reply_markup, parse_mode="HTML", delay=ADMIN_EPHEMERAL_DELAY)
 
 async def show_main_menu_edit(query):
     await edit_or_ephemeral(
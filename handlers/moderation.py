@@ -1,30 +1,83 @@
 from telegram import Update, ChatPermissions, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
-from telegram.constants import ChatMemberStatus
+from telegram.constants import ChatType
 import re
 import time
 import asyncio
+import logging
+from collections import deque
 import config
-from handlers.roles import get_user_role, check_role, ROLE_MOD, ROLE_VIP
-from handlers.api_client import api_bot_post
+from handlers.roles import get_user_role, get_role_value, is_telegram_admin_cached, V_MOD, V_VIP
+from handlers.api_client import api_bot_post, BotApiError
+from handlers.utils import TTLCache, run_in_background, schedule_delete
 
 # Flood & Cooldown Control
-# FLOOD_CACHE: {user_id: [timestamp1, timestamp2]}
-FLOOD_CACHE = {}
+# Both caches are capped at MODERATION_CACHE_SIZE entries so they don't grow
+# with every user ever seen.
+MODERATION_CACHE_SIZE = 10_000
+
+# FLOOD_CACHE: {user_id: deque([timestamp1, timestamp2])} (time.monotonic),
+# dropped once a user has been quiet for several windows
 FLOOD_WINDOW = 5
 FLOOD_LIMIT = 5
+FLOOD_CACHE = TTLCache(MODERATION_CACHE_SIZE, FLOOD_WINDOW * 4)
 
-# COMMENT_COOLDOWN: {user_id: last_comment_timestamp}
-COMMENT_COOLDOWN = {}
+# COMMENT_COOLDOWN: {user_id: True} while the user's last reward is cooling down
 COMMENT_COOLDOWN_SEC = 5 # Minimum seconds between rewarded comments
+COMMENT_COOLDOWN = TTLCache(MODERATION_CACHE_SIZE, COMMENT_COOLDOWN_SEC)
+
+# Per-message backend writes are coalesced and flushed every FLUSH_INTERVAL seconds
+FLUSH_INTERVAL = 0.5
+_ENSURE_BUFFER = {}   # {user_id: username}
+_BALANCE_BUFFER = {}  # {user_id: pending comment reward}
+_flush_task = None
+
+# Warning messages are removed after this many seconds
+WARNING_DELETE_DELAY = 10
+
+# Regex for http/https links
+_URL_RE = re.compile(r'(https?://\S+)')
 
-async def is_user_admin(chat, user_id):
+async def _safe_post(path, json_body):
+    """Backend write whose result isn't needed on the message path. Returns success."""
     try:
-        member = await chat.get_member(user_id)
-        return member.status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]
-    except:
+        await api_bot_post(path, json_body)
+        return True
+    except BotApiError:
         return False
 
+async def _flush_buffers():
+    if _ENSURE_BUFFER:
+        users = [{"user_id": uid, "username": name} for uid, name in _ENSURE_BUFFER.items()]
+        _ENSURE_BUFFER.clear()
+        await _safe_post("/admin/users/ensure-bulk", {"users": users})
+    if _BALANCE_BUFFER:
+        pending = dict(_BALANCE_BUFFER)
+        _BALANCE_BUFFER.clear()
+        items = [{"user_id": uid, "amount": amount} for uid, amount in pending.items()]
+        try:
+            await api_bot_post("/admin/users/balance-bulk", {"items": items})
+        except BotApiError as e:
+            if e.maybe_applied:
+                # Timed out / dropped after sending: the backend may have committed,
+                # and retrying would pay these rewards twice
+                logging.warning(f"Comment reward flush for {len(items)} users had an unknown outcome, not retrying: {e}")
+            else:
+                # Put the rewards back so the next flush retries them
+                for uid, amount in pending.items():
+                    _BALANCE_BUFFER[uid] = _BALANCE_BUFFER.get(uid, 0) + amount
+
+async def _flush_loop():
+    # Exits once both buffers are drained; _schedule_flush restarts it on the next write
+    while _ENSURE_BUFFER or _BALANCE_BUFFER:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        await _flush_buffers()
+
+def _schedule_flush():
+    global _flush_task
+    if _flush_task is None or _flush_task.done():
+        _flush_task = run_in_background(_flush_loop())
+
 async def moderate_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message or not update.message.from_user:
         return
@@ -35,32 +88,32 @@ async def moderate_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     user = update.message.from_user
     chat = update.effective_chat
+    # Moderation and comment rewards only apply in groups
+    if chat.type not in (ChatType.GROUP, ChatType.SUPERGROUP):
+        return
     message_text = update.message.text or update.message.caption or ""
+    # Arrival time for cooldown/flood windows (relative only, so monotonic)
+    current_time = time.monotonic()
     
-    # 1. Track User (ensure user exists in backend)
-    try:
-        await api_bot_post("/admin/users/ensure", {
-            "user_id": user.id,
-            "username": user.username or ""
-        })
-    except Exception:
-        pass
+    # 1. Track User (ensure user exists in backend), batched with other recent senders
+    _ENSURE_BUFFER[user.id] = user.username or ""
+    _schedule_flush()
     
     # 2. Get User Role
-    user_role = await get_user_role(user.id)
-    is_privileged = check_role(user_role, ROLE_MOD) or await is_user_admin(chat, user.id)
+    role_value = get_role_value(await get_user_role(user.id))
+    # Chat-admin status is cached (and invalidated on member updates) in handlers.roles
+    is_privileged = role_value >= V_MOD or await is_telegram_admin_cached(context.bot, chat.id, user.id)
     
     # 3. URL Detection & Auto-Conversion (Admins/Mods Only)
-    # Regex for http/https links
-    url_pattern = re.compile(r'(https?://\S+)')
-    found_urls = url_pattern.findall(message_text)
+    # Cheap substring check first: most messages contain no link at all
+    url_match = _URL_RE.search(message_text) if "http" in message_text else None
     
-    if found_urls:
+    if url_match:
         if is_privileged:
             # -- ADMIN POSTED LINK --
             # Strategy: Add reward buttons so users can earn coins for engaging
             
-            target_url = found_urls[0]  # Take the first link
+            target_url = url_match.group(0)  # Take the first link
             
             # Create Database Entry for tracking via backend
             try:
@@ -71,7 +124,7 @@ async def moderate_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 })
                 link_id = data.get("link_id")
             except Exception as e:
-                print(f"Failed to create tracked link: {e}")
+                logging.warning("Failed to create tracked link: %s", e)
                 return
             
             # Reward button UI - user must open link then claim
@@ -91,7 +144,7 @@ async def moderate_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     parse_mode="HTML"
                 )
             except Exception as e:
-                print(f"Failed to reply with rewards: {e}")
+                logging.warning("Failed to reply with rewards: %s", e)
                 
             return  # Stop processing, we handled the link
 
@@ -100,7 +153,7 @@ async def moderate_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # "Either blocked Or ignored"
             # We will Block (Delete) to enforce clean chat, unless VIP?
             # Let's delete for now to prevent spam.
-            if not check_role(user_role, ROLE_VIP):
+            if role_value < V_VIP:
                 try:
                     await update.message.delete()
                     warning_count = await warn_user_via_api(context, user.id, "sending links")
@@ -112,25 +165,26 @@ async def moderate_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # 4. Comment Rewards (Anti-Spam)
     # Only reward if text is long enough? or just any text.
     # Check cooldown.
-    current_time = time.time()
-    last_comment_time = COMMENT_COOLDOWN.get(user.id, 0)
-    
-    if current_time - last_comment_time > COMMENT_COOLDOWN_SEC:
-        try:
-            await api_bot_post(f"/admin/users/{user.id}/balance", {
-                "amount": config.COMMENT_REWARD,
-                "reason": "comment"
-            })
-            COMMENT_COOLDOWN[user.id] = current_time
-        except Exception:
-            pass
+    # Check and set happen with no await in between, so concurrent messages
+    # from the same user can't both pass the cooldown
+    if not COMMENT_COOLDOWN.get(user.id):
+        COMMENT_COOLDOWN.set(user.id, True)
+        _BALANCE_BUFFER[user.id] = _BALANCE_BUFFER.get(user.id, 0) + config.COMMENT_REWARD
+        _schedule_flush()
         
     # 5. Flood Control (For everyone except Admins)
     if not is_privileged:
-        user_timestamps = FLOOD_CACHE.get(user.id, [])
-        user_timestamps = [t for t in user_timestamps if current_time - t < FLOOD_WINDOW]
+        # Only the last FLOOD_LIMIT + 1 hits matter; one extra slot keeps the
+        # "just crossed the limit" check below from firing again
+        user_timestamps = FLOOD_CACHE.get(user.id)
+        if user_timestamps is None:
+            user_timestamps = deque(maxlen=FLOOD_LIMIT + 2)
+        cutoff = current_time - FLOOD_WINDOW
+        while user_timestamps and user_timestamps[0] <= cutoff:
+            user_timestamps.popleft()
         user_timestamps.append(current_time)
-        FLOOD_CACHE[user.id] = user_timestamps
+        # Re-set on every message so the entry's expiry tracks the latest one
+        FLOOD_CACHE.set(user.id, user_timestamps)
         
         if len(user_timestamps) > FLOOD_LIMIT:
             try:
@@ -185,11 +239,4 @@ async def handle_warning(update, context, user, warning_count, reason):
             parse_mode="HTML"
         )
         # Delete warning after a short time
-        asyncio.create_task(delete_later(msg))
-
-async def delete_later(message, delay=10):
-    await asyncio.sleep(delay)
-    try:
-        await message.delete()
-    except:
-        pass
+        schedule_delete(msg, WARNING_DELETE_DELAY)
@@ -1,70 +1,113 @@
 import asyncio
+import html
+from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from telegram.ext import ContextTypes
+from telegram.error import BadRequest
 from handlers.api_client import api_bot_get, api_bot_post
 import logging
-from handlers.utils import private_only, edit_or_ephemeral, delete_message_later, EPHEMERAL_DELAY, send_webapp_link, build_webapp_url
+from handlers.utils import CachedInlineKeyboardMarkup, private_only, edit_or_ephemeral, schedule_delete, EPHEMERAL_DELAY, send_webapp_link, build_webapp_url
 import config
 
+# Concurrent sends per fan-out (kept under Telegram's ~30 msg/sec global bot limit)
+NOTIFY_CONCURRENCY = 25
+# Cap on coroutines scheduled at once for very large recipient lists
+NOTIFY_BATCH_SIZE = 500
+
+async def _fan_out(context: ContextTypes.DEFAULT_TYPE, users, text, reply_markup):
+    """Send the same message to many users with bounded concurrency. Returns sent count."""
+    sem = asyncio.Semaphore(NOTIFY_CONCURRENCY)
+
+    async def send_one(user_id):
+        async with sem:
+            try:
+                await context.bot.send_message(
+                    chat_id=user_id,
+                    text=text,
+                    reply_markup=reply_markup,
+                    parse_mode="HTML"
+                )
+                return 1
+            except Exception as e:
+                # User may have blocked bot or deleted account
+                logging.debug(f"Failed to notify user {user_id}: {e}")
+                return 0
+
+    sent_count = 0
+    for start in range(0, len(users), NOTIFY_BATCH_SIZE):
+        batch = users[start:start + NOTIFY_BATCH_SIZE]
+        results = await asyncio.gather(*(send_one(user_id) for user_id in batch))
+        sent_count += sum(results)
+    return sent_count
+
 @private_only
 async def notifications_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show notification preferences menu"""
     await send_webapp_link(update, context, text="🌐 Open the Web App to manage notifications.", path="/profile")
 
-async def show_notification_settings(message, user_id, is_new=False):
-    """Display notification settings with toggle buttons"""
-    try:
-        prefs = await api_bot_get(f"/admin/users/{user_id}/preferences")
-    except Exception:
-        prefs = {}
-    match_reminders = prefs.get("match_reminders", 1)
-    result_notifications = prefs.get("result_notifications", 1)
-    daily_reminder = prefs.get("daily_reminder", 0)
-    prediction_updates = prefs.get("prediction_updates", 1)
-    
-    def status_icon(val):
-        return "✅" if val else "❌"
-    
+_NOTIFICATION_PREFS = (
+    ("match_reminders", "Match Reminders", 1),
+    ("result_notifications", "Result Notifications", 1),
+    ("daily_reminder", "Daily Coin Reminder", 0),
+    ("prediction_updates", "Prediction Updates", 1),
+)
+_PREF_DEFAULTS = {name: default for name, _, default in _NOTIFICATION_PREFS}
+
+# Static body: the on/off state lives only in the buttons, so a toggle only
+# has to redraw the reply markup
+NOTIFICATION_SETTINGS_TEXT = (
+    "🔔 <b>Notification Settings</b>\n\n"
+    "Tap to toggle each notification type:\n\n"
+    "📅 <b>Match Reminders</b>\n"
+    "   Get notified when new matches are posted\n\n"
+    "🏁 <b>Result Notifications</b>\n"
+    "   Get notified when match results are announced\n\n"
+    "💰 <b>Daily Coin Reminder</b>\n"
+    "   Reminder to claim your daily coins\n\n"
+    "📊 <b>Prediction Updates</b>\n"
+    "   Get updates about your predictions"
+)
+
+_WEBAPP_PROFILE_MARKUP = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("🌐 Open Web App", web_app=WebAppInfo(url=build_webapp_url("/profile")))]
+]) if config.WEBAPP_URL else None
+
+# Every toggle button in both states, so a redraw is just lookups
+_TOGGLE_BUTTONS = {
+    (name, enabled): InlineKeyboardButton(
+        f"{'✅' if enabled else '❌'} {label}",
+        callback_data=f"notif_toggle_{name}"
+    )
+    for name, label, _ in _NOTIFICATION_PREFS
+    for enabled in (True, False)
+}
+_NOTIFICATION_BACK_ROW = [InlineKeyboardButton("🔙 Back to Menu", callback_data="cmd_back_menu")]
+
+def build_notification_markup(prefs):
+    """Toggle buttons reflecting the user's current preferences."""
     keyboard = [
-        [InlineKeyboardButton(
-            f"{status_icon(match_reminders)} Match Reminders",
-            callback_data="notif_toggle_match_reminders"
-        )],
-        [InlineKeyboardButton(
-            f"{status_icon(result_notifications)} Result Notifications",
-            callback_data="notif_toggle_result_notifications"
-        )],
-        [InlineKeyboardButton(
-            f"{status_icon(daily_reminder)} Daily Coin Reminder",
-            callback_data="notif_toggle_daily_reminder"
-        )],
-        [InlineKeyboardButton(
-            f"{status_icon(prediction_updates)} Prediction Updates",
-            callback_data="notif_toggle_prediction_updates"
-        )],
-        [InlineKeyboardButton("🔙 Back to Menu", callback_data="cmd_back_menu")]
+        [_TOGGLE_BUTTONS[name, bool(prefs.get(name, default))]]
+        for name, _, default in _NOTIFICATION_PREFS
     ]
-    
-    text = (
-        "🔔 <b>Notification Settings</b>\n\n"
-        "Tap to toggle each notification type:\n\n"
-        f"📅 <b>Match Reminders</b> {status_icon(match_reminders)}\n"
-        "   Get notified when new matches are posted\n\n"
-        f"🏁 <b>Result Notifications</b> {status_icon(result_notifications)}\n"
-        "   Get notified when match results are announced\n\n"
-        f"💰 <b>Daily Coin Reminder</b> {status_icon(daily_reminder)}\n"
-        "   Reminder to claim your daily coins\n\n"
-        f"📊 <b>Prediction Updates</b> {status_icon(prediction_updates)}\n"
-        "   Get updates about your predictions"
-    )
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    keyboard.append(_NOTIFICATION_BACK_ROW)
+    return InlineKeyboardMarkup(keyboard)
+
+async def _get_preferences(user_id):
+    try:
+        return await api_bot_get(f"/admin/users/{user_id}/preferences")
+    except Exception:
+        return {}
+
+async def show_notification_settings(message, user_id, is_new=False):
+    """Display notification settings with toggle buttons"""
+    prefs = await _get_preferences(user_id)
+    reply_markup = build_notification_markup(prefs)
     
     if is_new:
-        msg = await message.reply_text(text, reply_markup=reply_markup, parse_mode="HTML")
-        asyncio.create_task(delete_message_later(msg, EPHEMERAL_DELAY))
+        msg = await message.reply_text(NOTIFICATION_SETTINGS_TEXT, reply_markup=reply_markup, parse_mode="HTML")
+        schedule_delete(msg, EPHEMERAL_DELAY)
     else:
-        await edit_or_ephemeral(message, text, reply_markup=reply_markup, parse_mode="HTML")
+        await edit_or_ephemeral(message, NOTIFICATION_SETTINGS_TEXT, reply_markup=reply_markup, parse_mode="HTML")
 
 async def notification_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle notification preference toggle callbacks"""
@@ -73,16 +116,35 @@ async def notification_callback_handler(update: Update, context: ContextTypes.DE
     data = query.data
     
     if data.startswith("notif_toggle_"):
-        await query.answer()
-        if not config.WEBAPP_URL:
-            await query.answer("Web app not configured.", show_alert=True)
+        pref_name = data[len("notif_toggle_"):]
+        if pref_name not in _PREF_DEFAULTS:
+            await query.answer()
             return
-        await edit_or_ephemeral(
-            query.message,
-            "🌐 <b>Open the Web App</b> to manage notifications:",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🌐 Open Web App", web_app=WebAppInfo(url=build_webapp_url("/profile")))]]),
-            parse_mode="HTML"
-        )
+        prefs = await _get_preferences(user_id)
+        new_value = 0 if prefs.get(pref_name, _PREF_DEFAULTS[pref_name]) else 1
+        try:
+            await api_bot_post(f"/admin/users/{user_id}/preferences", {"pref_name": pref_name, "value": new_value})
+        except Exception:
+            # Backend unreachable: fall back to the Web App settings page
+            await query.answer()
+            if not config.WEBAPP_URL:
+                await query.answer("Web app not configured.", show_alert=True)
+                return
+            await edit_or_ephemeral(
+                query.message,
+                "🌐 <b>Open the Web App</b> to manage notifications:",
+                reply_markup=_WEBAPP_PROFILE_MARKUP,
+                parse_mode="HTML"
+            )
+            return
+        await query.answer()
+        prefs[pref_name] = new_value
+        # Only the buttons change; leave the message text alone
+        try:
+            await query.edit_message_reply_markup(reply_markup=build_notification_markup(prefs))
+        except BadRequest as e:
+            if "message is not modified" not in str(e).lower():
+                raise
         return
 
 async def send_match_notification(context: ContextTypes.DEFAULT_TYPE, match_id, team_a, team_b, match_time=None):
@@ -96,7 +158,6 @@ async def send_match_notification(context: ContextTypes.DEFAULT_TYPE, match_id,
     time_str = ""
     if match_time:
         try:
-            from datetime import datetime
             dt = datetime.strptime(match_time, '%Y-%m-%d %H:%M:%S')
             time_str = f"\n⏰ Kickoff: {dt.strftime('%d %b, %H:%M')} UTC"
         except:
@@ -110,41 +171,26 @@ async def send_match_notification(context: ContextTypes.DEFAULT_TYPE, match_id,
     text = (
         f"🔔 <b>New Match Alert!</b>\n\n"
         f"🆔 Match #{match_id}\n"
-        f"🏟️ <b>{team_a}</b> vs <b>{team_b}</b>{time_str}\n\n"
+        f"🏟️ <b>{html.escape(team_a)}</b> vs <b>{html.escape(team_b)}</b>{time_str}\n\n"
         f"Make your prediction now!"
     )
     
-    sent_count = 0
-    for user_id in users:
-        try:
-            await context.bot.send_message(
-                chat_id=user_id,
-                text=text,
-                reply_markup=reply_markup,
-                parse_mode="HTML"
-            )
-            sent_count += 1
-        except Exception as e:
-            # User may have blocked bot or deleted account
-            logging.debug(f"Failed to notify user {user_id}: {e}")
-    
-    return sent_count
+    return await _fan_out(context, users, text, reply_markup)
 
 async def send_result_notification(context: ContextTypes.DEFAULT_TYPE, match_id, team_a, team_b, 
                                    winner_name, score_a=None, score_b=None, winners_count=0):
-    """Send match result notification to users who predicted"""
-    try:
-        data = await api_bot_get("/admin/notifications/result-recipients", params={"match_id": match_id})
-        users = data.get("user_ids", []) if isinstance(data, dict) else []
-    except Exception:
-        users = []
-    
+    """Send match result notification to users who predicted.
+
+    The per-user fan-out runs in the backend; the bot only triggers it.
+    Returns True if the broadcast was queued.
+    """
     score_str = f"\n📊 Score: {score_a} - {score_b}" if score_a is not None else ""
     
+    # Names are admin-typed; unescaped HTML would make Telegram reject every send
     text = (
         f"🏁 <b>Match Result!</b>\n\n"
-        f"Match #{match_id}: {team_a} vs {team_b}\n"
-        f"🏆 Winner: <b>{winner_name}</b>{score_str}\n\n"
+        f"Match #{match_id}: {html.escape(team_a)} vs {html.escape(team_b)}\n"
+        f"🏆 Winner: <b>{html.escape(winner_name)}</b>{score_str}\n\n"
         f"🎉 {winners_count} correct predictions!"
     )
     
@@ -153,17 +199,13 @@ async def send_result_notification(context: ContextTypes.DEFAULT_TYPE, match_id,
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    sent_count = 0
-    for user_id in users:
-        try:
-            await context.bot.send_message(
-                chat_id=user_id,
-                text=text,
-                reply_markup=reply_markup,
-                parse_mode="HTML"
-            )
-            sent_count += 1
-        except:
-            pass
-    
-    return sent_count
+    try:
+        await api_bot_post("/admin/notifications/broadcast-result", {
+            "match_id": match_id,
+            "text": text,
+            "reply_markup": reply_markup.to_dict(),
+        })
+        return True
+    except Exception as e:
+        logging.warning(f"Failed to queue result broadcast for match {match_id}: {e}")
+        return False
@@ -1,28 +1,123 @@
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
 from telegram.ext import ContextTypes
+from telegram.error import TelegramError
 from handlers.api_client import api_get, api_post, api_bot_get, api_bot_post, api_bot_delete
-from handlers.roles import get_user_role, check_role, ROLE_ADMIN, is_admin_or_owner
-from handlers.utils import send_ephemeral_reply, send_webapp_link, edit_or_ephemeral, ADMIN_EPHEMERAL_DELAY
+from handlers.roles import get_user_role, check_role, ROLE_ADMIN, is_admin_or_owner_cached
+from handlers.utils import TTLCache, CachedInlineKeyboardMarkup, send_ephemeral_reply, send_webapp_link, edit_or_ephemeral, ADMIN_EPHEMERAL_DELAY
 import config
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, partial
 import asyncio
 import logging
+import re
+
+# Per-user open-match lookups, so a burst of button presses on one match card
+# costs a single backend round-trip: {user_id: {match_id: match}}
+OPEN_MATCHES_TTL = 5.0
+OPEN_MATCHES_CACHE_SIZE = 1024
+_OPEN_MATCHES_CACHE = TTLCache(OPEN_MATCHES_CACHE_SIZE, OPEN_MATCHES_TTL)
+
+# Trailing kickoff time on /newmatch (formats: HH:MM, tomorrow HH:MM, YYYY-MM-DD HH:MM)
+_TIME_RE = re.compile(r'\s+(\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{2}|tomorrow\s+\d{1,2}:\d{2}|\d{1,2}:\d{2}(?:AM|PM)?|today\s+\d{1,2}:\d{2})\s*$', re.IGNORECASE)
+_VS_RE = re.compile(r'\s+vs\s+', re.IGNORECASE)
+# Exact-score prediction message: MatchID score ScoreA-ScoreB (e.g. 1 score 2-1)
+# Also used as the MessageHandler filter in main, so the two can't drift apart
+SCORE_MSG_RE = re.compile(r'^(\d{1,9})\s+score\s+(\d{1,3})-(\d{1,3})$', re.IGNORECASE)
+_SCORE_RESULT_RE = re.compile(r'^(\d+)-(\d+)$')
+_HHMM_RE = re.compile(r'^(\d{1,2}):(\d{2})\s*(am|pm)?$')
+
+# Admin-facing messages are HTML and linger for ADMIN_EPHEMERAL_DELAY
+_ADM_EDIT = partial(edit_or_ephemeral, parse_mode="HTML", delay=ADMIN_EPHEMERAL_DELAY)
+_ADM_REPLY = partial(send_ephemeral_reply, delay=ADMIN_EPHEMERAL_DELAY)
+
+# Team names don't change after creation, so admin actions that only render
+# them skip the backend fetch: {match_id: (team_a, team_b)}
+MATCH_META_CACHE_SIZE = 2048
+_MATCH_META = TTLCache(MATCH_META_CACHE_SIZE)
+# Admin actions that mutate the match and want its authoritative state
+_AUTHORITATIVE_ACTIONS = {"close", "res", "setscore", "confirmdelete"}
+
+def _remember_match(match_id, team_a, team_b):
+    _MATCH_META.set(match_id, (team_a, team_b))
+
+def _winner_name(team_a, team_b, winner_code):
+    return team_a if winner_code == 'A' else team_b if winner_code == 'B' else "Draw"
+
+# Popular quick picks for the /newmatch wizard
+_WIZARD_MARKUP = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("🏴󠁧󠁢󠁥󠁮󠁧󠁿 Premier League", callback_data="wizard_league_epl")],
+    [InlineKeyboardButton("🇪🇸 La Liga", callback_data="wizard_league_laliga")],
+    [InlineKeyboardButton("🇮🇹 Serie A", callback_data="wizard_league_seriea")],
+    [InlineKeyboardButton("🇩🇪 Bundesliga", callback_data="wizard_league_bundesliga")],
+    [InlineKeyboardButton("🇫🇷 Ligue 1", callback_data="wizard_league_ligue1")],
+    [InlineKeyboardButton("⚽ Champions League", callback_data="wizard_league_ucl")],
+    [InlineKeyboardButton("✏️ Custom Teams", callback_data="wizard_custom")],
+    [InlineKeyboardButton("❌ Cancel", callback_data="wizard_cancel")]
+])
+
+# Quick-pick final scores for the admin score picker, one tuple per row
+_SCORE_CELLS = (
+    ((1, 0), (2, 0), (3, 0)),
+    ((0, 1), (0, 2), (0, 3)),
+    ((1, 1), (2, 2), (2, 1)),
+    ((1, 2), (3, 1), (3, 2)),
+)
+
+@lru_cache(maxsize=64)
+def _build_score_picker_markup(match_id):
+    keyboard = [
+        [InlineKeyboardButton(f"{a}-{b}", callback_data=f"adm_setscore_{match_id}_{a}_{b}") for a, b in row]
+        for row in _SCORE_CELLS
+    ]
+    keyboard.append([InlineKeyboardButton("✏️ Custom Score", callback_data=f"adm_customscore_{match_id}")])
+    keyboard.append([InlineKeyboardButton("🔙 Cancel", callback_data=f"adm_cancel_{match_id}")])
+    return InlineKeyboardMarkup(keyboard)
+
+@lru_cache(maxsize=256)
+def _build_prediction_markup(match_id, team_a, team_b):
+    """Prediction buttons for a match card."""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(f"🏠 {team_a}", callback_data=f"pred_{match_id}_A"),
+            InlineKeyboardButton("🤝 Draw", callback_data=f"pred_{match_id}_DRAW"),
+            InlineKeyboardButton(f"✈️ {team_b}", callback_data=f"pred_{match_id}_B")
+        ],
+        [
+            InlineKeyboardButton("🔢 Predict Exact Score", callback_data=f"pred_{match_id}_SCORE")
+        ]
+    ])
 
-# Store for match creation wizard state
-MATCH_CREATION_STATE = {}
+def _build_admin_panel_markup(match_id, team_a, team_b):
+    """Per-match admin controls."""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("🔒 Close Bets", callback_data=f"adm_close_{match_id}"),
+            InlineKeyboardButton("⏰ Set Time", callback_data=f"adm_settime_{match_id}")
+        ],
+        [
+            InlineKeyboardButton(f"🏆 {team_a}", callback_data=f"adm_res_{match_id}_A"),
+            InlineKeyboardButton("🤝 Draw", callback_data=f"adm_res_{match_id}_DRAW"),
+            InlineKeyboardButton(f"🏆 {team_b}", callback_data=f"adm_res_{match_id}_B")
+        ],
+        [
+            InlineKeyboardButton("📊 Set Score", callback_data=f"adm_score_{match_id}"),
+            InlineKeyboardButton("🗑️ Delete", callback_data=f"adm_delete_{match_id}")
+        ]
+    ])
 
 # --- Backend API Helpers for Predictions ---
 
-async def create_match_api(team_a, team_b, match_time=None):
+async def create_match_api(team_a, team_b, match_dt=None):
     data = await api_bot_post("/admin/matches", json_body={
         "team_a": team_a,
         "team_b": team_b,
-        "match_time": match_time
+        "match_time": match_dt.strftime('%Y-%m-%d %H:%M:%S') if match_dt else None
     })
     return int(data.get("match_id"))
 
 
 async def get_match_api(match_id: int):
+    # Concurrent callers for the same match share one request (see api_bot_get)
     return await api_bot_get(f"/admin/matches/{match_id}")
 
 
@@ -48,27 +143,38 @@ async def delete_match_api(match_id: int):
     await api_bot_delete(f"/admin/matches/{match_id}")
 
 async def get_open_matches_api(user_id: int):
+    return list((await _get_open_matches_by_id(user_id)).values())
+
+async def _get_open_matches_by_id(user_id: int):
+    """Open matches keyed by match_id, cached per user for OPEN_MATCHES_TTL seconds."""
+    hit = _OPEN_MATCHES_CACHE.get(user_id)
+    if hit is not None:
+        return hit
     data = await api_get("/api/predictions/open", user_id=user_id)
-    return data.get("items", []) if isinstance(data, dict) else []
+    items = data.get("items", []) if isinstance(data, dict) else []
+    by_id = {int(m.get("match_id", 0)): m for m in items}
+    _OPEN_MATCHES_CACHE.set(user_id, by_id)
+    return by_id
 
 async def get_open_match_api(user_id: int, match_id: int):
-    matches = await get_open_matches_api(user_id)
-    for match in matches:
-        if int(match.get("match_id", 0)) == match_id:
-            return match
-    return None
+    return (await _get_open_matches_by_id(user_id)).get(match_id)
+
+async def place_prediction_api(user_id: int, json_body: dict):
+    await api_post("/api/predictions/place", user_id=user_id, json_body=json_body)
+    # Next lookup should reflect the new vote
+    _OPEN_MATCHES_CACHE.pop(user_id, None)
 
 
-async def auto_close_match(context, match_id, delay_seconds):
-    """Auto-close betting before match starts"""
-    await asyncio.sleep(delay_seconds)
+async def auto_close_match(context: ContextTypes.DEFAULT_TYPE):
+    """Job callback: auto-close betting before match starts (job data is the match_id)"""
+    match_id = context.job.data
     try:
         match = await get_match_api(match_id)
     except Exception:
         match = None
     if match and match.get("status") == "OPEN":
         await close_match_api(match_id)
-        logging.info(f"Auto-closed match #{match_id}")
+        logging.info("Auto-closed match #%s", match_id)
 
 # --- Handlers ---
 
@@ -77,7 +183,7 @@ async def create_match_command(update: Update, context: ContextTypes.DEFAULT_TYP
     Usage: /newmatch Team A vs Team B [time]
     Time formats: 15:00, 3:00PM, tomorrow 15:00, 2024-01-20 15:00
     """
-    is_admin = await is_admin_or_owner(context.bot, update.effective_chat.id, update.effective_user.id)
+    is_admin = await is_admin_or_owner_cached(context.bot, update.effective_chat.id, update.effective_user.id)
     if not is_admin:
         await send_ephemeral_reply(update, context, "⛔ Admin only command.")
         return
@@ -89,20 +195,17 @@ async def create_match_command(update: Update, context: ContextTypes.DEFAULT_TYP
         await start_match_wizard(update, context)
         return
     
-    import re
-    
-    # Try to extract time from the end (formats: HH:MM, tomorrow HH:MM, YYYY-MM-DD HH:MM)
-    match_time = None
-    time_pattern = r'\s+(\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{2}|tomorrow\s+\d{1,2}:\d{2}|\d{1,2}:\d{2}(?:AM|PM)?|today\s+\d{1,2}:\d{2})\s*$'
-    time_match = re.search(time_pattern, full_text, re.IGNORECASE)
+    # Try to extract time from the end
+    match_dt = None
+    time_match = _TIME_RE.search(full_text)
     
     if time_match:
         time_str = time_match.group(1).strip()
         full_text = full_text[:time_match.start()].strip()
-        match_time = parse_match_time(time_str)
+        match_dt = parse_match_time(time_str)
     
     # Parse teams
-    teams = re.split(r'\s+vs\s+', full_text, flags=re.IGNORECASE)
+    teams = _VS_RE.split(full_text)
     
     if len(teams) != 2:
         await send_ephemeral_reply(
@@ -123,67 +226,49 @@ async def create_match_command(update: Update, context: ContextTypes.DEFAULT_TYP
     team_a = teams[0].strip()
     team_b = teams[1].strip()
     
-    await create_and_post_match(update, context, team_a, team_b, match_time)
+    await create_and_post_match(update, context, team_a, team_b, match_dt)
 
 def parse_match_time(time_str):
-    """Parse various time formats into datetime string"""
-    now = datetime.utcnow()
-    time_str = time_str.lower().strip()
+    """Parse various time formats into a UTC datetime (None if unparseable)"""
+    now = datetime.now(timezone.utc)
+    t = time_str.lower().strip()
     
     try:
         # Full datetime: 2024-01-20 15:00
-        if '-' in time_str and len(time_str) > 10:
-            dt = datetime.strptime(time_str, '%Y-%m-%d %H:%M')
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Tomorrow HH:MM
-        if time_str.startswith('tomorrow'):
-            time_part = time_str.replace('tomorrow', '').strip()
-            hour, minute = map(int, time_part.split(':'))
-            dt = now + timedelta(days=1)
-            dt = dt.replace(hour=hour, minute=minute, second=0)
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
+        if len(t) > 10 and t[4:5] == '-':
+            return datetime.strptime(t, '%Y-%m-%d %H:%M').replace(tzinfo=timezone.utc)
         
-        # Today HH:MM
-        if time_str.startswith('today'):
-            time_part = time_str.replace('today', '').strip()
-            hour, minute = map(int, time_part.split(':'))
-            dt = now.replace(hour=hour, minute=minute, second=0)
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
+        # [today|tomorrow] HH:MM[AM|PM]
+        day_offset = 0
+        bare_time = False
+        if t.startswith('tomorrow'):
+            day_offset = 1
+            t = t[len('tomorrow'):].lstrip()
+        elif t.startswith('today'):
+            t = t[len('today'):].lstrip()
+        else:
+            bare_time = True
         
-        # Just HH:MM (assume today)
-        if ':' in time_str:
-            # Handle AM/PM
-            time_str = time_str.upper().replace('AM', '').replace('PM', '')
-            hour, minute = map(int, time_str.split(':'))
-            if 'PM' in time_str.upper() and hour < 12:
-                hour += 12
-            dt = now.replace(hour=hour, minute=minute, second=0)
-            # If time has passed, assume tomorrow
-            if dt < now:
-                dt += timedelta(days=1)
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
-    except:
-        pass
-    
-    return None
+        m = _HHMM_RE.match(t)
+        if not m:
+            return None
+        hour, minute, suffix = int(m[1]), int(m[2]), m[3]
+        if suffix == 'pm' and hour < 12:
+            hour += 12
+        elif suffix == 'am' and hour == 12:
+            hour = 0
+        dt = (now + timedelta(days=day_offset)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        # Just HH:MM: if time has passed, assume tomorrow
+        if bare_time and dt < now:
+            dt += timedelta(days=1)
+        return dt
+    except ValueError:
+        return None
 
 async def start_match_wizard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start interactive match creation"""
     user_id = update.effective_user.id
     
-    # Popular quick picks
-    keyboard = [
-        [InlineKeyboardButton("🏴󠁧󠁢󠁥󠁮󠁧󠁿 Premier League", callback_data="wizard_league_epl")],
-        [InlineKeyboardButton("🇪🇸 La Liga", callback_data="wizard_league_laliga")],
-        [InlineKeyboardButton("🇮🇹 Serie A", callback_data="wizard_league_seriea")],
-        [InlineKeyboardButton("🇩🇪 Bundesliga", callback_data="wizard_league_bundesliga")],
-        [InlineKeyboardButton("🇫🇷 Ligue 1", callback_data="wizard_league_ligue1")],
-        [InlineKeyboardButton("⚽ Champions League", callback_data="wizard_league_ucl")],
-        [InlineKeyboardButton("✏️ Custom Teams", callback_data="wizard_custom")],
-        [InlineKeyboardButton("❌ Cancel", callback_data="wizard_cancel")]
-    ]
-    
     target_chat_id = update.effective_chat.id
     if update.effective_chat.type in ["group", "supergroup"]:
         context.user_data["match_target_chat_id"] = update.effective_chat.id
@@ -191,43 +276,32 @@ async def start_match_wizard(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await send_ephemeral_reply(update, context, "✅ Check your private chat to finish match setup.")
     await context.bot.send_message(
         chat_id=target_chat_id,
-        text="⚽ <b>Create New Match</b>\\n\\nSelect a league or enter custom teams:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        text="⚽ <b>Create New Match</b>\n\nSelect a league or enter custom teams:",
+        reply_markup=_WIZARD_MARKUP,
         parse_mode="HTML"
     )
 
-async def create_and_post_match(update, context, team_a, team_b, match_time=None):
-    """Create match in DB and post to chat"""
-    match_id = await create_match_api(team_a, team_b, match_time)
+async def create_and_post_match(update, context, team_a, team_b, match_dt=None):
+    """Create match in DB and post to chat (match_dt is an aware UTC datetime)"""
+    match_id = await create_match_api(team_a, team_b, match_dt)
+    _remember_match(match_id, team_a, team_b)
     
     # Format time display
     time_display = ""
-    if match_time:
-        try:
-            dt = datetime.strptime(match_time, '%Y-%m-%d %H:%M:%S')
-            time_display = f"\n⏰ <b>Kickoff:</b> {dt.strftime('%d %b %Y, %H:%M')} UTC"
-            
-            # Schedule auto-close 5 minutes before kickoff
-            now = datetime.utcnow()
-            close_time = dt - timedelta(minutes=5)
-            if close_time > now:
-                delay = (close_time - now).total_seconds()
-                asyncio.create_task(auto_close_match(context, match_id, delay))
-        except:
-            pass
+    if match_dt:
+        time_display = f"\n⏰ <b>Kickoff:</b> {match_dt.strftime('%d %b %Y, %H:%M')} UTC"
+        
+        # Schedule auto-close 5 minutes before kickoff
+        delay = (match_dt - timedelta(minutes=5) - datetime.now(timezone.utc)).total_seconds()
+        if delay > 0 and context.job_queue:
+            context.job_queue.run_once(
+                auto_close_match,
+                when=delay,
+                data=match_id,
+                name=f"auto_close_{match_id}"
+            )
     
-    # Prediction buttons
-    keyboard = [
-        [
-            InlineKeyboardButton(f"🏠 {team_a}", callback_data=f"pred_{match_id}_A"),
-            InlineKeyboardButton("🤝 Draw", callback_data=f"pred_{match_id}_DRAW"),
-            InlineKeyboardButton(f"✈️ {team_b}", callback_data=f"pred_{match_id}_B")
-        ],
-        [
-            InlineKeyboardButton("🔢 Predict Exact Score", callback_data=f"pred_{match_id}_SCORE")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = _build_prediction_markup(match_id, team_a, team_b)
     
     match_text = (f"⚽ <b>New Match Prediction!</b>\n\n"
                   f"🆔 Match #{match_id}\n"
@@ -238,11 +312,10 @@ async def create_and_post_match(update, context, team_a, team_b, match_time=None
     # Determine target chat(s) for broadcasting
     target_chats = []
     
-    # Check if there's a stored target chat ID from the wizard
-    if "match_target_chat_id" in context.user_data:
-        target_chats.append(context.user_data["match_target_chat_id"])
-        # Clean up after use
-        del context.user_data["match_target_chat_id"]
+    # Stored target chat ID from the wizard (consumed on use)
+    wizard_target = context.user_data.pop("match_target_chat_id", None)
+    if wizard_target is not None:
+        target_chats.append(wizard_target)
     elif update.effective_chat.type in ["group", "supergroup"]:
         # Match created directly in a group
         target_chats.append(update.effective_chat.id)
@@ -253,24 +326,27 @@ async def create_and_post_match(update, context, team_a, team_b, match_time=None
             all_groups = groups_data.get("chat_ids", [])
             target_chats.extend(all_groups)
         except Exception as e:
-            logging.error(f"Failed to get groups for broadcasting: {e}")
+            logging.error("Failed to get groups for broadcasting: %s", e)
             # Fallback: send to current chat only
             target_chats.append(update.effective_chat.id)
     
     # Broadcast match card to all target chats
+    results = await asyncio.gather(*(
+        context.bot.send_message(
+            chat_id=chat_id,
+            text=match_text,
+            reply_markup=reply_markup,
+            parse_mode="HTML"
+        )
+        for chat_id in target_chats
+    ), return_exceptions=True)
     broadcast_success = False
-    for chat_id in target_chats:
-        try:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=match_text,
-                reply_markup=reply_markup,
-                parse_mode="HTML"
-            )
+    for chat_id, result in zip(target_chats, results):
+        if isinstance(result, Exception):
+            logging.error("Failed to broadcast match #%s to chat %s: %s", match_id, chat_id, result)
+        else:
             broadcast_success = True
-            logging.info(f"Match #{match_id} broadcast to chat {chat_id}")
-        except Exception as e:
-            logging.error(f"Failed to broadcast match #{match_id} to chat {chat_id}: {e}")
+            logging.info("Match #%s broadcast to chat %s", match_id, chat_id)
     
     # If broadcast failed to all groups, try sending to current chat as fallback
     if not broadcast_success:
@@ -282,336 +358,283 @@ async def create_and_post_match(update, context, team_a, team_b, match_time=None
                 parse_mode="HTML"
             )
         except Exception as e:
-            logging.error(f"Failed to send match #{match_id} even to current chat: {e}")
-    
-    # Admin Control Panel
-    admin_keyboard = [
-        [
-            InlineKeyboardButton("🔒 Close Bets", callback_data=f"adm_close_{match_id}"),
-            InlineKeyboardButton("⏰ Set Time", callback_data=f"adm_settime_{match_id}")
-        ],
-        [
-            InlineKeyboardButton(f"🏆 {team_a}", callback_data=f"adm_res_{match_id}_A"),
-            InlineKeyboardButton("🤝 Draw", callback_data=f"adm_res_{match_id}_DRAW"),
-            InlineKeyboardButton(f"🏆 {team_b}", callback_data=f"adm_res_{match_id}_B")
-        ],
-        [
-            InlineKeyboardButton("📊 Set Score", callback_data=f"adm_score_{match_id}"),
-            InlineKeyboardButton("🗑️ Delete", callback_data=f"adm_delete_{match_id}")
-        ]
-    ]
+            logging.error("Failed to send match #%s even to current chat: %s", match_id, e)
     
     # Send admin panel to admin's private chat to avoid group clutter
     try:
         await context.bot.send_message(
             chat_id=update.effective_user.id,
-            text=f"🛠️ <b>Match #{match_id} Admin Panel</b>\\n"
-                 f"{team_a} vs {team_b}\\n\\n"
+            text=f"🛠️ <b>Match #{match_id} Admin Panel</b>\n"
+                 f"{team_a} vs {team_b}\n\n"
                  "Manage this match:",
-            reply_markup=InlineKeyboardMarkup(admin_keyboard),
+            reply_markup=_build_admin_panel_markup(match_id, team_a, team_b),
             parse_mode="HTML"
         )
-    except:
-        pass
+    except TelegramError as e:
+        # Admin may not have started a private chat with the bot
+        logging.debug("Could not send admin panel for match #%s: %s", match_id, e)
 
-async def admin_prediction_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def _adm_close(update, context, match_id, args, team_a, team_b):
     query = update.callback_query
-    user_id = query.from_user.id
-    chat_id = update.effective_chat.id
-    
-    # Permission Check - check both bot role and Telegram admin status
-    is_admin = await is_admin_or_owner(context.bot, chat_id, user_id)
-    if not is_admin:
-        await query.answer("🚫 Admin only!", show_alert=True)
-        return
+    await close_match_api(match_id)
+    await query.answer(f"🔒 Match #{match_id} closed!", show_alert=True)
+    await _ADM_EDIT(
+        query.message,
+        f"✅ Match #{match_id} is <b>CLOSED</b> for bets.\n\n"
+        f"{team_a} vs {team_b}"
+    )
 
-    data = query.data  # e.g. adm_close_1 or adm_res_1_A
-    parts = data.split("_")
-    action = parts[1]
-    match_id = int(parts[2])
-    
-    try:
-        match = await get_match_api(match_id)
-    except Exception:
-        match = None
-    if not match:
-        await query.answer("Match not found!", show_alert=True)
-        return
+async def _adm_res(update, context, match_id, args, team_a, team_b):
+    query = update.callback_query
+    winner_code = args[0]
+    result = await resolve_match_api(match_id, winner_code)
+    winners = result.get("winners", []) if isinstance(result, dict) else []
+    winner_name = _winner_name(team_a, team_b, winner_code)
 
-    if action == "close":
-        await close_match_api(match_id)
-        await query.answer(f"🔒 Match #{match_id} closed!", show_alert=True)
-        await edit_or_ephemeral(
-            query.message,
-            f"✅ Match #{match_id} is <b>CLOSED</b> for bets.\n\n"
-            f"{match.get('team_a')} vs {match.get('team_b')}",
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
-        
-    elif action == "res":
-        winner_code = parts[3]
-        result = await resolve_match_api(match_id, winner_code)
-        winners = result.get("winners", []) if isinstance(result, dict) else []
-            
-        winner_name = winner_code
-        if winner_code == 'A': winner_name = match.get("team_a")
-        elif winner_code == 'B': winner_name = match.get("team_b")
-        else: winner_name = "Draw"
-
-        await query.answer(f"🏁 Match #{match_id} Resolved!", show_alert=True)
-        await edit_or_ephemeral(
+    await query.answer(f"🏁 Match #{match_id} Resolved!", show_alert=True)
+    # Admin confirmation and chat announcement are independent round-trips
+    await asyncio.gather(
+        _ADM_EDIT(
             query.message,
             f"✅ Match #{match_id} Resolved!\n\n"
-            f"{match.get('team_a')} vs {match.get('team_b')}\n"
+            f"{team_a} vs {team_b}\n"
             f"🏆 Winner: <b>{winner_name}</b>\n"
-            f"🎉 {len(winners)} users won {config.PREDICTION_REWARD} coins!",
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
-        
-        # Announcement in chat
-        await context.bot.send_message(
+            f"🎉 {len(winners)} users won {config.PREDICTION_REWARD} coins!"
+        ),
+        context.bot.send_message(
             chat_id=update.effective_chat.id,
             text=f"🏁 <b>Match Result!</b>\n\n"
-                 f"Match #{match_id}: {match.get('team_a')} vs {match.get('team_b')}\n"
+                 f"Match #{match_id}: {team_a} vs {team_b}\n"
                  f"🏆 Winner: <b>{winner_name}</b>\n"
                  f"🎉 {len(winners)} correct predictions earned {config.PREDICTION_REWARD} coins!",
             parse_mode="HTML"
         )
+    )
+
+async def _adm_settime(update, context, match_id, args, team_a, team_b):
+    query = update.callback_query
+    await query.answer()
+    await _ADM_EDIT(
+        query.message,
+        f"⏰ <b>Set Match Time for #{match_id}</b>\n\n"
+        f"Reply with time in one of these formats:\n"
+        f"• <code>15:00</code> (today)\n"
+        f"• <code>tomorrow 15:00</code>\n"
+        f"• <code>2024-01-20 15:00</code>\n\n"
+        f"Or use: <code>/settime {match_id} 15:00</code>"
+    )
+
+async def _adm_score(update, context, match_id, args, team_a, team_b):
+    query = update.callback_query
+    await query.answer()
+    await _ADM_EDIT(
+        query.message,
+        f"📊 <b>Set Final Score for Match #{match_id}</b>\n\n"
+        f"{team_a} vs {team_b}\n\n"
+        "Select the final score:",
+        reply_markup=_build_score_picker_markup(match_id)
+    )
+
+async def _adm_setscore(update, context, match_id, args, team_a, team_b):
+    query = update.callback_query
+    score_a = int(args[0])
+    score_b = int(args[1])
+    
+    # Determine winner
+    if score_a > score_b:
+        winner_code = 'A'
+    elif score_b > score_a:
+        winner_code = 'B'
+    else:
+        winner_code = 'DRAW'
     
-    elif action == "settime":
-        await query.answer()
-        await edit_or_ephemeral(
-            query.message,
-            f"⏰ <b>Set Match Time for #{match_id}</b>\n\n"
-            f"Reply with time in one of these formats:\n"
-            f"• <code>15:00</code> (today)\n"
-            f"• <code>tomorrow 15:00</code>\n"
-            f"• <code>2024-01-20 15:00</code>\n\n"
-            f"Or use: <code>/settime {match_id} 15:00</code>",
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
-    
-    elif action == "score":
-        await query.answer()
-        keyboard = [
-            [
-                InlineKeyboardButton("1-0", callback_data=f"adm_setscore_{match_id}_1_0"),
-                InlineKeyboardButton("2-0", callback_data=f"adm_setscore_{match_id}_2_0"),
-                InlineKeyboardButton("3-0", callback_data=f"adm_setscore_{match_id}_3_0"),
-            ],
-            [
-                InlineKeyboardButton("0-1", callback_data=f"adm_setscore_{match_id}_0_1"),
-                InlineKeyboardButton("0-2", callback_data=f"adm_setscore_{match_id}_0_2"),
-                InlineKeyboardButton("0-3", callback_data=f"adm_setscore_{match_id}_0_3"),
-            ],
-            [
-                InlineKeyboardButton("1-1", callback_data=f"adm_setscore_{match_id}_1_1"),
-                InlineKeyboardButton("2-2", callback_data=f"adm_setscore_{match_id}_2_2"),
-                InlineKeyboardButton("2-1", callback_data=f"adm_setscore_{match_id}_2_1"),
-            ],
-            [
-                InlineKeyboardButton("1-2", callback_data=f"adm_setscore_{match_id}_1_2"),
-                InlineKeyboardButton("3-1", callback_data=f"adm_setscore_{match_id}_3_1"),
-                InlineKeyboardButton("3-2", callback_data=f"adm_setscore_{match_id}_3_2"),
-            ],
-            [InlineKeyboardButton("✏️ Custom Score", callback_data=f"adm_customscore_{match_id}")],
-            [InlineKeyboardButton("🔙 Cancel", callback_data=f"adm_cancel_{match_id}")]
-        ]
-        await edit_or_ephemeral(
-            query.message,
-            f"📊 <b>Set Final Score for Match #{match_id}</b>\n\n"
-            f"{match.get('team_a')} vs {match.get('team_b')}\n\n"
-            "Select the final score:",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
+    result = await resolve_match_api(match_id, winner_code, score_a, score_b)
+    winners = result.get("winners", []) if isinstance(result, dict) else []
     
-    elif action == "setscore":
-        score_a = int(parts[3])
-        score_b = int(parts[4])
-        
-        # Determine winner
-        if score_a > score_b:
-            winner_code = 'A'
-        elif score_b > score_a:
-            winner_code = 'B'
-        else:
-            winner_code = 'DRAW'
-        
-        result = await resolve_match_api(match_id, winner_code, score_a, score_b)
-        winners = result.get("winners", []) if isinstance(result, dict) else []
-        
-        await query.answer(f"✅ Score set: {score_a}-{score_b}", show_alert=True)
-        await edit_or_ephemeral(
+    await query.answer(f"✅ Score set: {score_a}-{score_b}", show_alert=True)
+    score_line = f"{team_a} <b>{score_a}</b> - <b>{score_b}</b> {team_b}"
+    await asyncio.gather(
+        _ADM_EDIT(
             query.message,
             f"✅ Match #{match_id} Resolved!\n\n"
-            f"{match.get('team_a')} <b>{score_a}</b> - <b>{score_b}</b> {match.get('team_b')}\n\n"
-            f"🎉 {len(winners)} users won {config.PREDICTION_REWARD} coins!",
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
-        
-        # Announcement
-        await context.bot.send_message(
+            f"{score_line}\n\n"
+            f"🎉 {len(winners)} users won {config.PREDICTION_REWARD} coins!"
+        ),
+        context.bot.send_message(
             chat_id=update.effective_chat.id,
             text=f"🏁 <b>Match Result!</b>\n\n"
                  f"Match #{match_id}\n"
-                 f"{match.get('team_a')} <b>{score_a}</b> - <b>{score_b}</b> {match.get('team_b')}\n\n"
+                 f"{score_line}\n\n"
                  f"🎉 {len(winners)} correct predictions!",
             parse_mode="HTML"
         )
-    
-    elif action == "customscore":
-        await query.answer()
-        await edit_or_ephemeral(
-            query.message,
-            f"✏️ <b>Enter Custom Score</b>\n\n"
-            f"Use: <code>/setresult {match_id} X-Y</code>\n"
-            f"Example: <code>/setresult {match_id} 4-2</code>",
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
-    
-    elif action == "delete":
-        keyboard = [
-            [
-                InlineKeyboardButton("✅ Yes, Delete", callback_data=f"adm_confirmdelete_{match_id}"),
-                InlineKeyboardButton("❌ Cancel", callback_data=f"adm_cancel_{match_id}")
-            ]
+    )
+
+async def _adm_customscore(update, context, match_id, args, team_a, team_b):
+    query = update.callback_query
+    await query.answer()
+    await _ADM_EDIT(
+        query.message,
+        f"✏️ <b>Enter Custom Score</b>\n\n"
+        f"Use: <code>/setresult {match_id} X-Y</code>\n"
+        f"Example: <code>/setresult {match_id} 4-2</code>"
+    )
+
+async def _adm_delete(update, context, match_id, args, team_a, team_b):
+    query = update.callback_query
+    keyboard = [
+        [
+            InlineKeyboardButton("✅ Yes, Delete", callback_data=f"adm_confirmdelete_{match_id}"),
+            InlineKeyboardButton("❌ Cancel", callback_data=f"adm_cancel_{match_id}")
         ]
-        await edit_or_ephemeral(
-            query.message,
-            f"⚠️ <b>Delete Match #{match_id}?</b>\n\n"
-            f"{match[1]} vs {match[2]}\n\n"
-            "This will delete all predictions for this match!",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
+    ]
+    await _ADM_EDIT(
+        query.message,
+        f"⚠️ <b>Delete Match #{match_id}?</b>\n\n"
+        f"{team_a} vs {team_b}\n\n"
+        "This will delete all predictions for this match!",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+async def _adm_confirmdelete(update, context, match_id, args, team_a, team_b):
+    query = update.callback_query
+    await delete_match_api(match_id)
+    _MATCH_META.pop(match_id, None)
+    await query.answer("🗑️ Match deleted!", show_alert=True)
+    await _ADM_EDIT(
+        query.message,
+        f"🗑️ Match #{match_id} has been deleted."
+    )
+
+async def _adm_cancel(update, context, match_id, args, team_a, team_b):
+    query = update.callback_query
+    # Rebuild admin panel
+    await _ADM_EDIT(
+        query.message,
+        f"🛠️ <b>Match #{match_id} Admin Panel</b>\n"
+        f"{team_a} vs {team_b}\n\n"
+        "Manage this match:",
+        reply_markup=_build_admin_panel_markup(match_id, team_a, team_b)
+    )
+
+# adm_<action>_<match_id>[_<args>...] -> handler
+_ADM_DISPATCH = {
+    "close": _adm_close,
+    "res": _adm_res,
+    "settime": _adm_settime,
+    "score": _adm_score,
+    "setscore": _adm_setscore,
+    "customscore": _adm_customscore,
+    "delete": _adm_delete,
+    "confirmdelete": _adm_confirmdelete,
+    "cancel": _adm_cancel,
+}
+
+async def admin_prediction_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    user_id = query.from_user.id
+    chat_id = update.effective_chat.id
     
-    elif action == "confirmdelete":
-        await delete_match_api(match_id)
-        await query.answer("🗑️ Match deleted!", show_alert=True)
-        await edit_or_ephemeral(
-            query.message,
-            f"🗑️ Match #{match_id} has been deleted.",
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
+    # Permission Check - check both bot role and Telegram admin status
+    is_admin = await is_admin_or_owner_cached(context.bot, chat_id, user_id)
+    if not is_admin:
+        await query.answer("🚫 Admin only!", show_alert=True)
+        return
+
+    # e.g. adm_close_1 or adm_res_1_A
+    _, action, raw_match_id, *args = query.data.split("_")
+    handler = _ADM_DISPATCH.get(action)
+    if handler is None:
+        await query.answer()
+        return
+    match_id = int(raw_match_id)
     
-    elif action == "cancel":
-        # Rebuild admin panel
-        admin_keyboard = [
-            [
-                InlineKeyboardButton("🔒 Close Bets", callback_data=f"adm_close_{match_id}"),
-                InlineKeyboardButton("⏰ Set Time", callback_data=f"adm_settime_{match_id}")
-            ],
-            [
-                InlineKeyboardButton(f"🏆 {match[1]}", callback_data=f"adm_res_{match_id}_A"),
-                InlineKeyboardButton("🤝 Draw", callback_data=f"adm_res_{match_id}_DRAW"),
-                InlineKeyboardButton(f"🏆 {match[2]}", callback_data=f"adm_res_{match_id}_B")
-            ],
-            [
-                InlineKeyboardButton("📊 Set Score", callback_data=f"adm_score_{match_id}"),
-                InlineKeyboardButton("🗑️ Delete", callback_data=f"adm_delete_{match_id}")
-            ]
-        ]
-        await edit_or_ephemeral(
-            query.message,
-            f"🛠️ <b>Match #{match_id} Admin Panel</b>\n"
-            f"{match.get('team_a')} vs {match.get('team_b')}\n\n"
-            "Manage this match:",
-            reply_markup=InlineKeyboardMarkup(admin_keyboard),
-            parse_mode="HTML",
-            delay=ADMIN_EPHEMERAL_DELAY
-        )
+    meta = _MATCH_META.get(match_id) if action not in _AUTHORITATIVE_ACTIONS else None
+    if meta:
+        team_a, team_b = meta
+    else:
+        try:
+            match = await get_match_api(match_id)
+        except Exception:
+            match = None
+        if not match:
+            await query.answer("Match not found!", show_alert=True)
+            return
+        team_a, team_b = match.get("team_a"), match.get("team_b")
+        _remember_match(match_id, team_a, team_b)
+
+    await handler(update, context, match_id, args, team_a, team_b)
 
 async def prediction_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user = query.from_user
     data = query.data
     
-    parts = data.split("_")
+    # pred_<head>_<tail>: head is "show" or the match id
+    _, _, rest = data.partition("_")
+    head, _, tail = rest.partition("_")
+    if not tail or "_" in tail:
+        await query.answer("Invalid data", show_alert=True)
+        return
     
     # Handle pred_show_MATCHID from menu (show prediction buttons)
-    if len(parts) == 3 and parts[1] == "show":
-        match_id = int(parts[2])
+    if head == "show":
+        match_id = int(tail)
         match = await get_open_match_api(user.id, match_id)
         if not match:
             await query.answer("🛑 Match not found or closed.", show_alert=True)
             return
 
         team_a, team_b = match.get("team_a"), match.get("team_b")
-        
-        keyboard = [
-            [
-                InlineKeyboardButton(f"🏠 {team_a}", callback_data=f"pred_{match_id}_A"),
-                InlineKeyboardButton("🤝 Draw", callback_data=f"pred_{match_id}_DRAW"),
-                InlineKeyboardButton(f"✈️ {team_b}", callback_data=f"pred_{match_id}_B")
-            ],
-            [
-                InlineKeyboardButton("🔢 Predict Exact Score", callback_data=f"pred_{match_id}_SCORE")
-            ]
-        ]
         await query.answer()
         await edit_or_ephemeral(
             query.message,
             f"⚽ <b>Match #{match_id}</b>\n\n"
             f"🏟️ {team_a} vs {team_b}\n\n"
             "👇 Make your prediction:",
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=_build_prediction_markup(match_id, team_a, team_b),
             parse_mode="HTML"
         )
         return
     
     # Format: pred_MATCHID_CHOICE
-    if len(parts) != 3:
-        await query.answer("Invalid data", show_alert=True)
-        return
-        
-    match_id = int(parts[1])
-    choice = parts[2]  # A, B, DRAW, SCORE, notify, stats
+    match_id = int(head)
+    choice = tail  # A, B, DRAW, SCORE, notify, stats
     
     match = await get_open_match_api(user.id, match_id)
     if not match:
         await query.answer("🛑 Match not found or closed.", show_alert=True)
         return
     
-    # Handle Notify Me button
-    if choice == "notify":
-        await query.answer("🔔 You'll be notified when this match starts!", show_alert=True)
-        return
-    
-    # Handle View Stats button
-    if choice == "stats":
-        await query.answer("Open the Web App for stats.", show_alert=True)
-        await send_webapp_link(update, context, text="🌐 Open the Web App for match stats.", path="/leaderboards")
-        return
-        
-
-    if choice == "SCORE":
-        await query.answer()
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text=f"🔢 <b>Exact Score Prediction for Match #{match_id}</b>\n\n"
-                 f"Reply to this message with the score in format: <code>{match_id} score 2-1</code>",
-            parse_mode="HTML"
-        )
-        return
-        
-    # Map choice code to meaningful text for alert
-    team_name = choice
-    if choice == 'A':
-        team_name = match.get("team_a")
-    elif choice == 'B':
-        team_name = match.get("team_b")
+    match choice:
+        case "notify":
+            # Notify Me button
+            await query.answer("🔔 You'll be notified when this match starts!", show_alert=True)
+            return
+        case "stats":
+            # View Stats button
+            await query.answer("Open the Web App for stats.", show_alert=True)
+            await send_webapp_link(update, context, text="🌐 Open the Web App for match stats.", path="/leaderboards")
+            return
+        case "SCORE":
+            await query.answer()
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text=f"🔢 <b>Exact Score Prediction for Match #{match_id}</b>\n\n"
+                     f"Reply to this message with the score in format: <code>{match_id} score 2-1</code>",
+                parse_mode="HTML"
+            )
+            return
+        # Map choice code to meaningful text for alert
+        case "A":
+            team_name = match.get("team_a")
+        case "B":
+            team_name = match.get("team_b")
+        case _:
+            team_name = choice
 
     try:
-        await api_post("/api/predictions/place", user_id=user.id, json_body={
+        await place_prediction_api(user.id, {
             "match_id": match_id,
             "choice": choice
         })
@@ -629,9 +652,7 @@ async def score_prediction_msg_handler(update: Update, context: ContextTypes.DEF
     Handles messages like '1 score 2-1'
     """
     text = update.message.text.strip()
-    import re
-    # Pattern: MatchID score ScoreA-ScoreB (e.g. 1 score 2-1)
-    match = re.match(r'^(\d+)\s+score\s+(\d+)-(\d+)$', text, re.IGNORECASE)
+    match = SCORE_MSG_RE.match(text)
     if not match:
         return # Not a score prediction format, ignore
 
@@ -646,7 +667,7 @@ async def score_prediction_msg_handler(update: Update, context: ContextTypes.DEF
         return
 
     try:
-        await api_post("/api/predictions/place", user_id=user.id, json_body={
+        await place_prediction_api(user.id, {
             "match_id": match_id,
             "choice": "SCORE",
             "score_a": sa,
@@ -671,38 +692,38 @@ async def predict_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await send_ephemeral_reply(update, context, "⚠️ Please use the buttons on the match post to predict!")
 
 async def close_match_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    is_admin = await is_admin_or_owner(context.bot, update.effective_chat.id, update.effective_user.id)
+    is_admin = await is_admin_or_owner_cached(context.bot, update.effective_chat.id, update.effective_user.id)
     if not is_admin:
         await send_ephemeral_reply(update, context, "⛔ Admin only command.")
         return
 
     if not context.args:
-        await send_ephemeral_reply(update, context, "Usage: /closematch <MatchID>", delay=ADMIN_EPHEMERAL_DELAY)
+        await _ADM_REPLY(update, context, "Usage: /closematch <MatchID>")
         return
         
     try:
         match_id = int(context.args[0])
         await close_match_api(match_id)
-        await send_ephemeral_reply(update, context, f"🔒 Match #{match_id} bets are now CLOSED.", delay=ADMIN_EPHEMERAL_DELAY)
+        await _ADM_REPLY(update, context, f"🔒 Match #{match_id} bets are now CLOSED.")
     except ValueError:
-        await send_ephemeral_reply(update, context, "Invalid Match ID.", delay=ADMIN_EPHEMERAL_DELAY)
+        await _ADM_REPLY(update, context, "Invalid Match ID.")
 
 async def resolve_match_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Admin Only
-    is_admin = await is_admin_or_owner(context.bot, update.effective_chat.id, update.effective_user.id)
+    is_admin = await is_admin_or_owner_cached(context.bot, update.effective_chat.id, update.effective_user.id)
     if not is_admin:
         await send_ephemeral_reply(update, context, "⛔ Admin only command.")
         return
         
     # Usage: /setresult <ID> <A/B/DRAW or ScoreA-ScoreB>
     if len(context.args) < 2:
-        await send_ephemeral_reply(update, context, "Usage: /setresult <MatchID> <A | B | DRAW | ScoreA-ScoreB>", delay=ADMIN_EPHEMERAL_DELAY)
+        await _ADM_REPLY(update, context, "Usage: /setresult <MatchID> <A | B | DRAW | ScoreA-ScoreB>")
         return
         
     try:
         match_id = int(context.args[0])
     except ValueError:
-        await send_ephemeral_reply(update, context, "Match ID must be a number.", delay=ADMIN_EPHEMERAL_DELAY)
+        await _ADM_REPLY(update, context, "Match ID must be a number.")
         return
         
     result_input = context.args[1].upper().strip()
@@ -710,8 +731,7 @@ async def resolve_match_command(update: Update, context: ContextTypes.DEFAULT_TY
     score_a = None
     score_b = None
 
-    import re
-    score_match = re.match(r'^(\d+)-(\d+)$', result_input)
+    score_match = _SCORE_RESULT_RE.match(result_input)
 
     if score_match:
         score_a = int(score_match.group(1))
@@ -722,7 +742,7 @@ async def resolve_match_command(update: Update, context: ContextTypes.DEFAULT_TY
     elif result_input in ['A', 'B', 'DRAW']:
         winner_code = result_input
     else:
-        await send_ephemeral_reply(update, context, "❌ Invalid Result. Use: A, B, DRAW or 2-1", delay=ADMIN_EPHEMERAL_DELAY)
+        await _ADM_REPLY(update, context, "❌ Invalid Result. Use: A, B, DRAW or 2-1")
         return
     
     result = await resolve_match_api(match_id, winner_code, score_a, score_b)
@@ -734,8 +754,8 @@ async def resolve_match_command(update: Update, context: ContextTypes.DEFAULT_TY
         match = None
     winner_display = winner_code
     if match:
-        if winner_code == 'A': winner_display = match.get("team_a")
-        elif winner_code == 'B': winner_display = match.get("team_b")
+        if winner_code in ('A', 'B'):
+            winner_display = _winner_name(match.get("team_a"), match.get("team_b"), winner_code)
         if score_a is not None:
             winner_display = f"{match.get('team_a')} {score_a} - {score_b} {match.get('team_b')}"
     
@@ -1,36 +1,75 @@
 import asyncio
+import contextlib
+import logging
+import time
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from telegram.ext import ContextTypes, CallbackQueryHandler, CommandHandler
-from handlers.api_client import api_bot_get, api_bot_post
-from handlers.utils import private_only, delete_message_later, EPHEMERAL_DELAY, send_webapp_link, edit_or_ephemeral, build_webapp_url
+from handlers.api_client import api_bot_get, api_bot_post, BotApiError
+from handlers.utils import SendRateLimiter, CachedInlineKeyboardMarkup, private_only, schedule_delete, message_shows, EPHEMERAL_DELAY, send_webapp_link, edit_or_ephemeral, build_webapp_url
 import config
-from shared_constants import CLUBS_DATA, INTERESTS
+from shared_constants import CLUBS_DATA, INTERESTS, CLUB_BADGE_BY_KEY, CLUB_KEYS, CLUB_BADGES
+
+# (fetched_at (time.monotonic), chat_ids) of the last successful /admin/groups read
+GROUPS_CACHE_TTL = 30
+_GROUPS_CACHE = None
+
+def invalidate_groups_cache():
+    """Drop the cached broadcast chat list (call after the bot joins/leaves a group)."""
+    global _GROUPS_CACHE
+    _GROUPS_CACHE = None
 
 async def get_general_broadcast_chat_ids() -> list:
     """
     Return chat IDs for General broadcasts.
     Uses chat_category_routing so we only target the main group (no topic threads).
+    The list is cached for GROUPS_CACHE_TTL seconds; if the backend is down a
+    stale list is returned rather than an empty one.
     """
+    global _GROUPS_CACHE
+    now = time.monotonic()
+    if _GROUPS_CACHE is not None and now - _GROUPS_CACHE[0] < GROUPS_CACHE_TTL:
+        return _GROUPS_CACHE[1]
     try:
         data = await api_bot_get("/admin/groups")
         groups = data.get("groups", [])
         chat_ids = [g["chat_id"] for g in groups if isinstance(g, dict) and g.get("enabled")]
-        return chat_ids
-    except Exception:
-        return []
+    except BotApiError:
+        return _GROUPS_CACHE[1] if _GROUPS_CACHE is not None else []
+    _GROUPS_CACHE = (now, chat_ids)
+    return chat_ids
 
 def format_user_display(user) -> str:
     if user.username:
         return user.first_name or user.username
     return user.first_name or "User"
 
+BROADCAST_CONCURRENCY = 25
+_BROADCAST_SEM = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+# Telegram allows ~30 msg/sec per bot
+_broadcast_limiter = SendRateLimiter(rate=25)
+
 async def broadcast_general(context: ContextTypes.DEFAULT_TYPE, text: str):
     chat_ids = await get_general_broadcast_chat_ids()
-    for chat_id in chat_ids:
-        try:
-            await context.bot.send_message(chat_id=chat_id, text=text)
-        except Exception:
-            pass
+
+    async def send_one(chat_id):
+        async with _BROADCAST_SEM:
+            await _broadcast_limiter.acquire()
+            try:
+                await context.bot.send_message(chat_id=chat_id, text=text)
+            except Exception as e:
+                logging.debug(f"General broadcast to {chat_id} failed: {e}")
+
+    await asyncio.gather(*(send_one(chat_id) for chat_id in chat_ids))
+
+# Reverse lookups over CLUBS_DATA, built once
+_CLUB_BY_DISPLAY_NAME = {d["name"]: d for d in CLUBS_DATA.values() if isinstance(d, dict) and "name" in d}
+_CLUB_BADGES_BY_KEY = tuple(zip(CLUB_KEYS, CLUB_BADGES))
+_CLUB_EMOJI_BY_DISPLAY_NAME = {
+    name: parts[0] + " "
+    for name in _CLUB_BY_DISPLAY_NAME
+    for parts in (name.split(" ", 1),)
+    if len(parts) > 1
+}
 
 def get_club_badge_url(club_name: str) -> str:
     """
@@ -42,15 +81,18 @@ def get_club_badge_url(club_name: str) -> str:
         return None
     
     # Direct lookup by key
-    if club_name in CLUBS_DATA:
-        club_data = CLUBS_DATA[club_name]
-        return club_data.get("badge") if isinstance(club_data, dict) else None
+    if club_name in CLUB_BADGE_BY_KEY:
+        return CLUB_BADGE_BY_KEY[club_name]
+    
+    # Lookup by display name (stored in DB as emoji + name)
+    club_data = _CLUB_BY_DISPLAY_NAME.get(club_name)
+    if club_data:
+        return club_data.get("badge")
     
-    # Search by display name (stored in DB as emoji + name)
-    for key, data in CLUBS_DATA.items():
-        if isinstance(data, dict):
-            if data.get("name") == club_name or key in club_name:
-                return data.get("badge")
+    # Legacy values that merely contain the club key
+    for key, badge in _CLUB_BADGES_BY_KEY:
+        if key in club_name:
+            return badge
     
     return None
 
@@ -61,20 +103,68 @@ def get_club_emoji(club_name: str) -> str:
     """
     if not club_name:
         return ""
+    emoji = _CLUB_EMOJI_BY_DISPLAY_NAME.get(club_name)
+    if emoji is not None:
+        return emoji
+    # Free-form values (e.g. "🔴 Arsenal"): take the first token if it isn't plain ASCII
+    prefix, sep, _ = club_name.partition(" ")
+    return prefix + " " if sep and not prefix.isascii() else ""
+
+def _build_club_menu_markup():
+    # All clubs, sorted alphabetically, 2 buttons per row
+    keyboard = []
+    row = []
+    for club in sorted(CLUBS_DATA.keys()):
+        # Display with emoji in the button
+        club_data = CLUBS_DATA[club]
+        label = club_data["name"] if isinstance(club_data, dict) else club_data
+        row.append(InlineKeyboardButton(label, callback_data=f"set_club_{club}"))
+        if len(row) == 2:
+            keyboard.append(row)
+            row = []
+    if row:
+        keyboard.append(row)
+    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="menu_main")])
+    return CachedInlineKeyboardMarkup(keyboard)
+
+# Static menus, built once
+_MAIN_MENU_MARKUP = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("👕 Set My Club", callback_data="menu_club")],
+    [InlineKeyboardButton("📰 Set News Interests", callback_data="menu_interests")],
+    [InlineKeyboardButton("❌ Close", callback_data="close")]
+])
+_CLOSE_MARKUP = CachedInlineKeyboardMarkup([[InlineKeyboardButton("❌ Close", callback_data="close")]])
+_CLUB_MENU_MARKUP = _build_club_menu_markup()
+# Every interest button in both states, so a redraw is just lookups
+_INTEREST_BUTTONS = {
+    (item, selected): InlineKeyboardButton(f"✅ {item}" if selected else item, callback_data=f"toggle_int_{item}")
+    for item in INTERESTS
+    for selected in (True, False)
+}
+_INTERESTS_BACK_ROW = [InlineKeyboardButton("🔙 Back", callback_data="menu_main")]
+_WEBAPP_PROFILE_MARKUP = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("🌐 Open Web App", web_app=WebAppInfo(url=build_webapp_url("/profile")))]
+]) if config.WEBAPP_URL else None
+
+async def _show_club_updated(query, context, badge_display, badge_url):
+    success_text = f"✅ <b>Club updated!</b>\n\nYou are now supporting: {badge_display}"
     
-    # If the club_name already has emoji, extract it
-    if club_name and len(club_name) > 0:
-        # Check if starts with emoji (most emojis are 1-2 chars but can be longer with modifiers)
-        for key, data in CLUBS_DATA.items():
-            if isinstance(data, dict):
-                name = data.get("name", "")
-                if name == club_name:
-                    # Extract emoji part (everything before the space + club name)
-                    parts = name.split(" ", 1)
-                    if len(parts) > 1:
-                        return parts[0] + " "
+    # Try to send with badge image
+    if badge_url:
+        try:
+            await query.message.delete()
+            await context.bot.send_photo(
+                chat_id=query.message.chat_id,
+                photo=badge_url,
+                caption=success_text,
+                reply_markup=_CLOSE_MARKUP,
+                parse_mode="HTML"
+            )
+            return
+        except Exception:
+            pass  # Fall back to text-only
     
-    return ""
+    await query.message.edit_text(success_text, reply_markup=_CLOSE_MARKUP, parse_mode="HTML")
 
 @private_only
 async def setup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -82,17 +172,12 @@ async def setup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await send_webapp_link(update, context, text="🌐 Open the Web App to manage your profile & identity.", path="/profile")
 
 async def show_main_menu(message, is_new=False, context=None):
-    keyboard = [
-        [InlineKeyboardButton("👕 Set My Club", callback_data="menu_club")],
-        [InlineKeyboardButton("📰 Set News Interests", callback_data="menu_interests")],
-        [InlineKeyboardButton("❌ Close", callback_data="close")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = _MAIN_MENU_MARKUP
     text = "⚙️ <b>Profile Setup</b>\nChoose an option below:"
     
     if is_new:
         msg = await message.reply_text(text, reply_markup=reply_markup, parse_mode="HTML")
-        asyncio.create_task(delete_message_later(msg, EPHEMERAL_DELAY))
+        schedule_delete(msg, EPHEMERAL_DELAY)
     else:
         # Check if this is a photo message (can't edit_text on photos)
         if message.photo:
@@ -107,14 +192,14 @@ async def show_main_menu(message, is_new=False, context=None):
                         reply_markup=reply_markup,
                         parse_mode="HTML"
                     )
-                    asyncio.create_task(delete_message_later(msg, EPHEMERAL_DELAY))
+                    schedule_delete(msg, EPHEMERAL_DELAY)
             except Exception:
                 pass
-        else:
+        elif not message_shows(message, text, reply_markup, "HTML"):
             # Edit existing text message
             try:
                 await message.edit_text(text, reply_markup=reply_markup, parse_mode="HTML")
-                asyncio.create_task(delete_message_later(message, EPHEMERAL_DELAY))
+                schedule_delete(message, EPHEMERAL_DELAY)
             except Exception:
                 pass # Content didn't change
 
@@ -133,7 +218,7 @@ async def profile_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await edit_or_ephemeral(
             query.message,
             "🌐 <b>Open the Web App</b> to manage your profile & identity:",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🌐 Open Web App", web_app=WebAppInfo(url=build_webapp_url("/profile")))]]),
+            reply_markup=_WEBAPP_PROFILE_MARKUP,
             parse_mode="HTML"
         )
         return
@@ -143,25 +228,7 @@ async def profile_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if data == "menu_club":
-        # Generate buttons for all clubs
-        keyboard = []
-        row = []
-        # Sort clubs alphabetically
-        sorted_clubs = sorted(CLUBS_DATA.keys())
-        
-        for club in sorted_clubs:
-            # Display with emoji in the button
-            club_data = CLUBS_DATA[club]
-            label = club_data["name"] if isinstance(club_data, dict) else club_data
-            row.append(InlineKeyboardButton(label, callback_data=f"set_club_{club}"))
-            if len(row) == 2: # 2 buttons per row
-                keyboard.append(row)
-                row = []
-        if row:
-            keyboard.append(row)
-        
-        keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="menu_main")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _CLUB_MENU_MARKUP
         text = "👕 <b>Select Your Club</b>\nThis badge will appear on your profile."
         
         # Handle photo messages - can't edit_text on photos
@@ -177,11 +244,13 @@ async def profile_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
             except Exception:
                 pass
-        else:
+        elif not message_shows(query.message, text, reply_markup, "HTML"):
             await query.message.edit_text(text, reply_markup=reply_markup, parse_mode="HTML")
         return
 
     if data == "menu_interests":
+        # Opening the menu always reads fresh state from the backend
+        context.user_data.pop("interests", None)
         await show_interests_menu(query, user.id, context)
         return
 
@@ -195,85 +264,60 @@ async def profile_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         badge_display = club_data["name"]
         badge_url = club_data.get("badge")
         
-        # Save to backend
-        try:
-            await api_bot_post(f"/admin/users/{user.id}/profile", {
-                "club": badge_display
-            })
-        except Exception:
-            pass
-        
-        # Show success confirmation
-        keyboard = [[InlineKeyboardButton("❌ Close", callback_data="close")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        success_text = f"✅ <b>Club updated!</b>\n\nYou are now supporting: {badge_display}"
-        
-        # Try to send with badge image
-        if badge_url:
-            try:
-                await query.message.delete()
-                await context.bot.send_photo(
-                    chat_id=query.message.chat_id,
-                    photo=badge_url,
-                    caption=success_text,
-                    reply_markup=reply_markup,
-                    parse_mode="HTML"
-                )
-                return
-            except Exception:
-                pass  # Fall back to text-only
-        
-        await query.message.edit_text(success_text, reply_markup=reply_markup, parse_mode="HTML")
+        # Save to backend while the confirmation is shown; neither depends on the other
+        saved, shown = await asyncio.gather(
+            api_bot_post(f"/admin/users/{user.id}/profile", {"club": badge_display}),
+            _show_club_updated(query, context, badge_display, badge_url),
+            return_exceptions=True
+        )
+        if isinstance(saved, Exception):
+            logging.warning(f"Failed to save club for user {user.id}: {saved}")
+        if isinstance(shown, Exception):
+            raise shown
         return
 
     if data.startswith("toggle_int_"):
         interest = data.replace("toggle_int_", "")
         
-        # Get current interests from backend
-        try:
-            user_data = await api_bot_get(f"/admin/users/{user.id}")
-            current_interests = user_data.get("interests", "").split(',') if user_data.get("interests") else []
-        except Exception:
-            current_interests = []
+        current_interests = await _get_interests(user.id, context)
         
         if interest in current_interests:
-            current_interests.remove(interest) # Toggle Off
+            current_interests.discard(interest) # Toggle Off
         else:
-            current_interests.append(interest) # Toggle On
+            current_interests.add(interest) # Toggle On
             
-        new_interests_str = ",".join(current_interests)
-        try:
+        new_interests_str = ",".join(sorted(current_interests))
+        with contextlib.suppress(BotApiError):
             await api_bot_post(f"/admin/users/{user.id}/profile", {
                 "interests": new_interests_str
             })
-        except Exception:
-            pass
+            # Remember what we just saved so the redraw doesn't re-GET it
+            context.user_data["interests"] = new_interests_str
         
         # Refresh the menu instantly
         await show_interests_menu(query, user.id, context)
         return
 
+async def _get_interests(user_id, context=None):
+    """Current interests as a set, from context.user_data when we last wrote them, else the backend."""
+    interests = context.user_data.get("interests") if context else None
+    if interests is None:
+        try:
+            user_data = await api_bot_get(f"/admin/users/{user_id}")
+            interests = user_data.get("interests") or ""
+        except BotApiError:
+            return set()
+        if context:
+            context.user_data["interests"] = interests
+    return {item for item in interests.split(',') if item}
+
 async def show_interests_menu(query, user_id, context=None):
-    try:
-        user_data = await api_bot_get(f"/admin/users/{user_id}")
-        current_interests = user_data.get("interests", "").split(',') if user_data.get("interests") else []
-    except Exception:
-        current_interests = []
+    current_interests = await _get_interests(user_id, context)
     
-    keyboard = []
-    row = []
-    for item in INTERESTS:
-        # Add Checkmark if selected
-        label = f"✅ {item}" if item in current_interests else item
-        row.append(InlineKeyboardButton(label, callback_data=f"toggle_int_{item}"))
-        if len(row) == 2:
-            keyboard.append(row)
-            row = []
-    if row:
-        keyboard.append(row)
-        
-    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="menu_main")])
+    # Add Checkmark if selected, 2 buttons per row
+    buttons = [_INTEREST_BUTTONS[item, item in current_interests] for item in INTERESTS]
+    keyboard = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    keyboard.append(_INTERESTS_BACK_ROW)
     reply_markup = InlineKeyboardMarkup(keyboard)
     text = "📰 <b>Select News Interests</b>\nClick to toggle on/off."
     
@@ -291,7 +335,7 @@ async def show_interests_menu(query, user_id, context=None):
                 )
         except Exception:
             pass
-    else:
+    elif not message_shows(query.message, text, reply_markup, "HTML"):
         try:
             await query.message.edit_text(text, reply_markup=reply_markup, parse_mode="HTML")
         except Exception:
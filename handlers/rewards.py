@@ -1,17 +1,78 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import config
+import asyncio
 import logging
 import re
-import asyncio
+import contextlib
 
-from handlers.api_client import api_bot_get, api_bot_post
+from handlers.api_client import api_bot_get, api_bot_post, BotApiError
 from handlers.roles import get_user_role, check_role, ROLE_ADMIN
-from handlers.utils import delete_message_later, EPHEMERAL_DELAY
+from handlers.utils import TTLCache, CachedInlineKeyboardMarkup, schedule_delete, EPHEMERAL_DELAY, run_in_background
 
 # Track which users have "opened" links (clicked Open Link button)
-# {(user_id, link_id): True}
-LINK_OPENS = {}
+# {(user_id, link_id): True}, expiring after LINK_OPEN_TTL seconds.
+# Bounded so first-click-but-never-claimed entries don't pile up forever.
+LINK_OPEN_TTL = 3600
+LINK_OPENS_MAX = 100_000
+LINK_OPENS = TTLCache(LINK_OPENS_MAX, LINK_OPEN_TTL)
+
+# Reactions are claimed in batches: {(user_id, message_id): chat_id}, flushed
+# every REACTION_FLUSH_INTERVAL seconds in one backend call (one transaction)
+REACTION_FLUSH_INTERVAL = 0.5
+_REACTION_BUFFER = {}
+_reaction_flush_task = None
+
+async def _flush_reactions():
+    pending = dict(_REACTION_BUFFER)
+    _REACTION_BUFFER.clear()
+    items = [
+        {"user_id": user_id, "message_id": message_id, "chat_id": chat_id}
+        for (user_id, message_id), chat_id in pending.items()
+    ]
+    try:
+        await api_bot_post("/admin/reactions/claim-bulk", {"items": items, "reward": config.REACTION_REWARD})
+    except BotApiError as e:
+        logging.error(f"Failed to claim {len(items)} reaction rewards: {e}")
+        # Put them back so the next flush retries (the backend dedupes repeats)
+        for key, chat_id in pending.items():
+            _REACTION_BUFFER.setdefault(key, chat_id)
+
+async def _reaction_flush_loop():
+    # Exits once the buffer is drained; _schedule_reaction_flush restarts it
+    while _REACTION_BUFFER:
+        await asyncio.sleep(REACTION_FLUSH_INTERVAL)
+        await _flush_reactions()
+
+def _schedule_reaction_flush():
+    global _reaction_flush_task
+    if _reaction_flush_task is None or _reaction_flush_task.done():
+        _reaction_flush_task = run_in_background(_reaction_flush_loop())
+
+# Users already ensured by this process: {user_id: username}, oldest first.
+# A changed username falls through so the backend copy gets refreshed.
+ENSURED_USERS_MAX = 50_000
+_ENSURED_USERS = TTLCache(ENSURED_USERS_MAX)
+
+async def _ensure_user(user_id, username):
+    if _ENSURED_USERS.get(user_id) == username:
+        return
+    try:
+        await api_bot_post("/admin/users/ensure", {
+            "user_id": user_id,
+            "username": username
+        })
+    except BotApiError:
+        return
+    _ENSURED_USERS.set(user_id, username)
+
+_URL_RE = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+
+_TEST_REWARDS_MARKUP = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("🎁 Claim Test Reward (+5 Coins)", callback_data="reward_link_test")],
+    [InlineKeyboardButton("🚀 Open Google (Test)", url="https://google.com")],
+    [InlineKeyboardButton("📤 Share (+2 Coins)", callback_data="reward_share")]
+])
 
 async def handle_admin_link_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -34,15 +95,11 @@ async def handle_admin_link_post(update: Update, context: ContextTypes.DEFAULT_T
     if not check_role(user_role, ROLE_ADMIN):
         return
     
-    # Extract URLs from message
-    url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-    urls = re.findall(url_pattern, message.text)
-    
-    if not urls:
-        return
-    
     # Use the first URL found
-    url = urls[0]
+    url_match = _URL_RE.search(message.text)
+    if not url_match:
+        return
+    url = url_match.group(0)
     
     # Create tracked link via backend
     try:
@@ -77,7 +134,7 @@ async def handle_admin_link_post(update: Update, context: ContextTypes.DEFAULT_T
                 parse_mode="HTML",
                 disable_web_page_preview=True
             )
-            asyncio.create_task(delete_message_later(msg, EPHEMERAL_DELAY))
+            schedule_delete(msg, EPHEMERAL_DELAY)
         except:
             pass
 
@@ -94,40 +151,89 @@ async def reaction_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not reaction.new_reaction:
         return
     
-    # Check if user already reacted via backend
+    # Backend skips the credit if this reaction was already rewarded
+    _REACTION_BUFFER[(user.id, message_id)] = chat_id
+    _schedule_reaction_flush()
+
+async def test_rewards_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Sends a test button to verify link rewards"""
+    await update.message.reply_text("👇 <b>Reward System Test</b>\nClick the buttons below to verify rewards:", reply_markup=_TEST_REWARDS_MARKUP, parse_mode="HTML")
+
+async def _claim_link_reward(query, user_id, link_suffix):
+    # Format: clk_LINKID
+    try:
+        link_id = int(link_suffix)
+    except ValueError:
+        await query.answer("⚠️ Invalid Link Data", show_alert=True)
+        return
+    
+    # Verification: Check if user has "opened" the link first
+    attempt_key = (user_id, link_id)
+    if not LINK_OPENS.get(attempt_key):
+        # Already claimed? Only worth asking before the open-link reminder; on the
+        # claim press the backend's claim result says so itself
+        with contextlib.suppress(BotApiError):
+            result = await api_bot_get(f"/admin/links/{link_id}/clicks", params={"user_id": user_id})
+            if result.get("already_clicked"):
+                await query.answer("✅ You already claimed this reward!", show_alert=False)
+                return
+        
+        # First click on Claim - remind them to open link first
+        LINK_OPENS.set(attempt_key, True)
+        await query.answer(
+            "👆 First, click 'Open Link' above!\n"
+            "Then click Claim Reward again.",
+            show_alert=True
+        )
+        return
+    
+    # Second click - record and credit atomically via backend
     try:
-        result = await api_bot_get(f"/admin/reactions/check", params={
-            "user_id": user.id,
-            "message_id": message_id
+        result = await api_bot_post(f"/admin/links/{link_id}/claim", {
+            "user_id": user_id,
+            "reward": config.LINK_CLICK_REWARD
         })
-        if result.get("already_reacted"):
-            return
-    except Exception:
+    except Exception as e:
+        logging.error(f"Failed to claim link reward for user {user_id}: {e}")
+        await query.answer("⚠️ Reward failed. Try again.", show_alert=True)
         return
     
-    # Record reaction and reward
+    # Clean up the tracking
+    LINK_OPENS.pop(attempt_key, None)
+    if result.get("credited"):
+        await query.answer(f"✅ +{config.LINK_CLICK_REWARD} Coins added!", show_alert=True)
+    else:
+        await query.answer("✅ You already claimed this reward!", show_alert=False)
+
+async def _answer_claimed(query, user_id):
+    await query.answer("✅ You've already claimed this reward!", show_alert=False)
+
+async def _reward_link_test(query, user_id):
     try:
-        await api_bot_post("/admin/reactions", {
-            "user_id": user.id,
-            "message_id": message_id,
-            "chat_id": chat_id
+        await api_bot_post(f"/admin/users/{user_id}/balance", {
+            "amount": config.LINK_CLICK_REWARD,
+            "reason": "test"
         })
-        await api_bot_post(f"/admin/users/{user.id}/balance", {
-            "amount": config.REACTION_REWARD,
-            "reason": "reaction"
+        await query.answer(f"✅ Test Success! +{config.LINK_CLICK_REWARD} coins", show_alert=True)
+    except BotApiError:
+        await query.answer("❌ Test Failed", show_alert=True)
+
+async def _reward_share(query, user_id):
+    try:
+        await api_bot_post(f"/admin/users/{user_id}/balance", {
+            "amount": config.LINK_SHARE_REWARD,
+            "reason": "share"
         })
-    except Exception:
-        pass
+        await query.answer(f"✅ +{config.LINK_SHARE_REWARD} coins for sharing!")
+    except BotApiError:
+        await query.answer("❌ Share reward failed")
 
-async def test_rewards_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Sends a test button to verify link rewards"""
-    keyboard = [
-        [InlineKeyboardButton("🎁 Claim Test Reward (+5 Coins)", callback_data="reward_link_test")],
-        [InlineKeyboardButton("🚀 Open Google (Test)", url="https://google.com")],
-        [InlineKeyboardButton("📤 Share (+2 Coins)", callback_data="reward_share")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("👇 <b>Reward System Test</b>\nClick the buttons below to verify rewards:", reply_markup=reply_markup, parse_mode="HTML")
+# Exact-match reward callbacks; clk_<id> is handled by prefix
+_REWARD_HANDLERS = {
+    "claimed": _answer_claimed,
+    "reward_link_test": _reward_link_test,
+    "reward_share": _reward_share,
+}
 
 async def reward_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -138,100 +244,27 @@ async def reward_callback_handler(update: Update, context: ContextTypes.DEFAULT_
     data = query.data
     user_id = query.from_user.id
     
-    # Ensure user is in database
-    try:
-        await api_bot_post("/admin/users/ensure", {
-            "user_id": user_id,
-            "username": query.from_user.username or ""
-        })
-    except Exception:
-        pass
+    # Ensure user is in database (once per process unless the username changes)
+    await _ensure_user(user_id, query.from_user.username or "")
 
-    if data.startswith("clk_"):
-        # Format: clk_LINKID
-        try:
-            link_id = int(data.split("_")[1])
-        except:
-            await query.answer("⚠️ Invalid Link Data", show_alert=True)
-            return
-        
-        # Check if already claimed via backend
-        try:
-            result = await api_bot_get(f"/admin/links/{link_id}/clicks", params={"user_id": user_id})
-            if result.get("already_clicked"):
-                await query.answer("✅ You already claimed this reward!", show_alert=False)
-                return
-        except Exception:
-            pass
-        
-        # Verification: Check if user has "opened" the link first
-        attempt_key = (user_id, link_id)
-        if attempt_key not in LINK_OPENS:
-            # First click on Claim - remind them to open link first
-            LINK_OPENS[attempt_key] = True
-            await query.answer(
-                "👆 First, click 'Open Link' above!\n"
-                "Then click Claim Reward again.",
-                show_alert=True
-            )
-            return
-        
-        # Second click - process the reward via backend
-        try:
-            await api_bot_post(f"/admin/links/{link_id}/clicks", {
-                "user_id": user_id
-            })
-            await api_bot_post(f"/admin/users/{user_id}/balance", {
-                "amount": config.LINK_CLICK_REWARD,
-                "reason": "link_click"
-            })
-            await query.answer(f"✅ +{config.LINK_CLICK_REWARD} Coins added!", show_alert=True)
-            
-            # Clean up the tracking
-            if attempt_key in LINK_OPENS:
-                del LINK_OPENS[attempt_key]
-        except Exception as e:
-            await query.answer("⚠️ Reward failed. Try again.", show_alert=True)
-    
-    elif data == "claimed":
-        await query.answer("✅ You've already claimed this reward!", show_alert=False)
-
-    elif data == "reward_link_test":
-        try:
-            await api_bot_post(f"/admin/users/{user_id}/balance", {
-                "amount": config.LINK_CLICK_REWARD,
-                "reason": "test"
-            })
-            await query.answer(f"✅ Test Success! +{config.LINK_CLICK_REWARD} coins", show_alert=True)
-        except Exception:
-            await query.answer("❌ Test Failed", show_alert=True)
-
-    elif data == "reward_share":
-        try:
-            await api_bot_post(f"/admin/users/{user_id}/balance", {
-                "amount": config.LINK_SHARE_REWARD,
-                "reason": "share"
-            })
-            await query.answer(f"✅ +{config.LINK_SHARE_REWARD} coins for sharing!")
-        except Exception:
-            await query.answer("❌ Share reward failed")
+    prefix, _, suffix = data.partition("_")
+    if prefix == "clk":
+        await _claim_link_reward(query, user_id, suffix)
+    elif handler := _REWARD_HANDLERS.get(data):
+        await handler(query, user_id)
 
 async def prediction_reward_placeholder(user_id):
     """Call this when a prediction is successful in the future"""
-    try:
+    with contextlib.suppress(BotApiError):
         await api_bot_post(f"/admin/users/{user_id}/balance", {
             "amount": config.PREDICTION_REWARD,
             "reason": "prediction"
         })
-    except Exception:
-        pass
 
 async def reaction_reward_placeholder(user_id):
     """Call this when a reaction is detected on a specific post"""
-    try:
+    with contextlib.suppress(BotApiError):
         await api_bot_post(f"/admin/users/{user_id}/balance", {
             "amount": config.REACTION_REWARD,
             "reason": "reaction"
         })
-    except Exception:
-        pass
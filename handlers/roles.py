@@ -1,10 +1,11 @@
 from telegram import Update, Bot
 from telegram.ext import ContextTypes
 from telegram.constants import ChatMemberStatus
-from handlers.api_client import api_get, api_bot_get, api_bot_post
+from handlers.api_client import api_get, api_bot_get, api_bot_post, BotApiError
 import config
 import logging
-from handlers.utils import send_ephemeral_reply, ADMIN_EPHEMERAL_DELAY
+import asyncio
+from handlers.utils import TTLCache, send_ephemeral_reply, ADMIN_EPHEMERAL_DELAY
 
 # Role Constants
 ROLE_OWNER = 'OWNER'
@@ -14,14 +15,37 @@ ROLE_VIP = 'VIP'
 ROLE_MEMBER = 'MEMBER'
 
 # Hierarchy: Higher number = Higher privilege
+V_OWNER = 100
+V_ADMIN = 80
+V_MOD = 60
+V_VIP = 40
+V_MEMBER = 20
+
 ROLE_HIERARCHY = {
-    ROLE_OWNER: 100,
-    ROLE_ADMIN: 80,
-    ROLE_MOD: 60,
-    ROLE_VIP: 40,
-    ROLE_MEMBER: 20
+    ROLE_OWNER: V_OWNER,
+    ROLE_ADMIN: V_ADMIN,
+    ROLE_MOD: V_MOD,
+    ROLE_VIP: V_VIP,
+    ROLE_MEMBER: V_MEMBER
 }
 
+# Short-lived is_admin_or_owner results: {(chat_id, user_id): is_admin}
+ADMIN_CHECK_TTL = 30.0
+ADMIN_CHECK_CACHE_SIZE = 4096
+_ADMIN_CHECK_CACHE = TTLCache(ADMIN_CHECK_CACHE_SIZE, ADMIN_CHECK_TTL)
+
+# Telegram chat-admin lookups: {(chat_id, user_id): is_admin},
+# invalidated on chat_member updates
+TELEGRAM_ADMIN_TTL = 60.0
+TELEGRAM_ADMIN_CACHE_SIZE = 4096
+_TELEGRAM_ADMIN_CACHE = TTLCache(TELEGRAM_ADMIN_CACHE_SIZE, TELEGRAM_ADMIN_TTL)
+
+# Backend role lookups: {user_id: role}, invalidated by set_role_command
+ROLE_CACHE_TTL = 60.0
+ROLE_CACHE_SIZE = 5000
+_ROLE_CACHE = TTLCache(ROLE_CACHE_SIZE, ROLE_CACHE_TTL)
+_INFLIGHT_ROLE_FETCHES = {}  # {user_id: Task}, so concurrent misses share one request
+
 def get_role_value(role_name):
     return ROLE_HIERARCHY.get(role_name, 0)
 
@@ -41,55 +65,103 @@ async def is_telegram_admin(bot: Bot, chat_id: int, user_id: int) -> bool:
         logging.debug(f"Error checking Telegram admin status: {e}")
         return False
 
+async def is_telegram_admin_cached(bot: Bot, chat_id: int, user_id: int) -> bool:
+    """is_telegram_admin, memoized per (chat, user) for TELEGRAM_ADMIN_TTL seconds (failures aren't cached)."""
+    if chat_id > 0:
+        return True
+    key = (chat_id, user_id)
+    hit = _TELEGRAM_ADMIN_CACHE.get(key)
+    if hit is not None:
+        return hit
+    try:
+        member = await bot.get_chat_member(chat_id, user_id)
+    except Exception as e:
+        logging.debug(f"Error checking Telegram admin status: {e}")
+        return False
+    is_admin = member.status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]
+    _TELEGRAM_ADMIN_CACHE.set(key, is_admin)
+    return is_admin
+
+def invalidate_admin_status(chat_id: int, user_id: int):
+    """Forget cached admin checks for a member whose chat status just changed."""
+    _TELEGRAM_ADMIN_CACHE.pop((chat_id, user_id), None)
+    _ADMIN_CHECK_CACHE.pop((chat_id, user_id), None)
+
 async def is_admin_or_owner(bot: Bot, chat_id: int, user_id: int) -> bool:
     """
     Check if user has admin permissions. Returns True if:
     - User is the bot OWNER (from config)
-    - User has ADMIN role in the bot's database
     - User is a Telegram admin/owner in the chat (for group commands)
+    - User has ADMIN role in the bot's database
     
+    Cheapest checks first: most group admin commands come from chat admins,
+    so the backend is only asked when Telegram says no.
     This function should be used for admin commands that can work in groups.
     """
     # 1. Check if user is the bot owner
     if user_id == config.OWNER_ID:
         return True
     
-    # 2. Check backend role
-    try:
-        data = await api_get("/user/me", user_id=user_id)
-        role = (data.get("role") or "").upper()
-        if role in [ROLE_OWNER, ROLE_ADMIN]:
-            return True
-    except Exception:
-        pass
-    
-    # 3. For group chats, also check if user is a Telegram admin
+    # 2. For group chats, check if user is a Telegram admin
     if chat_id < 0:  # Negative chat_id means group/supergroup
-        return await is_telegram_admin(bot, chat_id, user_id)
+        if await is_telegram_admin_cached(bot, chat_id, user_id):
+            return True
     
-    return False
+    # 3. Check backend role
+    return await get_user_role(user_id) in (ROLE_OWNER, ROLE_ADMIN)
+
+async def is_admin_or_owner_cached(bot: Bot, chat_id: int, user_id: int) -> bool:
+    """is_admin_or_owner, memoized per (chat, user) for ADMIN_CHECK_TTL seconds."""
+    key = (chat_id, user_id)
+    hit = _ADMIN_CHECK_CACHE.get(key)
+    if hit is not None:
+        return hit
+    is_admin = await is_admin_or_owner(bot, chat_id, user_id)
+    _ADMIN_CHECK_CACHE.set(key, is_admin)
+    return is_admin
 
 async def get_user_role(user_id):
     # 1. Check Config Owner
     if user_id == config.OWNER_ID:
         return ROLE_OWNER
-        
-    # 2. Check Backend
+    
+    # 2. Cached backend role
+    role = _ROLE_CACHE.get(user_id)
+    if role is not None:
+        return role
+    
+    task = _INFLIGHT_ROLE_FETCHES.get(user_id)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_user_role(user_id))
+        _INFLIGHT_ROLE_FETCHES[user_id] = task
+        task.add_done_callback(lambda _: _INFLIGHT_ROLE_FETCHES.pop(user_id, None))
+    return await asyncio.shield(task)
+
+def invalidate_role(user_id):
+    """Drop a cached role, and the admin checks derived from it, so the next lookup hits the backend."""
+    _ROLE_CACHE.pop(user_id, None)
+    _ADMIN_CHECK_CACHE.prune(lambda key: key[1] == user_id)
+
+async def _fetch_user_role(user_id):
     try:
         data = await api_get("/user/me", user_id=user_id)
-        role = (data.get("role") or "").upper()
-        if role in ROLE_HIERARCHY:
-            return role
-    except Exception:
-        pass
-            
-    return ROLE_MEMBER
+    except BotApiError:
+        # Don't cache failures: a backend blip shouldn't demote admins for a minute
+        return ROLE_MEMBER
+    role = (data.get("role") or "").upper()
+    if role not in ROLE_HIERARCHY:
+        role = ROLE_MEMBER
+    _ROLE_CACHE.set(user_id, role)
+    return role
 
 def check_role(user_role, required_role):
     """
     Returns True if user_role has equal or higher privilege than required_role.
+    required_role may also be a V_* value, which skips its lookup.
     """
-    return get_role_value(user_role) >= get_role_value(required_role)
+    if isinstance(required_role, str):
+        required_role = ROLE_HIERARCHY.get(required_role, 0)
+    return ROLE_HIERARCHY.get(user_role, 0) >= required_role
 
 async def set_role_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
@@ -145,6 +217,7 @@ async def set_role_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # 6. Execute
     await api_bot_post(f"/admin/users/{target_id}/role", json_body={"role": new_role})
+    invalidate_role(target_id)
     await send_ephemeral_reply(update, context, f"✅ Role for {target_username} updated to <b>{new_role}</b>.", parse_mode="HTML", delay=ADMIN_EPHEMERAL_DELAY)
 
 async def list_roles_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
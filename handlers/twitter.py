@@ -14,21 +14,36 @@ Alternative: Uses Nitter instances as fallback if no API key is provided.
 import os
 import asyncio
 import aiohttp
+import json
 import logging
+import random
 import re
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict
 from datetime import datetime, timedelta
+from io import BytesIO
+from urllib.parse import unquote, urlsplit
 from typing import List, Dict, Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from telegram.error import BadRequest, TelegramError
 from handlers.roles import get_user_role, check_role, ROLE_ADMIN
-from handlers.utils import send_ephemeral_reply, ADMIN_EPHEMERAL_DELAY
+from handlers.utils import send_ephemeral_reply, ADMIN_EPHEMERAL_DELAY, SendRateLimiter
+
+# orjson parses the API payloads faster when available; stdlib json otherwise
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # Try to import async database, fallback to sync
 try:
     from async_database import (
         add_twitter_feed, remove_twitter_feed, get_active_twitter_feeds,
-        update_last_tweet_id, is_tweet_posted, mark_tweet_posted,
-        SPORT_TYPES, get_sport_emoji
+        get_posted_tweet_ids, finalize_feed_posts, set_twitter_user_id,
+        SPORT_TYPES, get_sport_emoji, get_pool
     )
     ASYNC_DB = True
 except ImportError:
@@ -46,6 +61,14 @@ except ImportError:
 # Twitter API configuration
 TWITTER_BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN")
 TWITTER_API_BASE = "https://api.twitter.com/2"
+# username -> user ID mappings don't change, so resolve each account at most daily
+USER_ID_CACHE_TTL = 24 * 3600
+# Fixed query fields for the user tweets endpoint
+_BASE_TWEET_PARAMS = (
+    ("tweet.fields", "created_at,text,attachments"),
+    ("expansions", "attachments.media_keys"),
+    ("media.fields", "url,preview_image_url"),
+)
 
 # Nitter instances (fallback if no API key)
 NITTER_INSTANCES = [
@@ -54,6 +77,25 @@ NITTER_INSTANCES = [
     "https://nitter.poast.org"
 ]
 
+# Per-host rate limiting from x-rate-limit-* headers: wait out short resets,
+# skip the request if the window reopens later than this; retry 429s with backoff
+RATE_LIMIT_MAX_WAIT = 60
+RATE_LIMIT_RETRIES = 3
+
+# Feed polling: concurrent fetches per check
+FEED_CONCURRENCY = 16
+
+# Telegram send limits: ~30 msg/sec per bot, ~1 msg/sec per chat
+_TG_LIMITER = SendRateLimiter(rate=25)
+_CHAT_LIMITERS = defaultdict(lambda: SendRateLimiter(rate=1))
+
+# Media Telegram can take as a photo; anything else (video, gif) goes out as text
+_PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+# Nitter RSS: tweet id from the item link, media images from the description HTML
+_STATUS_RE = re.compile(r'/status/(\d+)')
+_MEDIA_SRC_RE = re.compile(r'src="([^"]*(?:pic/|media/)[^"]*)"')
+
 class TwitterClient:
     """Twitter API client with Nitter fallback"""
     
@@ -61,166 +103,250 @@ class TwitterClient:
         self.bearer_token = bearer_token or TWITTER_BEARER_TOKEN
         self.use_api = bool(self.bearer_token)
         self.session: Optional[aiohttp.ClientSession] = None
+        # {username: (user_id, resolved_at (time.monotonic))}
+        self._user_id_cache: Dict[str, tuple] = {}
+        # {host: (remaining, reset_at (epoch seconds))} from the last response
+        self._rate_limits: Dict[str, tuple] = {}
     
     async def get_session(self) -> aiohttp.ClientSession:
+        # One pooled session for the process: keep-alive connections and cached
+        # DNS mean repeat polls skip the DNS lookup and TLS handshake
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=16,
+                ttl_dns_cache=300,
+                keepalive_timeout=75
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=15, connect=5),
+                headers={"User-Agent": "Dave.sports/1.0"}
+            )
         return self.session
     
     async def close(self):
         if self.session and not self.session.closed:
             await self.session.close()
     
-    async def get_user_tweets(self, username: str, since_id: str = None, limit: int = 5) -> List[Dict]:
-        """Get recent tweets from a user"""
+    async def _get(self, url: str, headers: Dict = None, params=None, timeout=None) -> tuple:
+        """GET honouring the host's rate-limit headers. Returns (status, body bytes)."""
+        session = await self.get_session()
+        host = urlsplit(url).netloc
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            remaining, reset_at = self._rate_limits.get(host, (None, 0))
+            if remaining == 0:
+                wait = reset_at - time.time()
+                if wait > RATE_LIMIT_MAX_WAIT:
+                    logging.warning(f"Rate limited by {host} for {wait:.0f}s more, skipping request")
+                    return 429, b""
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            
+            # Only pass timeout when given; timeout=None would disable the session's
+            kwargs = {"timeout": timeout} if timeout is not None else {}
+            async with session.get(url, headers=headers, params=params, **kwargs) as resp:
+                if "x-rate-limit-remaining" in resp.headers:
+                    try:
+                        self._rate_limits[host] = (
+                            int(resp.headers["x-rate-limit-remaining"]),
+                            float(resp.headers.get("x-rate-limit-reset", 0))
+                        )
+                    except ValueError:
+                        pass
+                if resp.status != 429 or attempt == RATE_LIMIT_RETRIES:
+                    return resp.status, await resp.read()
+            
+            # Exponential backoff with jitter before retrying a 429
+            await asyncio.sleep(2 ** attempt + random.random())
+    
+    async def get_user_tweets(self, username: str, since_id: str = None, limit: int = 5, user_id: str = None) -> List[Dict]:
+        """Get recent tweets from a user (user_id, if already known, saves the username lookup)"""
         if self.use_api:
+            if user_id and username not in self._user_id_cache:
+                self._user_id_cache[username] = (user_id, time.monotonic())
             return await self._get_tweets_api(username, since_id, limit)
         else:
             return await self._get_tweets_nitter(username, limit)
     
     async def _get_tweets_api(self, username: str, since_id: str = None, limit: int = 5) -> List[Dict]:
         """Fetch tweets using official Twitter API v2"""
-        session = await self.get_session()
-        
         headers = {
             "Authorization": f"Bearer {self.bearer_token}"
         }
         
         try:
             # First get user ID
-            user_url = f"{TWITTER_API_BASE}/users/by/username/{username}"
-            async with session.get(user_url, headers=headers) as resp:
-                if resp.status != 200:
-                    logging.error(f"Twitter API error getting user: {resp.status}")
-                    return []
-                user_data = await resp.json()
-                user_id = user_data.get("data", {}).get("id")
-                if not user_id:
-                    return []
+            user_id = await self._resolve_user_id(headers, username)
+            if not user_id:
+                return []
             
             # Get tweets
             tweets_url = f"{TWITTER_API_BASE}/users/{user_id}/tweets"
-            params = {
-                "max_results": limit,
-                "tweet.fields": "created_at,text,entities,attachments",
-                "expansions": "attachments.media_keys",
-                "media.fields": "url,preview_image_url"
-            }
+            params = _BASE_TWEET_PARAMS + (("max_results", str(limit)),)
             if since_id:
-                params["since_id"] = since_id
+                params += (("since_id", since_id),)
             
-            async with session.get(tweets_url, headers=headers, params=params) as resp:
-                if resp.status != 200:
-                    logging.error(f"Twitter API error getting tweets: {resp.status}")
-                    return []
-                
-                data = await resp.json()
-                tweets = data.get("data", [])
-                media_dict = {}
-                
-                # Process media
-                for media in data.get("includes", {}).get("media", []):
-                    media_dict[media["media_key"]] = media.get("url") or media.get("preview_image_url")
+            status, body = await self._get(tweets_url, headers=headers, params=params)
+            if status != 200:
+                logging.error(f"Twitter API error getting tweets: {status}")
+                if status in (401, 404):
+                    # Account gone or renamed: resolve it again next time
+                    self._user_id_cache.pop(username, None)
+                return []
+            
+            data = _json_loads(body)
+            tweets = data.get("data", [])
+            media_dict = {}
+            
+            # Process media
+            for media in data.get("includes", {}).get("media", []):
+                media_dict[media["media_key"]] = media.get("url") or media.get("preview_image_url")
+            
+            result = []
+            for tweet in tweets:
+                tweet_data = {
+                    "id": tweet["id"],
+                    "text": tweet["text"],
+                    "created_at": tweet.get("created_at"),
+                    "url": f"https://twitter.com/{username}/status/{tweet['id']}",
+                    "media": []
+                }
                 
-                result = []
-                for tweet in tweets:
-                    tweet_data = {
-                        "id": tweet["id"],
-                        "text": tweet["text"],
-                        "created_at": tweet.get("created_at"),
-                        "url": f"https://twitter.com/{username}/status/{tweet['id']}",
-                        "media": []
-                    }
-                    
-                    # Add media URLs
-                    if "attachments" in tweet and "media_keys" in tweet["attachments"]:
-                        for key in tweet["attachments"]["media_keys"]:
-                            if key in media_dict:
-                                tweet_data["media"].append(media_dict[key])
-                    
-                    result.append(tweet_data)
+                # Add media URLs
+                if "attachments" in tweet and "media_keys" in tweet["attachments"]:
+                    for key in tweet["attachments"]["media_keys"]:
+                        if key in media_dict:
+                            tweet_data["media"].append(media_dict[key])
                 
-                return result
+                result.append(tweet_data)
+            
+            return result
                 
         except Exception as e:
             logging.error(f"Twitter API error: {e}")
             return []
     
-    async def _get_tweets_nitter(self, username: str, limit: int = 5) -> List[Dict]:
-        """Fetch tweets using Nitter (fallback, no API key needed)"""
-        session = await self.get_session()
+    async def _resolve_user_id(self, headers, username: str) -> Optional[str]:
+        cached = self._user_id_cache.get(username)
+        if cached and time.monotonic() - cached[1] < USER_ID_CACHE_TTL:
+            return cached[0]
         
-        for instance in NITTER_INSTANCES:
-            try:
-                url = f"{instance}/{username}/rss"
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                    if resp.status != 200:
-                        continue
-                    
-                    content = await resp.text()
-                    tweets = self._parse_nitter_rss(content, username, limit)
+        user_url = f"{TWITTER_API_BASE}/users/by/username/{username}"
+        status, body = await self._get(user_url, headers=headers)
+        if status != 200:
+            logging.error(f"Twitter API error getting user: {status}")
+            return None
+        user_data = _json_loads(body)
+        user_id = user_data.get("data", {}).get("id")
+        if not user_id:
+            return None
+        
+        self._user_id_cache[username] = (user_id, time.monotonic())
+        if ASYNC_DB:
+            await set_twitter_user_id(username, user_id)
+        return user_id
+    
+    async def _get_tweets_nitter(self, username: str, limit: int = 5) -> List[Dict]:
+        """Fetch tweets using Nitter (fallback, no API key needed).
+
+        All instances are queried at once; the first one to return tweets wins
+        and the rest are cancelled, so dead mirrors don't add up their timeouts.
+        """
+        pending = {
+            asyncio.create_task(self._fetch_one_nitter(instance, username, limit))
+            for instance in NITTER_INSTANCES
+        }
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tweets = task.result()
                     if tweets:
                         return tweets
-                        
-            except Exception as e:
-                logging.debug(f"Nitter instance {instance} failed: {e}")
-                continue
+        finally:
+            for task in pending:
+                task.cancel()
         
         logging.warning(f"All Nitter instances failed for @{username}")
         return []
     
+    async def _fetch_one_nitter(self, instance: str, username: str, limit: int) -> List[Dict]:
+        try:
+            url = f"{instance}/{username}/rss"
+            status, body = await self._get(url, timeout=aiohttp.ClientTimeout(total=10))
+        except Exception as e:
+            logging.debug(f"Nitter instance {instance} failed: {e}")
+            return []
+        if status != 200:
+            return []
+        return self._parse_nitter_rss(body.decode("utf-8", errors="replace"), username, limit)
+    
     def _parse_nitter_rss(self, content: str, username: str, limit: int) -> List[Dict]:
-        """Parse Nitter RSS feed"""
-        import xml.etree.ElementTree as ET
-        
+        """Parse Nitter RSS feed.
+
+        Streams the document and stops after the first `limit` items, so the
+        rest of a large feed is never parsed or kept in memory.
+        Feeds carrying a DTD are refused: RSS never needs one, and entity
+        declarations are how hostile XML blows up (billion laughs etc.).
+        """
+        if "<!DOCTYPE" in content or "<!ENTITY" in content:
+            logging.warning(f"Refusing Nitter RSS with a DTD for @{username}")
+            return []
+        tweets = []
+        seen_items = 0
         try:
-            root = ET.fromstring(content)
-            items = root.findall(".//item")[:limit]
-            
-            tweets = []
-            for item in items:
-                title = item.find("title")
-                link = item.find("link")
-                pub_date = item.find("pubDate")
-                description = item.find("description")
-                
-                if title is None or link is None:
+            for _, element in ET.iterparse(BytesIO(content.encode()), events=("end",)):
+                if element.tag != "item":
                     continue
-                
-                # Extract tweet ID from link
-                link_text = link.text or ""
-                tweet_id_match = re.search(r'/status/(\d+)', link_text)
-                tweet_id = tweet_id_match.group(1) if tweet_id_match else None
-                
-                if not tweet_id:
-                    continue
-                
-                # Clean text
-                text = title.text or ""
-                if text.startswith("RT by"):
-                    continue  # Skip retweets
-                
-                # Extract media from description
-                media = []
-                if description is not None and description.text:
-                    img_matches = re.findall(r'src="([^"]+)"', description.text)
-                    for img in img_matches:
-                        if 'pic/' in img or 'media/' in img:
-                            media.append(img)
-                
-                tweets.append({
-                    "id": tweet_id,
-                    "text": text,
-                    "created_at": pub_date.text if pub_date is not None else None,
-                    "url": f"https://twitter.com/{username}/status/{tweet_id}",
-                    "media": media
-                })
-            
+                tweet = self._parse_nitter_item(element, username)
+                element.clear()
+                if tweet:
+                    tweets.append(tweet)
+                seen_items += 1
+                if seen_items == limit:
+                    break
             return tweets
             
         except ET.ParseError as e:
             logging.error(f"RSS parse error: {e}")
             return []
+    
+    def _parse_nitter_item(self, item, username: str) -> Optional[Dict]:
+        """Turn one RSS <item> into a tweet dict, or None if it should be skipped"""
+        title = item.find("title")
+        link = item.find("link")
+        pub_date = item.find("pubDate")
+        description = item.find("description")
+        
+        if title is None or link is None:
+            return None
+        
+        # Extract tweet ID from link
+        link_text = link.text or ""
+        tweet_id_match = _STATUS_RE.search(link_text)
+        tweet_id = tweet_id_match.group(1) if tweet_id_match else None
+        
+        if not tweet_id:
+            return None
+        
+        # Clean text
+        text = title.text or ""
+        if text.startswith("RT by"):
+            return None  # Skip retweets
+        
+        # Extract media from description
+        media = []
+        if description is not None and description.text:
+            media = _MEDIA_SRC_RE.findall(description.text)
+        
+        return {
+            "id": tweet_id,
+            "text": text,
+            "created_at": pub_date.text if pub_date is not None else None,
+            "url": f"https://twitter.com/{username}/status/{tweet_id}",
+            "media": media
+        }
 
 # Global client instance
 _twitter_client: Optional[TwitterClient] = None
@@ -308,7 +434,6 @@ async def list_feeds_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     chat_id = update.effective_chat.id
     
     if ASYNC_DB:
-        from async_database import get_pool
         pool = await get_pool()
         async with pool.acquire() as conn:
             cursor = await conn.execute(
@@ -360,9 +485,10 @@ async def fetch_tweet_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     
 async def post_tweet_to_chat(context: ContextTypes.DEFAULT_TYPE, chat_id: int, tweet: Dict, username: str):
     """Post a tweet to a Telegram chat"""
-    text = tweet.get("text", "")
-    url = tweet.get("url", "")
-    media = tweet.get("media", [])
+    # _get_tweets_api and _parse_nitter_item always set id/text/url/media
+    text = tweet["text"]
+    url = tweet["url"]
+    media = tweet["media"]
     
     # Format message
     message = (
@@ -371,38 +497,38 @@ async def post_tweet_to_chat(context: ContextTypes.DEFAULT_TYPE, chat_id: int, t
         f"<a href=\"{url}\">View on X/Twitter →</a>"
     )
     
-    keyboard = [[InlineKeyboardButton("🔗 Open Tweet", url=url)]]
+    reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔗 Open Tweet", url=url)]])
+    # Nitter percent-encodes the media path, so decode before checking the extension
+    photo_url = next(
+        (m for m in media if urlsplit(unquote(m)).path.lower().endswith(_PHOTO_EXTENSIONS)),
+        None
+    )
     
+    await _CHAT_LIMITERS[chat_id].acquire()
+    await _TG_LIMITER.acquire()
     try:
-        if media and len(media) > 0:
-            # Try to send with photo
+        if photo_url:
             try:
                 await context.bot.send_photo(
                     chat_id=chat_id,
-                    photo=media[0],
+                    photo=photo_url,
                     caption=message,
                     parse_mode="HTML",
-                    reply_markup=InlineKeyboardMarkup(keyboard)
+                    reply_markup=reply_markup
                 )
-            except:
-                # Fallback to text
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=message,
-                    parse_mode="HTML",
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    disable_web_page_preview=False
-                )
-        else:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=message,
-                parse_mode="HTML",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                disable_web_page_preview=False
-            )
+                return True
+            except BadRequest as e:
+                # Telegram couldn't fetch/use the image: fall back to text
+                logging.debug(f"Photo rejected for tweet {tweet['id']}: {e}")
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=message,
+            parse_mode="HTML",
+            reply_markup=reply_markup,
+            disable_web_page_preview=False
+        )
         return True
-    except Exception as e:
+    except TelegramError as e:
         logging.error(f"Failed to post tweet to {chat_id}: {e}")
         return False
 
@@ -422,59 +548,64 @@ async def check_twitter_feeds(context: ContextTypes.DEFAULT_TYPE):
         return
     
     client = get_twitter_client()
+    sem = asyncio.Semaphore(FEED_CONCURRENCY)
+    
+    await asyncio.gather(
+        *(_process_feed(context, client, feed, sem) for feed in feeds),
+        return_exceptions=True
+    )
     
-    for feed in feeds:
+    logging.info("Twitter feed check complete")
+
+async def _process_feed(context, client, feed, sem):
+    """Fetch one feed and post its new tweets.
+
+    Fetches run concurrently (up to FEED_CONCURRENCY); posting is paced by the
+    Telegram rate limiters in post_tweet_to_chat rather than fixed sleeps.
+    """
+    username = None
+    try:
+        # Unpack feed data
+        if ASYNC_DB:
+            username = feed['twitter_username']
+            chat_id = feed['chat_id']
+            last_tweet_id = feed['last_tweet_id']
+            twitter_user_id = feed['twitter_user_id']
+        else:
+            username = feed[1]  # twitter_username
+            chat_id = feed[2]   # chat_id
+            last_tweet_id = feed[4]  # last_tweet_id
+            twitter_user_id = None
+        
+        # Fetch new tweets
+        async with sem:
+            tweets = await client.get_user_tweets(username, since_id=last_tweet_id, limit=3, user_id=twitter_user_id)
+        
+        if not tweets:
+            return
+        
+        # Skip tweets already posted to this chat (one lookup for the batch)
+        if ASYNC_DB:
+            already_posted = await get_posted_tweet_ids([t['id'] for t in tweets], chat_id)
+        else:
+            # Backend API handles this now
+            already_posted = set()
+        
+        # Post new tweets (oldest first)
+        posted_ids = []
         try:
-            # Unpack feed data
-            if ASYNC_DB:
-                username = feed['twitter_username']
-                chat_id = feed['chat_id']
-                last_tweet_id = feed['last_tweet_id']
-            else:
-                username = feed[1]  # twitter_username
-                chat_id = feed[2]   # chat_id
-                last_tweet_id = feed[4]  # last_tweet_id
-            
-            # Fetch new tweets
-            tweets = await client.get_user_tweets(username, since_id=last_tweet_id, limit=3)
-            
-            if not tweets:
-                continue
-            
-            # Post new tweets (oldest first)
             for tweet in reversed(tweets):
-                tweet_id = tweet['id']
-                
-                # Check if already posted
-                if ASYNC_DB:
-                    already_posted = await is_tweet_posted(tweet_id, chat_id)
-                else:
-                    # Backend API handles this now
-                    already_posted = False
-                
-                if already_posted:
+                if tweet['id'] in already_posted:
                     continue
-                
-                # Post tweet
-                success = await post_tweet_to_chat(context, chat_id, tweet, username)
-                
-                if success:
-                    # Mark as posted
-                    if ASYNC_DB:
-                        await mark_tweet_posted(tweet_id, chat_id, 0)
-                        await update_last_tweet_id(username, chat_id, tweet_id)
-                    else:
-                        # Backend API handles this now
-                        pass
-                
-                # Rate limit between posts
-                await asyncio.sleep(2)
-                
-        except Exception as e:
-            logging.error(f"Error checking feed @{username}: {e}")
-            continue
-    
-    logging.info("Twitter feed check complete")
+                if await post_tweet_to_chat(context, chat_id, tweet, username):
+                    posted_ids.append(tweet['id'])
+        finally:
+            # Mark as posted, even if a later post blew up
+            if ASYNC_DB and posted_ids:
+                await finalize_feed_posts(username, chat_id, posted_ids, posted_ids[-1])
+        
+    except Exception as e:
+        logging.error(f"Error checking feed @{username}: {e}")
 
 def setup_twitter_job(application):
     """Setup the background job for checking Twitter feeds"""
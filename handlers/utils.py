@@ -2,15 +2,67 @@
 Utility functions for Dave.sports bot
 """
 import asyncio
+import heapq
+import itertools
 import time
-from functools import wraps
+from collections import OrderedDict
+from functools import lru_cache, wraps
 from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo, MessageEntity
 from telegram.ext import ContextTypes
+from telegram.error import TelegramError
 
 import config
 
+class TTLCache:
+    """Bounded LRU mapping whose entries optionally expire ttl seconds after being set.
+
+    A missing or expired key reads as default; once maxsize is exceeded the
+    least recently used entry is dropped. Times are time.monotonic().
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # {key: (expires_at or None, value)}, least recent first
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        hit = self._data.get(key)
+        if hit is None:
+            return default
+        if hit[0] is not None and hit[0] <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return hit[1]
+
+    def set(self, key, value):
+        now = time.monotonic()
+        self._data[key] = (now + self.ttl if self.ttl is not None else None, value)
+        self._data.move_to_end(key)
+        # Drop expired entries from the old end, then enforce the size cap
+        while self._data:
+            expires_at, _ = next(iter(self._data.values()))
+            if len(self._data) <= self.maxsize and (expires_at is None or expires_at > now):
+                break
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        hit = self._data.pop(key, None)
+        return default if hit is None else hit[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def prune(self, predicate):
+        """Drop every entry whose key satisfies predicate (a full scan, for rare invalidations)."""
+        for key in [key for key in self._data if predicate(key)]:
+            del self._data[key]
+
 # Cache-busting for Telegram WebApp (Telegram can cache aggressively).
 # Using a date-based version keeps the URL stable for a day while still allowing quick refreshes.
 WEBAPP_VERSION = getattr(config, "WEBAPP_VERSION", "") or time.strftime("%Y%m%d")
@@ -21,31 +73,147 @@ EPHEMERAL_DELAY = 60
 ADMIN_EPHEMERAL_DELAY = 300
 # Recent command tracking (for auto-cleaning replies)
 COMMAND_TTL = 10  # seconds to consider a command "recent"
-RECENT_COMMANDS = {}
+RECENT_COMMANDS_SIZE = 10_000
+# {(chat_id, message_id): True} for commands seen in the last COMMAND_TTL seconds
+RECENT_COMMANDS = TTLCache(RECENT_COMMANDS_SIZE, COMMAND_TTL)
+# Strong references to fire-and-forget tasks (the event loop only keeps weak ones)
+_BACKGROUND_TASKS = set()
+
+def run_in_background(coro):
+    """Schedule a coroutine whose result nobody awaits, keeping it alive until done."""
+    task = asyncio.create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    return task
+
+class SendRateLimiter:
+    """Spaces acquisitions at least 1/rate seconds apart, in the order they were requested."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_slot = 0.0
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+# Messages awaiting deletion: heap of (expire_at, seq, bot, chat_id, message_id),
+# drained by a single reaper task instead of one sleeping task per message.
+# Only the ids are kept, not the whole Message, so join floods stay cheap.
+_DELETE_QUEUE = []
+_DELETE_SEQ = itertools.count()
+_DELETE_WAKE = asyncio.Event()
+_reaper_task = None
+# Telegram's deleteMessages accepts at most this many ids per call
+DELETE_BATCH_SIZE = 100
+
+async def _delete_batch(bot, chat_id, message_ids):
+    """deleteMessages for one chat, falling back to one call per message.
+
+    deleteMessages fails as a whole if any id can't be deleted (no delete rights
+    for a user's command, or a message past 48h), which would also keep the
+    bot's own replies in the same batch.
+    """
+    if len(message_ids) > 1:
+        try:
+            await bot.delete_messages(chat_id, message_ids)
+            return
+        except TelegramError:
+            pass
+    await asyncio.gather(*(
+        bot.delete_message(chat_id, message_id) for message_id in message_ids
+    ), return_exceptions=True)
+
+async def _reaper():
+    while True:
+        now = time.monotonic()
+        due = {}  # {(bot, chat_id): [message_id, ...]}
+        while _DELETE_QUEUE and _DELETE_QUEUE[0][0] <= now:
+            _, _, bot, chat_id, message_id = heapq.heappop(_DELETE_QUEUE)
+            due.setdefault((bot, chat_id), []).append(message_id)
+        if due:
+            # One deleteMessages call per chat for everything that expired together
+            await asyncio.gather(*(
+                _delete_batch(bot, chat_id, message_ids[i:i + DELETE_BATCH_SIZE])
+                for (bot, chat_id), message_ids in due.items()
+                for i in range(0, len(message_ids), DELETE_BATCH_SIZE)
+            ), return_exceptions=True)
+        _DELETE_WAKE.clear()
+        if _DELETE_QUEUE:
+            # Wake early if a sooner deadline is pushed meanwhile
+            timeout = _DELETE_QUEUE[0][0] - time.monotonic()
+            try:
+                await asyncio.wait_for(_DELETE_WAKE.wait(), timeout=max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await _DELETE_WAKE.wait()
+
+
+class CachedInlineKeyboardMarkup(InlineKeyboardMarkup):
+    """InlineKeyboardMarkup that serializes itself once.
+
+    Use for module-level constant menus: the markup is immutable, so the dict PTB
+    builds for every send/edit is the same each time.
+    """
+    __slots__ = ("_cached_dict",)
+
+    def to_dict(self, recursive: bool = True):
+        if not recursive:
+            return super().to_dict(recursive=False)
+        cached = getattr(self, "_cached_dict", None)
+        if cached is None:
+            cached = super().to_dict()
+            with self._unfrozen():
+                self._cached_dict = cached
+        return cached
+
+_WEBAPP_VERSION_PARAM = urlencode({"v": WEBAPP_VERSION})
+
 def _append_webapp_version(url: str) -> str:
     if not url or not WEBAPP_VERSION:
         return url
+    base, hash_sign, fragment = url.partition("#")
+    if "?" not in base:
+        # Common case: no query string yet, so just append the version
+        return base + "?" + _WEBAPP_VERSION_PARAM + hash_sign + fragment
+    query = base.partition("?")[2]
+    if query.startswith("v=") or "&v=" in query:
+        return url
     parts = urlsplit(url)
     query = dict(parse_qsl(parts.query, keep_blank_values=True))
     query.setdefault("v", WEBAPP_VERSION)
     new_query = urlencode(query)
     return urlunsplit((parts.scheme, parts.netloc, parts.path, new_query, parts.fragment))
 
+# WEBAPP_URL and WEBAPP_VERSION are fixed for the process, so the versioned
+# root and the suffix spliced after each path are computed once
+_WEBAPP_BASE = (getattr(config, "WEBAPP_URL", "") or "").strip()
+_WEBAPP_ROOT = _WEBAPP_BASE.rstrip("/")
+_WEBAPP_BASE_VERSIONED = _append_webapp_version(_WEBAPP_BASE)
+_WEBAPP_PLAIN_BASE = "?" not in _WEBAPP_BASE and "#" not in _WEBAPP_BASE
+_WEBAPP_SUFFIX = "?" + _WEBAPP_VERSION_PARAM if WEBAPP_VERSION else ""
 
+@lru_cache(maxsize=256)
 def build_webapp_url(path: str = "") -> str:
-    base = getattr(config, "WEBAPP_URL", "") or ""
-    base = base.strip()
-    if not base:
+    if not _WEBAPP_BASE:
         return ""
 
     if not path:
-        return _append_webapp_version(base)
+        return _WEBAPP_BASE_VERSIONED
 
     if not path.startswith("/"):
         path = "/" + path
 
-    return _append_webapp_version(base.rstrip("/") + path)
+    if _WEBAPP_PLAIN_BASE and "?" not in path and "#" not in path:
+        return _WEBAPP_ROOT + path + _WEBAPP_SUFFIX
+    return _append_webapp_version(_WEBAPP_ROOT + path)
 
+@lru_cache(maxsize=256)
 def build_webapp_url_with_query(path: str = "", query: str = "", fragment: str = "") -> str:
     url = build_webapp_url(path)
     if not url:
@@ -60,13 +228,16 @@ def build_webapp_url_with_query(path: str = "", query: str = "", fragment: str =
         url += fragment
     return url
 
-async def delete_message_later(message, delay: int = EPHEMERAL_DELAY):
-    """Delete a message after a delay"""
-    try:
-        await asyncio.sleep(delay)
-        await message.delete()
-    except Exception:
-        pass  # Message may already be deleted or bot lacks permissions
+def schedule_delete(message, delay: int = EPHEMERAL_DELAY):
+    """Delete a message after a delay via the shared reaper task"""
+    global _reaper_task
+    heapq.heappush(_DELETE_QUEUE, (
+        time.monotonic() + delay, next(_DELETE_SEQ),
+        message.get_bot(), message.chat_id, message.message_id
+    ))
+    _DELETE_WAKE.set()
+    if _reaper_task is None or _reaper_task.done():
+        _reaper_task = run_in_background(_reaper())
 
 async def handle_group_command(update: Update, context: ContextTypes.DEFAULT_TYPE, bot_username: str = None):
     """
@@ -98,34 +269,32 @@ async def handle_group_command(update: Update, context: ContextTypes.DEFAULT_TYP
             disable_web_page_preview=True
         )
         # Auto-delete the notice
-        asyncio.create_task(delete_message_later(notice, EPHEMERAL_DELAY))
+        schedule_delete(notice, EPHEMERAL_DELAY)
     except Exception:
         pass
     
     return True
 def register_command(chat_id: int, message_id: int):
-    chat_map = RECENT_COMMANDS.setdefault(chat_id, {})
-    chat_map[message_id] = time.time()
+    RECENT_COMMANDS.set((chat_id, message_id), True)
 
 def is_recent_command(chat_id: int, message_id: int) -> bool:
-    chat_map = RECENT_COMMANDS.get(chat_id, {})
-    if not chat_map:
-        return False
-    now = time.time()
-    # Cleanup expired entries
-    for mid, ts in list(chat_map.items()):
-        if now - ts > COMMAND_TTL:
-            chat_map.pop(mid, None)
-    return message_id in chat_map
+    return RECENT_COMMANDS.get((chat_id, message_id), False)
 
 async def register_and_delete_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Track command messages and auto-delete them in all chats."""
-    if not update.message or not update.effective_chat:
+    """Track command messages and auto-delete them in all chats.
+
+    Registered as a TypeHandler for every update, so it does its own
+    filters.COMMAND check (a bot_command entity at offset 0).
+    """
+    message = update.message
+    if not message or not message.entities or not update.effective_chat:
         return
-    chat = update.effective_chat
-    register_command(chat.id, update.message.message_id)
+    entity = message.entities[0]
+    if entity.type != MessageEntity.BOT_COMMAND or entity.offset != 0:
+        return
+    register_command(update.effective_chat.id, message.message_id)
     # Auto-delete the command message shortly after
-    asyncio.create_task(delete_message_later(update.message, EPHEMERAL_DELAY))
+    schedule_delete(message, EPHEMERAL_DELAY)
 
 def private_only(func):
     """
@@ -143,7 +312,7 @@ async def send_ephemeral_message(context: ContextTypes.DEFAULT_TYPE, chat_id: in
     """Send a message that auto-deletes after a delay"""
     try:
         message = await context.bot.send_message(chat_id=chat_id, text=text, **kwargs)
-        asyncio.create_task(delete_message_later(message, delay))
+        schedule_delete(message, delay)
         return message
     except Exception:
         return None
@@ -155,21 +324,32 @@ async def send_ephemeral_reply(update: Update, context: ContextTypes.DEFAULT_TYP
         else:
             msg = await context.bot.send_message(chat_id=update.effective_chat.id, text=text, **kwargs)
         if update.effective_chat and (update.effective_chat.type in ["group", "supergroup"] or delete_in_private):
-            asyncio.create_task(delete_message_later(msg, delay))
+            schedule_delete(msg, delay)
         return msg
     except Exception:
         return None
 
+def message_shows(message, text: str, reply_markup=None, parse_mode=None) -> bool:
+    """True if message already displays text and reply_markup, so editing it would be a no-op."""
+    if message.text is None or message.reply_markup != reply_markup:
+        return False
+    current = message.text_html if parse_mode == "HTML" else message.text
+    return current == text
+
 async def edit_or_ephemeral(message, text: str, reply_markup=None, parse_mode=None, delay: int = EPHEMERAL_DELAY):
     """Try editing a message; if not possible, reply and auto-delete quickly."""
+    if message_shows(message, text, reply_markup, parse_mode):
+        # Same content (e.g. a double tap): Telegram would reject the edit anyway
+        schedule_delete(message, delay)
+        return True
     try:
         await message.edit_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
-        asyncio.create_task(delete_message_later(message, delay))
+        schedule_delete(message, delay)
         return True
     except Exception:
         try:
             msg = await message.reply_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
-            asyncio.create_task(delete_message_later(msg, delay))
+            schedule_delete(msg, delay)
         except Exception:
             pass
         return False
@@ -1,8 +1,46 @@
+import asyncio
+import logging
 from telegram import Update, ChatMember
 from telegram.ext import ContextTypes, ChatMemberHandler
+from telegram.error import TelegramError
 from handlers.api_client import api_bot_post, api_bot_delete, api_get
+from handlers.profile import invalidate_groups_cache
+from handlers.utils import TTLCache, schedule_delete
+from handlers.roles import invalidate_admin_status
 import config
-import asyncio
+
+# Club lookups for joining users: {user_id: me}.
+# A club change shows up in welcomes within ME_CACHE_TTL.
+ME_CACHE_TTL = 300
+ME_CACHE_SIZE = 4096
+_ME_CACHE = TTLCache(ME_CACHE_SIZE, ME_CACHE_TTL)
+
+WELCOME_TEMPLATE = (
+    "Welcome to Dave.sports, {mention}{club}! ⚽🥊⛳\n\n"
+    "We are the community for The News From The Sports Dave Loves – "
+    "Football, Darts, Golf, F1, Boxing & UFC.\n\n"
+    "<b>Get Started:</b>\n"
+    "Open /web to set your profile, club badge, and interests.\n\n"
+    "<b>Rules:</b>\n"
+    "• No spamming\n"
+    "• No unauthorized links\n"
+    "• Be respectful\n\n"
+    "Enjoy the conversation!"
+)
+
+# Statuses that always count as being in the chat (RESTRICTED depends on is_member)
+_MEMBER_STATUSES = frozenset({ChatMember.MEMBER, ChatMember.OWNER, ChatMember.ADMINISTRATOR})
+
+async def _get_me(user_id):
+    me = _ME_CACHE.get(user_id)
+    if me is not None:
+        return me
+    try:
+        me = await api_get("/user/me", user_id=user_id)
+    except Exception:
+        return {}
+    _ME_CACHE.set(user_id, me)
+    return me
 
 async def track_chats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Tracks the chats the bot is in."""
@@ -19,63 +57,57 @@ async def track_chats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     if not was_member and is_member:
         # Bot added to group
         await api_bot_post("/admin/groups", json_body={"chat_id": chat.id, "chat_title": chat.title, "chat_type": chat.type})
-        print(f"DEBUG: Bot added to {chat.title} ({chat.id})")
+        invalidate_groups_cache()
+        logging.info("Bot added to %s (%s)", chat.title, chat.id)
     elif was_member and not is_member:
         # Bot removed from group
         await api_bot_delete(f"/admin/groups/{chat.id}")
-        print(f"DEBUG: Bot removed from {chat.title} ({chat.id})")
+        invalidate_groups_cache()
+        logging.info("Bot removed from %s (%s)", chat.title, chat.id)
 
 def extract_status_change(chat_member_update):
     """Takes a ChatMemberUpdated instance and extracts whether the 'old_chat_member'
     was a member of the chat and whether the 'new_chat_member' is a member of the chat.
     """
-    status_change = chat_member_update.difference().get("status")
-    old_is_member, new_is_member = chat_member_update.difference().get("is_member", (None, None))
-
-    if status_change is None:
+    # Only status and is_member matter, so read them directly rather than
+    # building the full difference() dict
+    old_member = chat_member_update.old_chat_member
+    new_member = chat_member_update.new_chat_member
+    old_status, new_status = old_member.status, new_member.status
+    if old_status == new_status:
         return None
+    # is_member only exists on ChatMemberRestricted
+    old_is_member = getattr(old_member, "is_member", None)
+    new_is_member = getattr(new_member, "is_member", None)
 
-    old_status, new_status = status_change
-    was_member = old_status in [
-        ChatMember.MEMBER,
-        ChatMember.OWNER,
-        ChatMember.ADMINISTRATOR,
-    ] or (old_status == ChatMember.RESTRICTED and old_is_member is True)
-
-    is_member = new_status in [
-        ChatMember.MEMBER,
-        ChatMember.OWNER,
-        ChatMember.ADMINISTRATOR,
-    ] or (new_status == ChatMember.RESTRICTED and new_is_member is True)
+    was_member = old_status in _MEMBER_STATUSES or (old_status == ChatMember.RESTRICTED and old_is_member is True)
+    is_member = new_status in _MEMBER_STATUSES or (new_status == ChatMember.RESTRICTED and new_is_member is True)
 
     return was_member, is_member
 
 async def greet_chat_members(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Greets new users in chats and announces when someone leaves"""
+    # Joins, leaves and promotions all change the member's admin status
+    invalidate_admin_status(update.chat_member.chat.id, update.chat_member.new_chat_member.user.id)
     result = extract_status_change(update.chat_member)
     if result is None:
         return
 
     was_member, is_member = result
     
-    # DEBUG: Print status change to console
-    print(f"DEBUG: Status Change - Was: {was_member}, Is: {is_member}")
+    logging.debug("Status change - was: %s, is: %s", was_member, is_member)
     
     # User Joined
     if not was_member and is_member:
         user = update.chat_member.new_chat_member.user
-        try:
-            await api_bot_post("/admin/users/ensure", json_body={"user_id": user.id, "username": user.username})
-        except Exception:
-            pass
-        
-        # Check if user has a club set
+        # Register the user and check for a club set, concurrently
+        _, me = await asyncio.gather(
+            api_bot_post("/admin/users/ensure", json_body={"user_id": user.id, "username": user.username}),
+            _get_me(user.id),
+            return_exceptions=True
+        )
         club_badge = ""
         badge_url = None
-        try:
-            me = await api_get("/user/me", user_id=user.id)
-        except Exception:
-            me = {}
         club_entry = me.get("club") if isinstance(me, dict) else None
         if club_entry:
             club_badge = f" {club_entry.get('label')}"
@@ -84,18 +116,7 @@ async def greet_chat_members(update: Update, context: ContextTypes.DEFAULT_TYPE)
             except Exception:
                 pass
         
-        welcome_text = (
-            f"Welcome to Dave.sports, {user.mention_html()}{club_badge}! ⚽🥊⛳\n\n"
-            "We are the community for The News From The Sports Dave Loves – "
-            "Football, Darts, Golf, F1, Boxing & UFC.\n\n"
-            "<b>Get Started:</b>\n"
-            "Open /web to set your profile, club badge, and interests.\n\n"
-            "<b>Rules:</b>\n"
-            "• No spamming\n"
-            "• No unauthorized links\n"
-            "• Be respectful\n\n"
-            "Enjoy the conversation!"
-        )
+        welcome_text = WELCOME_TEMPLATE.format(mention=user.mention_html(), club=club_badge)
         
         # Send welcome with badge image if user has a club
         if badge_url:
@@ -105,7 +126,8 @@ async def greet_chat_members(update: Update, context: ContextTypes.DEFAULT_TYPE)
                     caption=welcome_text,
                     parse_mode="HTML"
                 )
-            except:
+            except TelegramError:
+                # Badge image rejected: send the welcome as plain text
                 msg = await update.effective_chat.send_message(
                     welcome_text,
                     parse_mode="HTML"
@@ -118,11 +140,4 @@ async def greet_chat_members(update: Update, context: ContextTypes.DEFAULT_TYPE)
         
         # Schedule deletion
         if config.WELCOME_DELETE_DELAY > 0:
-            asyncio.create_task(delete_message_later(msg, config.WELCOME_DELETE_DELAY))
-
-async def delete_message_later(message, delay):
-    await asyncio.sleep(delay)
-    try:
-        await message.delete()
-    except Exception:
-        pass # Message might already be deleted
+            schedule_delete(msg, config.WELCOME_DELETE_DELAY)
@@ -1,14 +1,19 @@
 import logging
 import asyncio
 import os
+import re
 import sys
-import atexit
 import signal
-from pathlib import Path
-from telegram import Update
-from telegram.ext import ApplicationBuilder, CommandHandler, ChatMemberHandler, MessageHandler, CallbackQueryHandler, MessageReactionHandler, InlineQueryHandler, ChosenInlineResultHandler, filters, ContextTypes
+from telegram import Update, MessageEntity
+from telegram.ext import ApplicationBuilder, CommandHandler, ChatMemberHandler, MessageHandler, CallbackQueryHandler, MessageReactionHandler, InlineQueryHandler, ChosenInlineResultHandler, TypeHandler, filters, ContextTypes
 from telegram.error import NetworkError
+from telegram.request import HTTPXRequest
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 import config
+from bot_lock import LOCK_FILE, try_lock, read_pid
 from handlers.welcome import greet_chat_members, track_chats
 from handlers.moderation import moderate_message
 from handlers.commands import (
@@ -23,13 +28,11 @@ from handlers.rewards import reward_callback_handler, reaction_handler, test_rew
 from handlers.predictions import (
     create_match_command, predict_command, resolve_match_command, 
     list_matches_command, close_match_command, prediction_callback_handler, 
-    admin_prediction_callback, score_prediction_msg_handler
+    admin_prediction_callback, score_prediction_msg_handler, SCORE_MSG_RE
 )
-from handlers.articles import post_article_command, auto_track_group, broadcast_callback_handler
 from handlers.menu import menu_command, help_command, menu_callback_handler, mypredictions_command, predboard_command, web_command
 from handlers.inline import inline_query_handler, chosen_inline_result_handler
 from handlers.notifications import notifications_command, notification_callback_handler
-from handlers.davesport_feed import subscribe_command, unsubscribe_command, fetch_latest_command, feed_status_command, setsport_command, setchatchannel_command, removechatchannel_command, setup_davesport_job
 from handlers.utils import register_and_delete_command
 
 # Logging Setup
@@ -38,59 +41,79 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-# Lock file management
-LOCK_FILE = Path("bot.lock")
+# Lock file management (see bot_lock)
+# Held open for the process lifetime; the OS drops the lock if the process dies
+_lock_handle = None
 
 def acquire_lock():
     """Acquire a lock file to ensure only one bot instance runs at a time."""
-    if LOCK_FILE.exists():
-        try:
-            with open(LOCK_FILE, 'r') as f:
-                pid = int(f.read().strip())
-            
-            # Check if the process with this PID is still running
-            try:
-                # On Windows, try to open the process
-                import ctypes
-                kernel32 = ctypes.windll.kernel32
-                PROCESS_QUERY_INFORMATION = 0x0400
-                handle = kernel32.OpenProcess(PROCESS_QUERY_INFORMATION, False, pid)
-                if handle:
-                    kernel32.CloseHandle(handle)
-                    logging.error(f"Another bot instance is already running (PID: {pid})")
-                    logging.error("Please stop the existing instance before starting a new one.")
-                    logging.error("If you're sure no other instance is running, delete the 'bot.lock' file.")
-                    sys.exit(1)
-                else:
-                    # Process doesn't exist, remove stale lock file
-                    logging.warning(f"Removing stale lock file (PID {pid} not found)")
-                    LOCK_FILE.unlink()
-            except Exception:
-                # If we can't check the process, assume it's not running
-                logging.warning("Could not verify old process, removing stale lock file")
-                LOCK_FILE.unlink()
-        except (ValueError, FileNotFoundError):
-            # Invalid lock file, remove it
-            logging.warning("Invalid lock file found, removing it")
-            LOCK_FILE.unlink()
+    global _lock_handle
+    f = open(LOCK_FILE, "a+")
+    try:
+        try_lock(f)
+    except OSError:
+        pid = read_pid(f) or "unknown"
+        f.close()
+        logging.error(f"Another bot instance is already running (PID: {pid})")
+        logging.error("Please stop the existing instance before starting a new one.")
+        sys.exit(1)
     
-    # Create lock file with current PID
-    with open(LOCK_FILE, 'w') as f:
-        f.write(str(os.getpid()))
+    # Record our PID for anyone inspecting the lock file
+    f.seek(0)
+    f.truncate()
+    f.write(str(os.getpid()))
+    f.flush()
+    _lock_handle = f
     
     logging.info(f"Lock acquired (PID: {os.getpid()})")
-    
-    # Register cleanup function
-    atexit.register(release_lock)
 
 def release_lock():
-    """Release the lock file on exit."""
-    if LOCK_FILE.exists():
-        try:
-            LOCK_FILE.unlink()
-            logging.info("Lock file removed")
-        except Exception as e:
-            logging.warning(f"Failed to remove lock file: {e}")
+    """Release the lock and remove the lock file on exit."""
+    global _lock_handle
+    if _lock_handle is None:
+        return
+    try:
+        # Closing the handle releases the lock
+        _lock_handle.close()
+        LOCK_FILE.unlink(missing_ok=True)
+        logging.info("Lock released")
+    except Exception as e:
+        logging.warning(f"Failed to release lock: {e}")
+    _lock_handle = None
+
+# Callback-data prefix -> handler, matched by one alternation (longest prefix
+# first, so pred_menu_ reaches the menu rather than the prediction handler)
+CALLBACK_ROUTES = {
+    "menu_": profile_callback,
+    "set_club_": profile_callback,
+    "toggle_int_": profile_callback,
+    "close": profile_callback,
+    "clk_": reward_callback_handler,
+    "reward_": reward_callback_handler,
+    "pred_": prediction_callback_handler,
+    "adm_": admin_prediction_callback,
+    "mod_": moderation_callback_handler,
+    "notif_": notification_callback_handler,
+    "cmd_": menu_callback_handler,
+    "info_": menu_callback_handler,
+    "admin_": menu_callback_handler,
+    "wizard_": menu_callback_handler,
+    "main_": menu_callback_handler,
+    "pred_menu_": menu_callback_handler,
+    "news_": menu_callback_handler,
+    "profile_": menu_callback_handler,
+    "leaderboard_": menu_callback_handler,
+}
+_CALLBACK_RE = re.compile(
+    "^(" + "|".join(re.escape(prefix) for prefix in sorted(CALLBACK_ROUTES, key=len, reverse=True)) + ")",
+    re.ASCII
+)
+# Broadcast buttons get their own non-blocking handler
+_BROADCAST_CALLBACK_RE = re.compile(r"^broadcast_", re.ASCII)
+
+async def dispatch_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route a callback query to its handler using the prefix the pattern matched."""
+    await CALLBACK_ROUTES[context.matches[0].group(1)](update, context)
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Log the error and handle specific cases like NetworkError."""
@@ -134,9 +157,16 @@ async def run_application(application):
         # Start polling in the background
         await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
 
-        # Keep the process alive until cancelled (Ctrl+C)
-        while True:
-            await asyncio.sleep(3600)
+        # Keep the process alive until SIGINT/SIGTERM (or cancellation where
+        # signal handlers aren't supported, e.g. Ctrl+C on Windows)
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        await stop_event.wait()
     except asyncio.CancelledError:
         pass
     finally:
@@ -164,14 +194,33 @@ def main():
         release_lock()
         return
 
-    application = ApplicationBuilder().token(config.BOT_TOKEN).build()
+    # PTB's default pool is small; concurrent broadcasts (asyncio.gather over groups)
+    # and concurrent updates would otherwise serialize waiting for a pooled connection.
+    # Long polling gets its own small pool so it never competes with outgoing calls.
+    request = HTTPXRequest(
+        connection_pool_size=256,
+        connect_timeout=10.0,
+        read_timeout=30.0,
+        write_timeout=30.0,
+        pool_timeout=5.0
+    )
+    get_updates_request = HTTPXRequest(connection_pool_size=16)
+    # Process updates as independent tasks so one slow handler doesn't hold up the rest
+    application = (
+        ApplicationBuilder()
+        .token(config.BOT_TOKEN)
+        .request(request)
+        .get_updates_request(get_updates_request)
+        .concurrent_updates(True)
+        .build()
+    )
 
     # Register Error Handler
     application.add_error_handler(error_handler)
 
     # Handlers
     # Global command cleanup in groups (run before command handlers)
-    application.add_handler(MessageHandler(filters.COMMAND, register_and_delete_command), group=-1)
+    application.add_handler(TypeHandler(Update, register_and_delete_command), group=-1)
     
     # 1. Admin Commands
     application.add_handler(CommandHandler("warn", warn_command))
@@ -191,18 +240,9 @@ def main():
 
     # 3. Profile / Setup
     application.add_handler(CommandHandler("setup", setup_command))
-    # Profile patterns: menu_..., set_club_..., toggle_int_..., close
-    application.add_handler(CallbackQueryHandler(profile_callback, pattern="^(menu_|set_club_|toggle_int_|close)"))
-    
-    # Reward patterns: clk_..., reward_...
-    application.add_handler(CallbackQueryHandler(reward_callback_handler, pattern="^(clk_|reward_)"))
-    
-    # Prediction patterns: pred_... (users), adm_... (admins)
-    application.add_handler(CallbackQueryHandler(prediction_callback_handler, pattern="^pred_"))
-    application.add_handler(CallbackQueryHandler(admin_prediction_callback, pattern="^adm_"))
-    
-    # Moderation patterns: mod_...
-    application.add_handler(CallbackQueryHandler(moderation_callback_handler, pattern="^mod_"))
+    # Profile, reward, prediction, moderation, menu and notification buttons
+    # (see CALLBACK_ROUTES for the prefixes)
+    application.add_handler(CallbackQueryHandler(dispatch_callback, pattern=_CALLBACK_RE))
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("invite", invite_command))
     application.add_handler(CommandHandler("testrewards", test_rewards_command))
@@ -213,17 +253,22 @@ def main():
     application.add_handler(CommandHandler("web", web_command))
     application.add_handler(CommandHandler("mypredictions", mypredictions_command))
     application.add_handler(CommandHandler("predboard", predboard_command))
-    application.add_handler(CallbackQueryHandler(menu_callback_handler, pattern="^(cmd_|info_|admin_|wizard_|main_|pred_menu_|news_|profile_|leaderboard_)"))
     
     # Notifications
     application.add_handler(CommandHandler("notifications", notifications_command))
-    application.add_handler(CallbackQueryHandler(notification_callback_handler, pattern="^notif_"))
     
     # Inline Queries (predict from any chat by typing @botusername)
     application.add_handler(InlineQueryHandler(inline_query_handler))
     application.add_handler(ChosenInlineResultHandler(chosen_inline_result_handler))
     
     # Dave.sport Feed Integration (X/Twitter + Website - LOCKED to @davedotsport only)
+    # Feed and article handlers are imported here, after the lock and token checks,
+    # so a second instance or a misconfigured start exits without loading them
+    from handlers.davesport_feed import (
+        subscribe_command, unsubscribe_command, fetch_latest_command, feed_status_command,
+        setsport_command, setchatchannel_command, removechatchannel_command, setup_davesport_job
+    )
+    from handlers.articles import post_article_command, auto_track_group, broadcast_callback_handler
     application.add_handler(CommandHandler("subscribe", subscribe_command))
     application.add_handler(CommandHandler("unsubscribe", unsubscribe_command))
     application.add_handler(CommandHandler("fetchlatest", fetch_latest_command))
@@ -238,7 +283,7 @@ def main():
     # Articles / Broadcast
     application.add_handler(CommandHandler("postarticle", post_article_command))
     application.add_handler(CommandHandler("broadcast", post_article_command))  # Alias
-    application.add_handler(CallbackQueryHandler(broadcast_callback_handler, pattern="^broadcast_"))
+    application.add_handler(CallbackQueryHandler(broadcast_callback_handler, pattern=_BROADCAST_CALLBACK_RE, block=False))
 
     # 6. Predictions
     application.add_handler(CommandHandler("newmatch", create_match_command))
@@ -246,14 +291,14 @@ def main():
     application.add_handler(CommandHandler("setresult", resolve_match_command))
     application.add_handler(CommandHandler("closematch", close_match_command))
     application.add_handler(CommandHandler("matches", list_matches_command))
-    # Note: prediction_callback_handler already registered above at line 80
+    # Note: prediction callbacks (pred_...) are routed by dispatch_callback above
     
     # Handle text-based score predictions (e.g., "1 score 2-1")
-    application.add_handler(MessageHandler(filters.Regex(r'^\d+\s+score\s+\d+-\d+$'), score_prediction_msg_handler))
+    application.add_handler(MessageHandler(filters.Regex(SCORE_MSG_RE), score_prediction_msg_handler))
 
     # 5. Welcome / Chat Member Updates
     # ChatMemberHandler.CHAT_MEMBER triggers on join/leave/privilege changes of users
-    application.add_handler(ChatMemberHandler(greet_chat_members, ChatMemberHandler.CHAT_MEMBER))
+    application.add_handler(ChatMemberHandler(greet_chat_members, ChatMemberHandler.CHAT_MEMBER, block=False))
     # ChatMemberHandler.MY_CHAT_MEMBER triggers when the BOT's status changes
     application.add_handler(ChatMemberHandler(track_chats, ChatMemberHandler.MY_CHAT_MEMBER))
     
@@ -261,8 +306,9 @@ def main():
     application.add_handler(MessageReactionHandler(reaction_handler))
     
     # Admin link rewards handler (checks for URLs in admin messages in groups)
+    # URL entity test first: it rejects almost every message, and combined filters short-circuit
     application.add_handler(MessageHandler(
-        filters.TEXT & (~filters.COMMAND) & filters.ChatType.GROUPS & filters.Entity("url"),
+        filters.Entity(MessageEntity.URL) & filters.ChatType.GROUPS & filters.TEXT & (~filters.COMMAND),
         handle_admin_link_post
     ), group=1)  # Run in separate group to not block other handlers
     
@@ -275,9 +321,15 @@ def main():
 
     logging.info("Dave.sports Bot is running...")
 
-    # Run (explicit init/start sequence)
+    # Run (explicit init/start sequence), on uvloop when it's installed
     try:
-        asyncio.run(run_application(application))
+        if uvloop is None:
+            asyncio.run(run_application(application))
+        elif sys.version_info >= (3, 12):
+            asyncio.run(run_application(application), loop_factory=uvloop.new_event_loop)
+        else:
+            uvloop.install()
+            asyncio.run(run_application(application))
     except KeyboardInterrupt:
         pass
     finally:
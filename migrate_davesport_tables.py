@@ -10,6 +10,46 @@ from pathlib import Path
 
 DB_PATH = Path(__file__).resolve().parent / "dave_sports.db"
 
+# All tables and indexes, created in one transaction
+SCHEMA_SQL = """
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS davesport_subscribers (
+    chat_id INTEGER PRIMARY KEY,
+    twitter_enabled INTEGER DEFAULT 0,
+    website_enabled INTEGER DEFAULT 1,
+    sport_filter TEXT DEFAULT 'all',
+    subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS chat_category_routing (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    thread_id INTEGER,
+    enabled INTEGER DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(chat_id, category)
+);
+
+CREATE TABLE IF NOT EXISTS davesport_posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    post_id TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    message_id INTEGER DEFAULT 0,
+    posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(post_id, chat_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_davesport_subscribers_chat ON davesport_subscribers(chat_id);
+CREATE INDEX IF NOT EXISTS idx_chat_category_routing_chat ON chat_category_routing(chat_id);
+CREATE INDEX IF NOT EXISTS idx_chat_category_routing_category ON chat_category_routing(category);
+CREATE INDEX IF NOT EXISTS idx_davesport_posts_post ON davesport_posts(post_id, chat_id);
+
+COMMIT;
+"""
+
 def migrate():
     print(f"Migrating database: {DB_PATH}")
     
@@ -21,50 +61,8 @@ def migrate():
     cursor = conn.cursor()
     
     try:
-        print("Creating davesport_subscribers table...")
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS davesport_subscribers (
-            chat_id INTEGER PRIMARY KEY,
-            twitter_enabled INTEGER DEFAULT 0,
-            website_enabled INTEGER DEFAULT 1,
-            sport_filter TEXT DEFAULT 'all',
-            subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        print("Creating chat_category_routing table...")
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS chat_category_routing (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            chat_id INTEGER NOT NULL,
-            category TEXT NOT NULL,
-            thread_id INTEGER,
-            enabled INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(chat_id, category)
-        )
-        ''')
-        
-        print("Creating davesport_posts table...")
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS davesport_posts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            post_id TEXT NOT NULL,
-            chat_id INTEGER NOT NULL,
-            source TEXT NOT NULL,
-            message_id INTEGER DEFAULT 0,
-            posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(post_id, chat_id)
-        )
-        ''')
-        
-        print("Creating indexes...")
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_davesport_subscribers_chat ON davesport_subscribers(chat_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_category_routing_chat ON chat_category_routing(chat_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_category_routing_category ON chat_category_routing(category)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_davesport_posts_post ON davesport_posts(post_id, chat_id)')
-        
-        conn.commit()
+        print("Creating tables and indexes...")
+        conn.executescript(SCHEMA_SQL)
         print("✅ Migration completed successfully!")
         
         # Verify tables exist
@@ -53,13 +53,13 @@ async def reset_bot_connection():
         # Get pending updates count
         logging.info("\nChecking for pending updates...")
         try:
-            updates = await bot.get_updates(limit=1, timeout=5)
+            # offset=-1 returns just the newest pending update, without long-polling
+            updates = await bot.get_updates(offset=-1, limit=1, timeout=0)
             if updates:
-                logging.info(f"Found {len(updates)} pending update(s)")
-                # Get the latest update ID
                 latest_update_id = updates[-1].update_id
-                # Clear all updates up to and including this one
-                await bot.get_updates(offset=latest_update_id + 1, timeout=5)
+                logging.info(f"Found pending updates (latest ID: {latest_update_id})")
+                # Confirm everything up to and including the newest one
+                await bot.get_updates(offset=latest_update_id + 1, limit=1, timeout=0)
                 logging.info("✓ Cleared pending updates")
             else:
                 logging.info("✓ No pending updates")
@@ -1,12 +1,14 @@
-EPL_TEAMS = [
+from types import MappingProxyType
+
+EPL_TEAMS = (
     "Arsenal", "Aston Villa", "Bournemouth", "Brentford", "Brighton",
     "Chelsea", "Crystal Palace", "Everton", "Fulham", "Ipswich",
     "Leicester", "Liverpool", "Man City", "Man Utd", "Newcastle",
     "Nottm Forest", "Southampton", "Spurs", "West Ham", "Wolves"
-]
+)
 
-# Club Data with optional badge URLs
-CLUBS_DATA = {
+# Club Data with optional badge URLs (read-only view; entries are never edited at runtime)
+CLUBS_DATA = MappingProxyType({
     "Arsenal": {
         "name": "Arsenal",
         "badge": "https://resources.premierleague.com/premierleague/badges/70/t3.png"
@@ -87,9 +89,9 @@ CLUBS_DATA = {
         "name": "Wolves",
         "badge": "https://resources.premierleague.com/premierleague/badges/70/t39.png"
     }
-}
+})
 
-INTERESTS = [
+INTERESTS = (
     "Football",
     "Transfers",
     "EPL",
@@ -99,4 +101,23 @@ INTERESTS = [
     "F1",
     "Golf",
     "Darts"
-]
+)
+
+# Set views for membership tests (validating user input against the lists above)
+EPL_TEAMS_SET = frozenset(EPL_TEAMS)
+INTERESTS_SET = frozenset(INTERESTS)
+
+# Flat lookups by club key, so callers don't index into the nested dicts
+CLUB_BADGE_BY_KEY = {key: data["badge"] for key, data in CLUBS_DATA.items()}
+CLUB_LABEL_BY_KEY = {key: data["name"] for key, data in CLUBS_DATA.items()}
+
+# Parallel per-field tuples (same order as CLUBS_DATA) for scans over every club
+CLUB_KEYS = tuple(CLUBS_DATA)
+CLUB_NAMES = tuple(data["name"] for data in CLUBS_DATA.values())
+CLUB_BADGES = tuple(data.get("badge") for data in CLUBS_DATA.values())
+
+# Club picker options sent with every /api/me response, built once
+CLUBS_OPTIONS = tuple(
+    {"key": key, "label": name, "badge": badge}
+    for key, name, badge in zip(CLUB_KEYS, CLUB_NAMES, CLUB_BADGES)
+)
@@ -1,66 +1,76 @@
 #!/usr/bin/env python3
 """
 Helper script to stop running bot instances.
-This reads the PID from bot.lock and terminates the process.
+This checks the lock on bot.lock, reads the PID from it and terminates the process.
 """
 import os
 import sys
+import signal
 import logging
-from pathlib import Path
+
+from bot_lock import LOCK_FILE, try_lock, unlock, read_pid
 
 logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
 
-LOCK_FILE = Path("bot.lock")
+def _terminate(pid):
+    """Terminate process pid. Returns True on success."""
+    if sys.platform != "win32":
+        try:
+            os.kill(pid, signal.SIGTERM)
+            return True
+        except ProcessLookupError:
+            logging.warning(f"Process {pid} not found or already terminated")
+            return False
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    PROCESS_TERMINATE = 0x0001
+    handle = kernel32.OpenProcess(PROCESS_TERMINATE, False, pid)
+    if not handle:
+        logging.warning(f"Process {pid} not found or already terminated")
+        return False
+    try:
+        return bool(kernel32.TerminateProcess(handle, 0))
+    finally:
+        kernel32.CloseHandle(handle)
 
 def stop_bot():
     """Stop the running bot instance."""
     if not LOCK_FILE.exists():
-        logging.info("No lock file found. Bot may not be running.")
+        logging.info("No lock file found. Bot is not running.")
         return
-    
-    try:
-        with open(LOCK_FILE, 'r') as f:
-            pid = int(f.read().strip())
-        
-        logging.info(f"Found bot instance with PID: {pid}")
-        
-        # Try to terminate the process
+
+    with open(LOCK_FILE, "a+") as f:
+        # The running bot holds the lock; if we can take it, nobody is running
         try:
-            import ctypes
-            kernel32 = ctypes.windll.kernel32
-            PROCESS_TERMINATE = 0x0001
-            handle = kernel32.OpenProcess(PROCESS_TERMINATE, False, pid)
-            
-            if handle:
-                if kernel32.TerminateProcess(handle, 0):
-                    logging.info(f"Successfully terminated process {pid}")
-                    kernel32.CloseHandle(handle)
-                    
-                    # Remove lock file
-                    if LOCK_FILE.exists():
-                        LOCK_FILE.unlink()
-                        logging.info("Lock file removed")
-                else:
-                    logging.error(f"Failed to terminate process {pid}")
-                    kernel32.CloseHandle(handle)
-            else:
-                logging.warning(f"Process {pid} not found or already terminated")
-                # Remove stale lock file
-                if LOCK_FILE.exists():
-                    LOCK_FILE.unlink()
-                    logging.info("Removed stale lock file")
-        except Exception as e:
-            logging.error(f"Error terminating process: {e}")
-            logging.info("You may need to manually stop the process")
-    
-    except (ValueError, FileNotFoundError) as e:
-        logging.error(f"Invalid lock file: {e}")
-        if LOCK_FILE.exists():
-            LOCK_FILE.unlink()
-            logging.info("Removed invalid lock file")
+            try_lock(f)
+        except OSError:
+            pid = read_pid(f)
+        else:
+            unlock(f)
+            f.close()
+            LOCK_FILE.unlink(missing_ok=True)
+            logging.info("Lock is not held. Bot is not running; removed stale lock file")
+            return
+
+    if pid is None:
+        logging.error("Bot is running but its PID could not be read from the lock file")
+        logging.info("You may need to manually stop the process")
+        return
+
+    logging.info(f"Found bot instance with PID: {pid}")
+    try:
+        if _terminate(pid):
+            # The OS drops the lock with the process, so a leftover bot.lock
+            # (e.g. after TerminateProcess) doesn't block the next start
+            logging.info(f"Successfully terminated process {pid}")
+        else:
+            logging.error(f"Failed to terminate process {pid}")
+    except Exception as e:
+        logging.error(f"Error terminating process: {e}")
+        logging.info("You may need to manually stop the process")
 
 if __name__ == "__main__":
     stop_bot()
@@ -6,15 +6,29 @@ import logging
 import os
 import base64
 import asyncio
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any
-from urllib.parse import parse_qsl
+from urllib.parse import unquote_plus
 
 from aiohttp import web
 
 import config
 import api_service
-from shared_constants import CLUBS_DATA, INTERESTS
+from shared_constants import CLUBS_OPTIONS, INTERESTS
+
+
+# orjson when available (faster, returns bytes); compact stdlib json otherwise
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+    _json_loads = json.loads
 
 
 JWT_SECRET = os.getenv("JWT_SECRET") or (config.BOT_TOKEN or "change_me")
@@ -26,34 +40,64 @@ def _b64url_decode(data: str) -> bytes:
     padding = "=" * (-len(data) % 4)
     return base64.urlsafe_b64decode(data + padding)
 
+# Constant across tokens, so encoded once
+_JWT_HEADER_B64 = _b64url_encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+_JWT_SECRET_BYTES = JWT_SECRET.encode()
+
+def _secret_bytes(secret: str) -> bytes:
+    return _JWT_SECRET_BYTES if secret is JWT_SECRET else secret.encode()
+
 def create_jwt(payload: Dict[str, Any], secret: str, exp_seconds: int = 86400) -> str:
-    header = {"alg": "HS256", "typ": "JWT"}
     now = int(time.time())
     payload = {**payload, "iat": now, "exp": now + exp_seconds}
-    header_b64 = _b64url_encode(json.dumps(header, separators=(",", ":")).encode())
-    payload_b64 = _b64url_encode(json.dumps(payload, separators=(",", ":")).encode())
+    header_b64 = _JWT_HEADER_B64
+    payload_b64 = _b64url_encode(_json_dumps(payload))
     signing_input = f"{header_b64}.{payload_b64}".encode()
-    signature = hmac.new(secret.encode(), signing_input, hashlib.sha256).digest()
+    signature = hmac.digest(_secret_bytes(secret), signing_input, "sha256")
     signature_b64 = _b64url_encode(signature)
     return f"{header_b64}.{payload_b64}.{signature_b64}"
 
-def verify_jwt(token: str, secret: str) -> Dict[str, Any]:
+# Active users send the same token on every request, so verified payloads are
+# memoised; only failures (which raise) are recomputed. Expiry is checked per call.
+@lru_cache(maxsize=4096)
+def _verify_jwt_signature(token: str, secret: str) -> Dict[str, Any]:
     try:
         header_b64, payload_b64, signature_b64 = token.split(".")
     except ValueError:
         raise ValueError("invalid_token")
     signing_input = f"{header_b64}.{payload_b64}".encode()
-    expected_sig = hmac.new(secret.encode(), signing_input, hashlib.sha256).digest()
+    expected_sig = hmac.digest(_secret_bytes(secret), signing_input, "sha256")
     if not hmac.compare_digest(_b64url_encode(expected_sig), signature_b64):
         raise ValueError("invalid_token")
-    payload = json.loads(_b64url_decode(payload_b64))
+    return _json_loads(_b64url_decode(payload_b64))
+
+def verify_jwt(token: str, secret: str) -> Dict[str, Any]:
+    # Copy so callers can't alter the cached payload
+    payload = dict(_verify_jwt_signature(token, secret))
     exp = payload.get("exp")
     if exp and int(time.time()) > int(exp):
         raise ValueError("token_expired")
     return payload
 
-def parse_init_data(init_data: str) -> Dict[str, Any]:
-    data = dict(parse_qsl(init_data, strict_parsing=True))
+def _parse_init_fields(init_data: str) -> Dict[str, str]:
+    """Split initData into a dict, matching dict(parse_qsl(init_data, strict_parsing=True)).
+
+    initData is a flat query string, so a single split/partition pass does the job
+    without urllib's generic parser.
+    """
+    fields = {}
+    if not init_data:
+        return fields
+    for part in init_data.split("&"):
+        key, eq, value = part.partition("=")
+        if not eq:
+            raise ValueError(f"bad query field: {part!r}")
+        # parse_qsl drops blank values unless keep_blank_values is set
+        if value:
+            fields[unquote_plus(key)] = unquote_plus(value)
+    return fields
+
+def _decode_init_fields(data: Dict[str, Any]) -> Dict[str, Any]:
     if "user" in data:
         try:
             data["user"] = json.loads(data["user"])
@@ -61,65 +105,109 @@ def parse_init_data(init_data: str) -> Dict[str, Any]:
             pass
     return data
 
+def parse_init_data(init_data: str) -> Dict[str, Any]:
+    return _decode_init_fields(_parse_init_fields(init_data))
+
+@lru_cache(maxsize=4)
+def _derive_webapp_secret(bot_token: str) -> bytes:
+    # Telegram Web App secret key: HMAC-SHA256 of the bot token keyed by "WebAppData".
+    # Depends only on the token, so it's computed once per token
+    return hmac.digest(b"WebAppData", bot_token.encode(), "sha256")
+
 def verify_init_data(init_data: str, bot_token: str, max_age: int = 86400) -> Dict[str, Any]:
-    data = dict(parse_qsl(init_data, strict_parsing=True))
-    received_hash = data.pop("hash", None)
+    data = _parse_init_fields(init_data)
+    received_hash = data.get("hash")
     if not received_hash:
         raise ValueError("missing_hash")
-    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(data.items()))
+    data_check_string = "\n".join([k + "=" + v for k, v in sorted(data.items()) if k != "hash"])
     
-    # Correct Telegram Web App secret key calculation
-    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
-    calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    secret_key = _derive_webapp_secret(bot_token)
+    calculated_hash = hmac.digest(secret_key, data_check_string.encode(), "sha256").hex()
     
     if not hmac.compare_digest(calculated_hash, received_hash):
         raise ValueError("invalid_hash")
-    auth_date = int(data.get("auth_date", "0") or 0)
-    if max_age and auth_date and time.time() - auth_date > max_age:
+    auth_date = data.get("auth_date")
+    if max_age and auth_date and time.time() - int(auth_date) > max_age:
         raise ValueError("init_data_expired")
-    return parse_init_data(init_data)
+    # Same fields as parse_init_data(init_data), without parsing the string again
+    return _decode_init_fields(data)
+
+
+
+def _json_response(data, status: int = 200) -> web.Response:
+    return web.Response(body=_json_dumps(data), status=status, content_type="application/json")
+
+async def _read_json(request: web.Request):
+    return _json_loads(await request.read())
+
+# api_service calls block on SQLite, so they run on a small dedicated pool
+# instead of the loop's default executor
+DB_WORKERS = 8
 
+async def _db(request: web.Request, fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(request.app["db_executor"], fn, *args)
 
+# API routes reachable without a Bearer token
+_PUBLIC_PATHS = frozenset({"/api/health", "/api/auth/telegram"})
 
 @web.middleware
 async def auth_middleware(request: web.Request, handler):
-    if request.path.startswith("/api/") and request.path not in ["/api/health", "/api/auth/telegram"]:
+    path = request.path
+    # Non-API paths (the SPA page) are the common case, so test the prefix first
+    if path.startswith("/api/") and path not in _PUBLIC_PATHS:
         auth = request.headers.get("Authorization", "")
         if not auth.startswith("Bearer "):
-            return web.json_response({"error": "missing_token"}, status=401)
+            return _json_response({"error": "missing_token"}, status=401)
         token = auth.replace("Bearer ", "", 1).strip()
         try:
             payload = verify_jwt(token, JWT_SECRET)
         except ValueError as exc:
-            return web.json_response({"error": str(exc)}, status=403)
+            return _json_response({"error": str(exc)}, status=403)
         request["auth"] = payload
     return await handler(request)
 
+# JSON bodies below this size aren't worth compressing
+COMPRESS_MIN_SIZE = 512
+
+@web.middleware
+async def compression_middleware(request: web.Request, handler):
+    response = await handler(request)
+    # enable_compression picks gzip/deflate (br if brotli is installed) from Accept-Encoding
+    if (
+        isinstance(response, web.Response)
+        and response.content_type == "application/json"
+        and response.body is not None
+        and len(response.body) > COMPRESS_MIN_SIZE
+        and request.headers.get("Accept-Encoding")
+    ):
+        response.enable_compression()
+    return response
+
 routes = web.RouteTableDef()
 
 @routes.get("/api/health")
 async def health(request: web.Request):
-    return web.json_response({"ok": True})
+    return _json_response({"ok": True})
 
 @routes.post("/api/auth/telegram")
 async def auth_telegram(request: web.Request):
-    payload = await request.json()
+    payload = await _read_json(request)
     init_data = payload.get("initData", "")
     if not init_data:
-        return web.json_response({"error": "missing_init_data"}, status=400)
+        return _json_response({"error": "missing_init_data"}, status=400)
     if not config.BOT_TOKEN:
-        return web.json_response({"error": "bot_token_missing"}, status=500)
+        return _json_response({"error": "bot_token_missing"}, status=500)
     try:
         parsed = verify_init_data(init_data, config.BOT_TOKEN)
     except ValueError as exc:
-        return web.json_response({"error": str(exc)}, status=403)
+        return _json_response({"error": str(exc)}, status=403)
     tg_user = parsed.get("user") or {}
     user_id = int(tg_user.get("id"))
     username = tg_user.get("username") or tg_user.get("first_name") or ""
-    await asyncio.to_thread(api_service.upsert_user, user_id, username)
-    role = await asyncio.to_thread(api_service.get_user_role, user_id)
+    await _db(request, api_service.upsert_user, user_id, username)
+    role = await _db(request, api_service.get_user_role, user_id)
     token = create_jwt({"sub": user_id, "username": username, "role": role}, JWT_SECRET)
-    return web.json_response({
+    return _json_response({
         "token": token,
         "user": {
             "id": user_id,
@@ -131,67 +219,61 @@ async def auth_telegram(request: web.Request):
 @routes.get("/api/me")
 async def me(request: web.Request):
     user_id = int(request["auth"].get("sub"))
-    data = await asyncio.to_thread(api_service.get_me, user_id)
-    data["clubs"] = [
-        {"key": key, "label": info.get("name", key), "badge": info.get("badge")}
-        for key, info in CLUBS_DATA.items()
-    ]
+    data = await _db(request, api_service.get_me, user_id)
+    data["clubs"] = CLUBS_OPTIONS
     data["interests_options"] = INTERESTS
-    return web.json_response(data)
+    return _json_response(data)
 
 @routes.patch("/api/me")
 async def update_me(request: web.Request):
     user_id = int(request["auth"].get("sub"))
-    payload = await request.json()
+    payload = await _read_json(request)
     club = payload.get("club")
     interests = payload.get("interests")
     try:
-        data = await asyncio.to_thread(api_service.update_me, user_id, club, interests)
+        data = await _db(request, api_service.update_me, user_id, club, interests)
     except ValueError as exc:
-        return web.json_response({"error": str(exc)}, status=400)
-    data["clubs"] = [
-        {"key": key, "label": info.get("name", key), "badge": info.get("badge")}
-        for key, info in CLUBS_DATA.items()
-    ]
+        return _json_response({"error": str(exc)}, status=400)
+    data["clubs"] = CLUBS_OPTIONS
     data["interests_options"] = INTERESTS
-    return web.json_response(data)
+    return _json_response(data)
 
 @routes.get("/api/predictions/open")
 async def predictions_open(request: web.Request):
-    items = await asyncio.to_thread(api_service.get_open_matches)
-    return web.json_response({"items": items})
+    items = await _db(request, api_service.get_open_matches)
+    return _json_response({"items": items})
 
 @routes.post("/api/predictions/place")
 async def predictions_place(request: web.Request):
     user_id = int(request["auth"].get("sub"))
-    payload = await request.json()
+    payload = await _read_json(request)
     match_id = int(payload.get("match_id", 0))
     choice = payload.get("choice")
     score_a = payload.get("score_a")
     score_b = payload.get("score_b")
-    result = await asyncio.to_thread(api_service.place_prediction, user_id, match_id, choice, score_a, score_b)
+    result = await _db(request, api_service.place_prediction, user_id, match_id, choice, score_a, score_b)
     status = 200 if result.get("success") else 400
-    return web.json_response(result, status=status)
+    return _json_response(result, status=status)
 
 @routes.get("/api/predictions/history")
 async def predictions_history(request: web.Request):
     user_id = int(request["auth"].get("sub"))
-    items = await asyncio.to_thread(api_service.get_predictions_history, user_id)
-    return web.json_response({"items": items})
+    items = await _db(request, api_service.get_predictions_history, user_id)
+    return _json_response({"items": items})
 
 @routes.get("/api/predictions/stats")
 async def predictions_stats(request: web.Request):
     user_id = int(request["auth"].get("sub"))
-    stats = await asyncio.to_thread(api_service.get_predictions_stats, user_id)
-    return web.json_response(stats)
+    stats = await _db(request, api_service.get_predictions_stats, user_id)
+    return _json_response(stats)
 
 @routes.get("/api/leaderboards/global")
 async def leaderboard_global(request: web.Request):
     user_id = int(request["auth"].get("sub"))
     page = max(int(request.query.get("page", 1)), 1)
     limit = min(max(int(request.query.get("limit", 25)), 1), 100)
-    data = await asyncio.to_thread(api_service.get_leaderboard_global, page, limit, user_id)
-    return web.json_response({
+    data = await _db(request, api_service.get_leaderboard_global, page, limit, user_id)
+    return _json_response({
         **data,
         "page": page,
         "limit": limit
@@ -202,8 +284,8 @@ async def leaderboard_predictions(request: web.Request):
     user_id = int(request["auth"].get("sub"))
     page = max(int(request.query.get("page", 1)), 1)
     limit = min(max(int(request.query.get("limit", 25)), 1), 100)
-    data = await asyncio.to_thread(api_service.get_leaderboard_predictions, page, limit, user_id)
-    return web.json_response({
+    data = await _db(request, api_service.get_leaderboard_predictions, page, limit, user_id)
+    return _json_response({
         **data,
         "page": page,
         "limit": limit
@@ -212,51 +294,88 @@ async def leaderboard_predictions(request: web.Request):
 @routes.get("/api/wallet")
 async def wallet(request: web.Request):
     user_id = int(request["auth"].get("sub"))
-    data = await asyncio.to_thread(api_service.get_wallet, user_id)
-    return web.json_response(data)
+    data = await _db(request, api_service.get_wallet, user_id)
+    return _json_response(data)
 
 @routes.post("/api/rewards/daily")
 async def rewards_daily(request: web.Request):
     user_id = int(request["auth"].get("sub"))
-    data = await asyncio.to_thread(api_service.claim_daily, user_id)
-    return web.json_response(data)
+    data = await _db(request, api_service.claim_daily, user_id)
+    return _json_response(data)
 
 @routes.post("/api/moderation/warn")
 async def moderation_warn(request: web.Request):
-    payload = await request.json()
+    payload = await _read_json(request)
     actor_id = int(payload.get("actor_id", 0))
     target_id = int(payload.get("target_id", 0))
     reason = payload.get("reason", "")
-    count = await asyncio.to_thread(api_service.warn_user, actor_id, target_id, reason)
-    return web.json_response({"warnings": count})
+    count = await _db(request, api_service.warn_user, actor_id, target_id, reason)
+    return _json_response({"warnings": count})
 
 @routes.post("/api/moderation/mute")
 async def moderation_mute(request: web.Request):
-    payload = await request.json()
+    payload = await _read_json(request)
     actor_id = int(payload.get("actor_id", 0))
     target_id = int(payload.get("target_id", 0))
     reason = payload.get("reason", "")
-    await asyncio.to_thread(api_service.log_mute, actor_id, target_id, reason)
-    return web.json_response({"ok": True})
+    await _db(request, api_service.log_mute, actor_id, target_id, reason)
+    return _json_response({"ok": True})
 
 @routes.post("/api/moderation/ban")
 async def moderation_ban(request: web.Request):
-    payload = await request.json()
+    payload = await _read_json(request)
     actor_id = int(payload.get("actor_id", 0))
     target_id = int(payload.get("target_id", 0))
     reason = payload.get("reason", "")
-    await asyncio.to_thread(api_service.log_ban, actor_id, target_id, reason)
-    return web.json_response({"ok": True})
+    await _db(request, api_service.log_ban, actor_id, target_id, reason)
+    return _json_response({"ok": True})
+
+def _load_webapp(app: web.Application):
+    """Read the SPA entry page into memory and index the other webapp files
+    (re-run on SIGHUP after a deploy)."""
+    webapp_dir = Path(app["index_path"]).parent
+    # {url path: file} for every asset, so serving one is a dict lookup (no
+    # per-request stat, and nothing outside the directory is reachable)
+    app["static_files"] = {
+        "/" + path.relative_to(webapp_dir).as_posix(): path
+        for path in webapp_dir.rglob("*")
+        if path.is_file() and path.name != "index.html"
+    }
+    try:
+        body = Path(app["index_path"]).read_bytes()
+    except OSError as e:
+        logging.error(f"Could not read {app['index_path']}: {e}")
+        return
+    app["index_bytes"] = body
+    app["index_etag"] = f'"{hashlib.md5(body).hexdigest()}"'
 
 @routes.get("/{tail:.*}")
-async def serve_index(request: web.Request):
-    index_path = request.app["index_path"]
-    return web.FileResponse(index_path)
+async def serve_webapp(request: web.Request):
+    static_path = request.app["static_files"].get(request.path)
+    if static_path is not None:
+        # FileResponse uses sendfile and sets the MIME type, Last-Modified and range support
+        return web.FileResponse(static_path)
+    # SPA fallback only for page navigations; a missing asset is a real 404
+    body = request.app.get("index_bytes")
+    if body is None or "text/html" not in request.headers.get("Accept", ""):
+        raise web.HTTPNotFound()
+    etag = request.app["index_etag"]
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=body, content_type="text/html", charset="utf-8", headers=headers)
 
 async def start_webapp_server():
-    app = web.Application(middlewares=[auth_middleware])
+    app = web.Application(middlewares=[auth_middleware, compression_middleware])
     app.add_routes(routes)
     app["index_path"] = str(Path(__file__).parent / "webapp" / "index.html")
+    _load_webapp(app)
+    app["db_executor"] = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, _load_webapp, app)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        # No SIGHUP (Windows) or not on the main thread; restart to pick up changes
+        pass
     runner = web.AppRunner(app)
     await runner.setup()
     host = os.getenv("WEBAPP_HOST", "0.0.0.0")
@@ -267,5 +386,10 @@ async def start_webapp_server():
     return runner
 
 async def stop_webapp_server(runner: web.AppRunner):
+    try:
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        pass
     if runner:
         await runner.cleanup()
+        runner.app["db_executor"].shutdown(wait=False)